@@ -0,0 +1,88 @@
+"""
+Micro-benchmark of the value tokenizers used by the transformers against the inline regex code they replaced.
+Run it from the iplantsdb folder: python benchmarks/bench_tokenizers.py
+"""
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from utils.tokenizers import strip_html, parse_dblink, parse_pathway_link, parse_formula  # noqa: E402
+
+RECORD = {
+    'COMMON-NAME': ['<i>S</i>-adenosyl-L-methionine'],
+    'SYNONYMS': ['SAM', 'AdoMet', 'S-adenosylmethionine'],
+    'DBLINKS': ['(CHEBI "59789" NIL |kothari| 3619532080 NIL NIL)',
+                '(PUBCHEM "9865002" NIL |taltman| 3466375285 NIL NIL)',
+                '(LIGAND-CPD "C00019" NIL |kr| 3345815243 NIL NIL)'],
+    'CHEMICAL-FORMULA': ['(C 15)', '(H 23)', '(N 6)', '(O 5)', '(S 1)'],
+    'PATHWAY-LINKS': ['(CPD-7117 PWY-7261 PWY-5153)', '(PYRUVATE (PWY-5 . :OUTGOING))',
+                      '(|CPD-3| "some pathway name" PWY-5)'],
+}
+
+
+def legacy(record):
+    name = re.sub('<[^<]+?>', '', record['COMMON-NAME'][0])
+    synonyms = [re.sub('<[^<]+?>', '', x) for x in record['SYNONYMS']]
+
+    crossrefs = {}
+    for dblink in record['DBLINKS']:
+        ref = dblink.split('NIL')[0][:-1]
+        db = re.search('\\((.*?) ', ref).group()[1:-1]
+        db_id = re.search('"(.*?)"', ref).group()[1:-1]
+        crossrefs[db] = db_id
+
+    formula = ''.join(record['CHEMICAL-FORMULA']).replace('(', '').replace(')', '').replace(' ', '')
+
+    path_links = {}
+    for link in record['PATHWAY-LINKS']:
+        if '"' in link:
+            match = re.search('"(.*?)"', link).group().replace(' ', '_')[1:-1]
+            link = re.sub('"(.*?)"', match, link)
+        if 'OUTGOING' in link:
+            info = link[1:-1].replace(' . :OUTGOING)', '').replace('(', '').split(" ")
+        elif 'INCOMING' in link:
+            info = link[1:-1].replace(' . :INCOMING)', '').replace('(', '').split(" ")
+        else:
+            info = link[1:-1].split(' ')
+        path_links[info[0].replace('|', '')] = [x.replace('|', '') for x in info[1:]]
+
+    return name, synonyms, crossrefs, formula, path_links
+
+
+def tokenized(record):
+    name = strip_html(record['COMMON-NAME'][0])
+    synonyms = [strip_html(x) for x in record['SYNONYMS']]
+
+    crossrefs = {}
+    for dblink in record['DBLINKS']:
+        ref = parse_dblink(dblink)
+        if ref:
+            crossrefs[ref[0]] = ref[1]
+
+    formula = parse_formula(record['CHEMICAL-FORMULA'])
+
+    path_links = {}
+    for link in record['PATHWAY-LINKS']:
+        path_link = parse_pathway_link(link)
+        if path_link:
+            path_links[path_link[0]] = path_link[1]
+
+    return name, synonyms, crossrefs, formula, path_links
+
+
+def main(number=20000):
+    assert legacy(RECORD) == tokenized(RECORD)
+
+    legacy_time = min(timeit.repeat(lambda: legacy(RECORD), number=number, repeat=5)) / number
+    tokenized_time = min(timeit.repeat(lambda: tokenized(RECORD), number=number, repeat=5)) / number
+
+    print('legacy:    %.2f us/record' % (legacy_time * 1e6))
+    print('tokenizer: %.2f us/record' % (tokenized_time * 1e6))
+    print('speedup:   %.1fx' % (legacy_time / tokenized_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark of the transformers on synthetic cyc databases of 1x, 10x and 50x the size of PlantCyc 14.0 (see
+synthetic_pgdb.py). Each transformer runs in a new process, which parses the dat files it needs, so the wall time
+includes the parsing and the peak RSS is the peak of that transformer alone. The time of each stage comes from the
+stats of the transformer. With --trace-memory, the peak memory allocated by each transformer is traced too, which
+makes the transformers several times slower, so the times of that run are not comparable.
+Run it from the iplantsdb folder: python benchmarks/bench_transform.py [--scales 1 10 50] [--workdir folder]
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_pgdb import write_synthetic_pgdb  # noqa: E402
+
+
+def run_transformer(transformer_name: str, data_path: str, db_version: str, use_cache: bool,
+                    trace_memory: bool = False) -> dict:
+    """
+    Run a transformer and measure it. It is called in a new process.
+    """
+    import transformer
+    from utils.pgdb import ParsedPGDB
+
+    transformer_class = getattr(transformer, transformer_name)
+
+    instance = transformer_class(data_path=data_path, db_version=db_version,
+                                 pgdb=ParsedPGDB(data_path, use_cache=use_cache))
+    instance.transform(trace_memory=trace_memory)
+
+    return instance.stats
+
+
+def bench_scale(scale: float, workdir: str, use_cache: bool = False, trace_memory: bool = False) -> dict:
+    """
+    Generate the synthetic database of a scale (if it does not exist yet) and run each transformer on it
+    """
+    from transformer import TRANSFORMERS
+    from utils.config import PROJECT_PATH
+
+    data_path = os.path.join(workdir, 'synthetic_%gx' % scale)
+    if not os.path.isfile(os.path.join(data_path, 'pathways.dat')):
+        write_synthetic_pgdb(data_path, scale)
+
+    db_version = 'benchmark_%gx' % scale
+    context = multiprocessing.get_context('spawn')
+
+    results = {}
+    try:
+        for transformer_class in TRANSFORMERS:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                results[transformer_class.__name__] = executor.submit(run_transformer, transformer_class.__name__,
+                                                                      data_path, db_version, use_cache,
+                                                                      trace_memory).result()
+    finally:
+        shutil.rmtree(os.path.join(PROJECT_PATH, 'json_files', db_version), ignore_errors=True)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 50],
+                        help='sizes of the synthetic databases as multiples of PlantCyc 14.0')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'iplantsdb_benchmarks'),
+                        help='folder of the synthetic databases. They are reused by the next runs')
+    parser.add_argument('--cache', action='store_true', help='read the dat files from the parsed-record cache')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='trace the peak memory allocated by each transformer (much slower)')
+    parser.add_argument('--output', help='json file to save the results')
+    args = parser.parse_args()
+
+    results = {}
+    for scale in args.scales:
+        results['%gx' % scale] = bench_scale(scale, args.workdir, use_cache=args.cache,
+                                             trace_memory=args.trace_memory)
+
+        print('\n%gx PlantCyc' % scale)
+        print('%-24s %10s %10s %12s %12s %12s   %s' % ('transformer', 'records', 'time (s)', 'records/s',
+                                                         'peak RSS MB', 'traced MB', 'stages (s)'))
+        for name, result in results['%gx' % scale].items():
+            stages = ' '.join('%s=%.2f' % stage for stage in result['stages'].items())
+            traced = '%.1f' % result['peak_memory_mb'] if 'peak_memory_mb' in result else '-'
+            print('%-24s %10d %10.2f %12.0f %12.1f %12s   %s' % (name, result['records'], result['wall_time'],
+                                                                 result['records_per_second'],
+                                                                 result['process_peak_rss_mb'], traced, stages))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+"""
+Generator of synthetic cyc databases (compounds, reactions, proteins, enzrxns, genes and pathways .dat files) for the
+transform benchmarks. The records have the attributes read by the transformers, cross-references between the files
+and the noise of the real files (citations, credits and multi-line comments), and the size of each file is a multiple
+of the size of PlantCyc 14.0.
+Run it from the iplantsdb folder: python benchmarks/synthetic_pgdb.py <folder> [scale]
+"""
+import os
+import sys
+import random
+
+# number of records of each dat file in PlantCyc 14.0
+PLANTCYC_RECORDS = {
+    'compounds.dat': 4807,
+    'reactions.dat': 5234,
+    'proteins.dat': 4216,
+    'enzrxns.dat': 6500,
+    'genes.dat': 2974,
+    'pathways.dat': 1163,
+}
+
+# taxonomy identifiers of plants, so that the organism transformer does not call the biocyc API
+SPECIES = ['TAX-3702', 'TAX-4577', 'TAX-39947', 'TAX-3847', 'TAX-4081', 'TAX-3694', 'TAX-29760', 'TAX-4113',
+           'TAX-3880', 'TAX-4558', 'TAX-15368', 'TAX-3218', 'TAX-3055', 'TAX-4530', 'TAX-3635', 'TAX-3750']
+
+HEADER = '# synthetic cyc database\n#\n# Attributes:\n#    UNIQUE-ID\n#    TYPES\n#\n'
+
+COMMENT = ('COMMENT - This record was generated for the transform benchmarks. It is as long as the comments of |FRAME:'
+           'TAX-3702 <i>Arabidopsis thaliana</i>| records |CITS:[11511673]|.\n/\n/A second paragraph of the comment '
+           'with - dashes - that the parser must skip.\n')
+
+
+def _noise(rng: random.Random) -> str:
+    lines = ['CITATIONS - %d:EV-EXP:3574545826:hartmut\n' % rng.randint(10000000, 99999999)
+             for _ in range(rng.randint(0, 4))]
+    lines.append('CREDITS - pmngroup\n')
+    if rng.random() < 0.3:
+        lines.append(COMMENT)
+    return ''.join(lines)
+
+
+def write_compounds(filename: str, n: int, rng: random.Random):
+    with open(filename, 'w') as f:
+        f.write(HEADER)
+        for i in range(n):
+            f.write('UNIQUE-ID - CPD-%d\nTYPES - Compounds\nCOMMON-NAME - <i>compound</i> %d\n' % (i, i))
+            for j in range(rng.randint(0, 4)):
+                f.write('SYNONYMS - synonym<sub>%d</sub> %d\n' % (j, i))
+            f.write('DBLINKS - (CHEBI "%d" NIL |caspi| 3847283025 NIL NIL)\n' % (i + 100))
+            f.write('DBLINKS - (PUBCHEM "%d" NIL |caspi| 3847283025 NIL NIL)\n' % (i + 9000))
+            f.write('DBLINKS - (LIGAND-CPD "C%05d" NIL |kr| 3345815243 NIL NIL)\n' % i)
+            f.write('CHEMICAL-FORMULA - (C %d)\nCHEMICAL-FORMULA - (H %d)\nCHEMICAL-FORMULA - (O %d)\n'
+                    % (rng.randint(1, 30), rng.randint(1, 60), rng.randint(0, 12)))
+            f.write('INCHI - InChI=1S/C%dH%d/c1-2-%d\nINCHI-KEY - InChIKey=%014X-N\nSMILES - C%sO\n'
+                    % (i % 30, i % 60, i, i, 'C' * (i % 12)))
+            f.write(_noise(rng))
+            f.write('//\n')
+
+
+def write_reactions(filename: str, n: int, n_compounds: int, n_pathways: int, rng: random.Random):
+    directions = ['REVERSIBLE', 'LEFT-TO-RIGHT', 'PHYSIOL-RIGHT-TO-LEFT', 'IRREVERSIBLE-LEFT-TO-RIGHT']
+    with open(filename, 'w') as f:
+        f.write(HEADER)
+        for i in range(n):
+            rxn_type = 'Transport-Reactions' if i % 10 == 0 else 'Small-Molecule-Reactions'
+            f.write('UNIQUE-ID - RXN-%d\nTYPES - %s\nCOMMON-NAME - reaction <b>%d</b>\n' % (i, rxn_type, i))
+            f.write('DBLINKS - (RHEA "%d" NIL |caspi| 3847283025 NIL NIL)\n' % (10000 + i))
+            f.write('EC-NUMBER - EC-%d.%d.%d.%d\n' % (i % 7 + 1, i % 11, i % 13, i))
+            for _ in range(rng.randint(0, 2)):
+                f.write('IN-PATHWAY - PWY-%d\n' % rng.randrange(n_pathways))
+            for side in ('LEFT', 'RIGHT'):
+                for _ in range(rng.randint(1, 3)):
+                    f.write('%s - CPD-%d\n' % (side, rng.randrange(n_compounds)))
+                    if rng.random() < 0.2:
+                        f.write('^COEFFICIENT - %d\n' % rng.randint(2, 4))
+                    if rng.random() < 0.3:
+                        f.write('^COMPARTMENT - CCO-IN\n')
+            f.write('REACTION-DIRECTION - %s\n' % directions[i % 4])
+            if i % 20 == 0:
+                f.write('REACTION-LIST - RXN-%d\nRXN-LOCATIONS - CCO-CYTOSOL\n' % ((i + 1) % n))
+            f.write(_noise(rng))
+            f.write('//\n')
+
+
+def write_proteins(filename: str, n: int, rng: random.Random):
+    n_complexes = n // 5
+    n_monomers = n - n_complexes
+    with open(filename, 'w') as f:
+        f.write(HEADER)
+        for i in range(n_monomers):
+            f.write('UNIQUE-ID - MONOMER-%d\nTYPES - Polypeptides\nCOMMON-NAME - protein %d\n' % (i, i))
+            f.write('DBLINKS - (UNIPROT "P%05d" NIL |peifenz| 3579613839 NIL NIL)\n' % i)
+            f.write('DBLINKS - (TAIR "AT%dG%05d.1" NIL |pzhang| 3721678259 NIL NIL)\n' % (i % 5 + 1, i))
+            f.write('GENE - G-%d\nSPECIES - %s\n' % (i, SPECIES[i % len(SPECIES)]))
+            if i % 3 == 0:
+                f.write('COMPONENT-OF - CPLX-%d\n' % (i // 4 % n_complexes))
+            for j in range(rng.randint(0, 2)):
+                f.write('SYNONYMS - protein synonym %d-%d\n' % (i, j))
+            f.write(_noise(rng))
+            f.write('//\n')
+        for j in range(n_complexes):
+            f.write('UNIQUE-ID - CPLX-%d\nTYPES - Protein-Complexes\nCOMMON-NAME - complex %d\n' % (j, j))
+            f.write('DBLINKS - (PDB "%dAB%d" NIL |x| 1 NIL NIL)\n' % (j % 9, j))
+            for k in range(rng.randint(1, 4)):
+                f.write('COMPONENTS - MONOMER-%d\n' % rng.randrange(n_monomers))
+                if k == 1:
+                    f.write('^COEFFICIENT - 2\n')
+            f.write('SPECIES - %s\n' % SPECIES[j % len(SPECIES)])
+            f.write(_noise(rng))
+            f.write('//\n')
+
+
+def write_enzrxns(filename: str, n: int, n_proteins: int, n_reactions: int, rng: random.Random):
+    n_complexes = n_proteins // 5
+    n_monomers = n_proteins - n_complexes
+    with open(filename, 'w') as f:
+        f.write(HEADER)
+        for i in range(n):
+            if i % 6 == 0 and n_complexes:
+                enzyme = 'CPLX-%d' % rng.randrange(n_complexes)
+            else:
+                enzyme = 'MONOMER-%d' % rng.randrange(n_monomers)
+            f.write('UNIQUE-ID - ENZRXN-%d\nTYPES - Enzymatic-Reactions\nENZYME - %s\nREACTION - RXN-%d\n'
+                    % (i, enzyme, rng.randrange(n_reactions)))
+            f.write(_noise(rng))
+            f.write('//\n')
+
+
+def write_genes(filename: str, n: int, n_proteins: int, rng: random.Random):
+    n_monomers = n_proteins - n_proteins // 5
+    with open(filename, 'w') as f:
+        f.write(HEADER)
+        for i in range(n):
+            f.write('UNIQUE-ID - G-%d\nTYPES - Unclassified-Genes\nCOMMON-NAME - AT%dG%05d\n' % (i, i % 5 + 1, i))
+            f.write('SYNONYMS - g<i>%d</i>\n' % i)
+            f.write('DBLINKS - (ENTREZ "%d,%d" NIL |x| 1 NIL NIL)\n' % (100000 + i, 200000 + i))
+            f.write('DBLINKS - (REFSEQ "NM_%06d" NIL |x| 1 NIL NIL)\n' % i)
+            f.write('PRODUCT - MONOMER-%d\n' % (i % n_monomers))
+            f.write('LEFT-END-POSITION - %d\nRIGHT-END-POSITION - %d\n' % (i * 1000, i * 1000 + 900))
+            f.write(_noise(rng))
+            f.write('//\n')
+
+
+def write_pathways(filename: str, n: int, n_reactions: int, n_compounds: int, rng: random.Random):
+    with open(filename, 'w') as f:
+        f.write(HEADER)
+        for i in range(n):
+            f.write('UNIQUE-ID - PWY-%d\nTYPES - Biosynthesis\nCOMMON-NAME - pathway <i>%d</i>\n' % (i, i))
+            f.write('SYNONYMS - pathway synonym %d\n' % i)
+            for _ in range(rng.randint(2, 12)):
+                f.write('REACTION-LIST - RXN-%d\n' % rng.randrange(n_reactions))
+            for _ in range(rng.randint(1, 3)):
+                f.write('SPECIES - %s\n' % rng.choice(SPECIES))
+            if i % 5 == 0:
+                f.write('SUPER-PATHWAYS - PWY-%d\n' % rng.randrange(n))
+            f.write('PATHWAY-LINKS - (CPD-%d PWY-%d PWY-%d)\n' % (rng.randrange(n_compounds), rng.randrange(n),
+                                                                   rng.randrange(n)))
+            f.write('PATHWAY-LINKS - (CPD-%d (PWY-%d . :OUTGOING))\n' % (rng.randrange(n_compounds), rng.randrange(n)))
+            f.write('PATHWAY-LINKS - (|CPD-%d| "a pathway name" PWY-%d)\n' % (rng.randrange(n_compounds),
+                                                                             rng.randrange(n)))
+            f.write(_noise(rng))
+            f.write('//\n')
+
+
+def write_synthetic_pgdb(folder: str, scale: float = 1.0, seed: int = 0) -> dict:
+    """
+    Write a synthetic cyc database
+    Parameters
+    ----------
+    folder: str
+        folder of the dat files
+    scale: float
+        size of the database as a multiple of PlantCyc 14.0
+    seed: int
+        seed of the random generator, so that the same scale always gives the same files
+
+    Returns
+    -------
+    records: dict
+        number of records of each dat file
+    """
+    os.makedirs(folder, exist_ok=True)
+
+    rng = random.Random(seed)
+    n = {name: max(5, int(count * scale)) for name, count in PLANTCYC_RECORDS.items()}
+
+    write_compounds(os.path.join(folder, 'compounds.dat'), n['compounds.dat'], rng)
+    write_reactions(os.path.join(folder, 'reactions.dat'), n['reactions.dat'], n['compounds.dat'],
+                    n['pathways.dat'], rng)
+    write_proteins(os.path.join(folder, 'proteins.dat'), n['proteins.dat'], rng)
+    write_enzrxns(os.path.join(folder, 'enzrxns.dat'), n['enzrxns.dat'], n['proteins.dat'], n['reactions.dat'], rng)
+    write_genes(os.path.join(folder, 'genes.dat'), n['genes.dat'], n['proteins.dat'], rng)
+    write_pathways(os.path.join(folder, 'pathways.dat'), n['pathways.dat'], n['reactions.dat'],
+                   n['compounds.dat'], rng)
+
+    return n
+
+
+if __name__ == '__main__':
+    print(write_synthetic_pgdb(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 1.0))
@@ -0,0 +1,364 @@
+import datetime
+import logging
+from typing import Dict, Iterable, Union
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from iplants_mongo.models import Reaction, Pathway, Organism
+from iplants_mongo.enrichment import enrichment_source, PENDING
+from utils.delta import record_fingerprint, FINGERPRINT_FIELD
+from utils.settings import MONGO_BULK_BATCH_SIZE
+
+# fields that are not compared: the identifier and the fields set by the update itself
+UPDATE_FIELDS = ('_id', 'database_version', 'timestamp')
+
+# maximum number of identifiers of an $in query
+QUERY_CHUNK = 10000
+
+# scenarios of a record of the update
+UPDATE = 'update'
+INTEGRATION = 'integration'
+INSERT = 'insert'
+
+
+def classify(db_doc: Union[dict, None], new_db: str) -> str:
+    """
+    Scenario of a record of the update (see DatabaseMongoUpdate.update_collection)
+    Parameters
+    ----------
+    db_doc: dict, Optional
+        raw document of the database with the entry_id of the record, if any
+    new_db: str
+        database of the record (e.g. plantcyc)
+
+    Returns
+    -------
+    scenario: str
+        update (the document only has the database of the record), integration (the document has other databases) or
+        insert (there is no document)
+    """
+    if db_doc is None:
+        return INSERT
+
+    versions = db_doc.get('database_version') or {}
+    if len(versions) == 1 and new_db in versions:
+        return UPDATE
+    return INTEGRATION
+
+
+def prefetch_fields(collection) -> list:
+    """
+    Fields of the documents of a collection that are needed to classify the records and build their changes: the
+    database versions, the fingerprint of the content and the fields of the integration
+    """
+    doc = collection()
+    names = {'entry_id', 'database_version', FINGERPRINT_FIELD}
+    if 'crossrefs' in collection._fields:
+        names.add('crossrefs')
+    if hasattr(doc, 'str_attributes'):
+        names.update(doc.str_attributes())
+    if hasattr(doc, 'list_attributes'):
+        names.update(doc.list_attributes())
+    if collection is Reaction:
+        names.update(('reactants', 'products'))
+
+    return sorted(collection._fields[name].db_field for name in names)
+
+
+def load_documents(collection, fields: Iterable[str] = None, mongo_collection=None) -> Dict[str, dict]:
+    """
+    Current state of a collection, read with one projected query of the raw documents
+    Parameters
+    ----------
+    collection:
+        the collection class
+    fields: Iterable[str], Optional
+        fields of the documents. The fields of prefetch_fields by default
+    mongo_collection: pymongo.collection.Collection, Optional
+        pymongo collection of the collection class. The one of the mongoengine connection by default
+
+    Returns
+    -------
+    documents: dict
+        raw document of each entry_id
+    """
+    if fields is None:
+        fields = prefetch_fields(collection)
+    if mongo_collection is None:
+        mongo_collection = collection._get_collection()
+
+    documents = {doc['_id']: doc for doc in mongo_collection.find({}, {field: 1 for field in fields})}
+
+    logging.info('%d documents of %s were loaded', len(documents), mongo_collection.name)
+
+    return documents
+
+
+def bump_versions(mongo_collection, entry_ids: list, new_db: str, version: str):
+    """
+    Set the new version of a database, and the timestamp, of the documents that the update does not change otherwise,
+    with one update_many per chunk of identifiers
+    Parameters
+    ----------
+    mongo_collection: pymongo.collection.Collection
+        pymongo collection of the documents
+    entry_ids: list
+        identifiers of the documents
+    new_db: str
+        database of the update (e.g. plantcyc)
+    version: str
+        new version of the database (e.g. 15.0)
+    """
+    now = datetime.datetime.now()
+    for i in range(0, len(entry_ids), QUERY_CHUNK):
+        mongo_collection.update_many({'_id': {'$in': entry_ids[i:i + QUERY_CHUNK]}},
+                                     {'$set': {'database_version.' + new_db: version, 'timestamp': now}})
+
+
+def _empty(value) -> bool:
+    return value is None or value == [] or value == {}
+
+
+def same_value(new_value, db_value) -> bool:
+    """
+    Whether two values of a field are the same. A missing field is the same as an empty list or dict.
+    """
+    return new_value == db_value or (_empty(new_value) and _empty(db_value))
+
+
+def record_changes(new_doc, record: dict, db_doc: dict, new_db: str, fields: Iterable[str] = None) -> dict:
+    """
+    Minimal $set of a record over the document of the database, following the scenarios of
+    DatabaseMongoUpdate.update_collection:
+    1. the document only has the database of the record: the fields of the record that changed, or nothing if the
+    record has the fingerprint of the document
+    2. the document has other databases: the entries of the new database in the list attributes (only if the document
+    has the attribute), the crossrefs that the document does not have and the str attributes that the document does
+    not have. If the record is of plantcyc and the document has several databases, the str attributes (and the
+    reactants and products of the reactions) of the record replace the ones of the document.
+    The database version is not part of the changes.
+
+    Parameters
+    ----------
+    new_doc: Document
+        document built from the record
+    record: dict
+        record of the transformed file
+    db_doc: dict
+        raw document of the database
+    new_db: str
+        database of the record (e.g. plantcyc)
+    fields: Iterable[str], Optional
+        fields of db_doc, if it was read with a projection (see prefetch_fields). The other fields of the record are
+        only written, with the fields that changed, if a field of db_doc (e.g. the fingerprint) changed
+
+    Returns
+    -------
+    changes: dict
+        value of each field (in dot notation) that changes. Empty if the record does not change the document
+    """
+    new_mongo = new_doc.to_mongo()
+    versions = db_doc.get('database_version') or {}
+    changes = {}
+
+    if classify(db_doc, new_db) == UPDATE:
+        if record.get(FINGERPRINT_FIELD) and record[FINGERPRINT_FIELD] == db_doc.get(FINGERPRINT_FIELD):
+            return changes
+
+        fields = None if fields is None else set(fields)
+        unknown = {}
+        for name in record:
+            field = new_doc._fields[name].db_field
+            if field in UPDATE_FIELDS:
+                continue
+            if fields is not None and field not in fields:
+                unknown[field] = new_mongo.get(field)
+            elif not same_value(new_mongo.get(field), db_doc.get(field)):
+                changes[field] = new_mongo.get(field)
+
+        if changes:
+            changes.update(unknown)
+            changes['timestamp'] = datetime.datetime.now()
+        return changes
+
+    list_attributes = new_doc.list_attributes() if hasattr(new_doc, 'list_attributes') else {}
+    for att, value in list_attributes.items():
+        if value != {} and db_doc.get(att) and new_db in value:
+            if not same_value(new_mongo[att][new_db], db_doc[att].get(new_db)):
+                changes[att + '.' + new_db] = new_mongo[att][new_db]
+
+    if not isinstance(new_doc, (Pathway, Organism)):
+        db_crossrefs = db_doc.get('crossrefs') or {}
+        for key, value in (new_mongo.get('crossrefs') or {}).items():
+            if key not in db_crossrefs:
+                changes['crossrefs.' + key] = value
+
+    replace = new_db == 'plantcyc' and len(versions) != 1
+
+    str_attributes = new_doc.str_attributes() if hasattr(new_doc, 'str_attributes') else {}
+    for att, value in str_attributes.items():
+        if value is None:
+            continue
+        if db_doc.get(att) is None or (replace and value != db_doc.get(att)):
+            changes[att] = value
+
+    if replace and isinstance(new_doc, Reaction):
+        for att in ('reactants', 'products'):
+            if not same_value(new_mongo.get(att), db_doc.get(att)):
+                changes[att] = new_mongo.get(att)
+
+    return changes
+
+
+class BulkUpsert:
+    """
+    Bulk mode of the update of a collection. The records are buffered and, for each batch, the minimal operations of
+    each record are built in memory ($setOnInsert for the new documents and $set for the changed fields) and written
+    with one unordered bulk_write. The records that only change the database version are updated with one
+    update_many per batch. The documents are either loaded once for the whole collection (see load_documents) or
+    read with one query per batch.
+    """
+
+    def __init__(self, collection, db_version: str, batch_size: int = MONGO_BULK_BATCH_SIZE, enrichment=None,
+                 mongo_collection=None, prefetch: bool = True):
+        """
+        Parameters
+        ----------
+        collection:
+            the collection class to update
+        db_version: str
+            version of the cyc database (e.g. plantcyc_15.0)
+        batch_size: int
+            number of records of each bulk_write
+        enrichment: EnrichmentPool, Optional
+            pool that enriches the new enzymes and genes
+        mongo_collection: pymongo.collection.Collection, Optional
+            pymongo collection of the collection class. The one of the mongoengine connection by default
+        prefetch: bool
+            if True, the documents of the collection are loaded once, with the fields of prefetch_fields. Otherwise
+            the documents of each batch are read in full
+        """
+        self.collection = collection
+        self.new_db, self.version = db_version.split('_')
+        self.batch_size = batch_size
+        self.enrichment = enrichment
+        self.mongo_collection = collection._get_collection() if mongo_collection is None else mongo_collection
+
+        self.counts = {'inserted': 0, 'modified': 0, 'unchanged': 0}
+        self._records = []
+
+        self.fields = prefetch_fields(collection) if prefetch else None
+        self.documents = load_documents(collection, self.fields, self.mongo_collection) if prefetch else None
+
+    def add(self, record: dict):
+        """
+        Add a record of the transformed file. The batch is written when it is full.
+        """
+        self._records.append(record)
+        if len(self._records) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered records
+        """
+        records, self._records = self._records, []
+        if not records:
+            return
+
+        version_field = 'database_version.' + self.new_db
+
+        if self.documents is not None:
+            db_docs = self.documents
+        else:
+            db_docs = {doc['_id']: doc for doc in self.mongo_collection.find({'_id': {'$in': [rec['entry_id']
+                                                                                             for rec in records]}})}
+
+        operations = []
+        bumped = []
+        new_sources = []
+        for record in records:
+            record[FINGERPRINT_FIELD] = record_fingerprint(record)
+            new_doc = self.collection(**record)
+            db_doc = db_docs.get(new_doc.entry_id)
+
+            if db_doc is None:
+                source = enrichment_source(new_doc) if self.enrichment is not None else None
+                if source is not None:
+                    new_doc.enrichment = PENDING
+                    new_sources.append((source, new_doc.entry_id))
+
+                insert = new_doc.to_mongo()
+                insert.pop('_id')
+                operations.append(UpdateOne({'_id': new_doc.entry_id}, {'$setOnInsert': insert}, upsert=True))
+                continue
+
+            changes = record_changes(new_doc, record, db_doc, self.new_db, self.fields)
+            if changes:
+                changes[version_field] = self.version
+                operations.append(UpdateOne({'_id': new_doc.entry_id}, {'$set': changes}))
+
+            elif (db_doc.get('database_version') or {}).get(self.new_db) != self.version:
+                bumped.append(new_doc.entry_id)
+
+        inserted, modified = self._write(operations)
+        bump_versions(self.mongo_collection, bumped, self.new_db, self.version)
+
+        for source, entry_id in new_sources:
+            self.enrichment.submit(*source, entry_id)
+
+        self.counts['inserted'] += inserted
+        self.counts['modified'] += modified
+        self.counts['unchanged'] += len(records) - inserted - modified
+
+    def _write(self, operations: list) -> tuple:
+        """
+        Write the operations of a batch in one unordered bulk_write. The failed operations are logged and the others
+        are kept.
+        Returns
+        -------
+        counts: tuple
+            number of inserted and modified documents
+        """
+        if not operations:
+            return 0, 0
+
+        try:
+            result = self.mongo_collection.bulk_write(operations, ordered=False)
+            return result.upserted_count, result.modified_count
+
+        except BulkWriteError as error:
+            details = error.details
+            for write_error in details.get('writeErrors', [])[:10]:
+                logging.error('bulk write error in %s: %s', self.mongo_collection.name, write_error.get('errmsg'))
+            logging.error('%d operations of a bulk write of %s failed', len(details.get('writeErrors', [])),
+                          self.mongo_collection.name)
+            return details.get('nUpserted', 0), details.get('nModified', 0)
+
+    def deprecate(self, entry_ids: set) -> int:
+        """
+        Set the state to 'deprecated' of the documents of the database of the records that are not in entry_ids
+        Parameters
+        ----------
+        entry_ids: set
+            identifiers of all the records of the new version
+
+        Returns
+        -------
+        n_deprecated: int
+            number of documents deprecated
+        """
+        if 'state' not in self.collection._fields:
+            return 0
+
+        current = self.mongo_collection.find({'database_version.' + self.new_db: {'$exists': True}, 'state': None},
+                                             {'_id': 1})
+        removed = [doc['_id'] for doc in current if doc['_id'] not in entry_ids]
+
+        now = datetime.datetime.now()
+        for i in range(0, len(removed), QUERY_CHUNK):
+            self.mongo_collection.update_many({'_id': {'$in': removed[i:i + QUERY_CHUNK]}},
+                                              {'$set': {'state': 'deprecated', 'timestamp': now}})
+
+        return len(removed)
@@ -0,0 +1,277 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Union
+
+import requests
+
+from iplants_mongo.models import Enzyme, Gene
+from utils.api_requests import backoff
+from utils.extract import get_sequences_genes, get_uniprot_data_many, get_tair_protein
+from utils.settings import ENRICHMENT_WORKERS, ENRICHMENT_RETRIES, UNIPROT_BATCH_SIZE, ENTREZ_BATCH_SIZE
+
+PENDING = 'pending'
+FAILED = 'failed'
+
+COLLECTIONS = {'uniprot': Enzyme, 'tair': Enzyme, 'ncbi': Gene}
+BATCH_SIZES = {'uniprot': UNIPROT_BATCH_SIZE, 'tair': UNIPROT_BATCH_SIZE, 'ncbi': ENTREZ_BATCH_SIZE}
+
+
+def enrichment_source(doc) -> Union[tuple, None]:
+    """
+    Source of the data of a new enzyme or gene
+    Parameters
+    ----------
+    doc: Union[Enzyme, Gene]
+        enzyme or gene document
+
+    Returns
+    -------
+    source: tuple, Optional
+        kind of source (uniprot, tair or ncbi) and identifier of the document in it. None if the document has no
+        source
+    """
+    if not doc.crossrefs:
+        return None
+
+    if isinstance(doc, Enzyme):
+        if doc.crossrefs.get('UNIPROT'):
+            return 'uniprot', doc.crossrefs['UNIPROT']
+        if doc.crossrefs.get('TAIR'):
+            return 'tair', doc.crossrefs['TAIR']
+
+    elif isinstance(doc, Gene):
+        ncbi_id = doc.crossrefs.get('ENTREZ') or doc.crossrefs.get('REFSEQ')
+        if ncbi_id:
+            return 'ncbi', ncbi_id
+
+    return None
+
+
+def enrich_uniprot(identifiers: list) -> dict:
+    """
+    Uniprot fields of a batch of enzymes
+    """
+    uniprot_data = get_uniprot_data_many(identifiers, raise_errors=True)
+
+    values = {}
+    for identifier in identifiers:
+        uniprot_info = uniprot_data.get(identifier)
+        if uniprot_info:
+            values[identifier] = {'uniprot_product': uniprot_info['uniprot_product'],
+                                  'uniprot_location': uniprot_info['uniprot_location'],
+                                  'uniprot_status': uniprot_info.get('uniprot_status'),
+                                  'uniprot_function': [uniprot_info['uniprot_function']],
+                                  'sequence': uniprot_info['sequence']}
+    return values
+
+
+def enrich_tair(identifiers: list) -> dict:
+    """
+    Protein sequences of a batch of enzymes from the TAIR proteome
+    """
+    return {identifier: {'sequence': get_tair_protein(tair_id=identifier)} for identifier in identifiers}
+
+
+def enrich_ncbi(identifiers: list) -> dict:
+    """
+    Nucleotide sequences of a batch of genes from NCBI
+    """
+    sequences = get_sequences_genes(identifiers, raise_errors=True)
+    return {identifier: {'sequence': sequences[identifier]} for identifier in identifiers}
+
+
+ENRICHERS = {'uniprot': enrich_uniprot, 'tair': enrich_tair, 'ncbi': enrich_ncbi}
+
+
+class EnrichmentPool:
+    """
+    Background enrichment of the new enzymes and genes of a database update. The update saves the new documents at
+    once with enrichment='pending' and submits them to the pool, which gets their uniprot data and sequences in
+    batches in a bounded pool of threads and saves them. The batches that fail because of the remote services are
+    tried again after a backoff and, when the attempts run out, their documents are marked with enrichment='failed'.
+    The pending and failed documents of previous runs are submitted again by resume. The marker is removed from the
+    enriched documents.
+    """
+
+    def __init__(self,
+                 workers: int = ENRICHMENT_WORKERS,
+                 retries: int = ENRICHMENT_RETRIES,
+                 enrichers: Dict[str, Callable[[list], dict]] = None,
+                 batch_sizes: Dict[str, int] = None):
+        """
+        Parameters
+        ----------
+        workers: int
+            number of batches enriched at the same time
+        retries: int
+            maximum number of attempts of each batch
+        enrichers: dict, Optional
+            function of each kind of source that gets the fields (a dict) of each identifier of a batch. The
+            failures of the remote services must raise requests.RequestException
+        batch_sizes: dict, Optional
+            number of documents of the batches of each kind of source
+        """
+        self.retries = max(retries, 1)
+        self.enrichers = ENRICHERS if enrichers is None else enrichers
+        self.batch_sizes = BATCH_SIZES if batch_sizes is None else batch_sizes
+
+        self.submitted = 0
+        self.enriched = 0
+        self.failed = 0
+        self.retried = 0
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='enrichment')
+        # at most one queued batch per worker besides the running ones, so the update does not get far ahead of the
+        # enrichment
+        self._slots = threading.BoundedSemaphore(workers * 2)
+        self._pending = {}
+        self._futures = set()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, identifier: str, entry_id: str):
+        """
+        Add a document to the batch of its kind of source. The batch is enriched when it is full.
+        Parameters
+        ----------
+        kind: str
+            kind of source: uniprot, tair or ncbi
+        identifier: str
+            identifier of the document in the source
+        entry_id: str
+            entry_id of the document
+        """
+        with self._lock:
+            self.submitted += 1
+            batch = self._pending.setdefault(kind, [])
+            batch.append((identifier, entry_id))
+            if len(batch) < self.batch_sizes.get(kind, 1):
+                return
+            self._pending[kind] = []
+
+        self._start(kind, batch)
+
+    def flush(self):
+        """
+        Enrich the batches that are not full
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        for kind, batch in pending.items():
+            if batch:
+                self._start(kind, batch)
+
+    def _start(self, kind: str, batch: list):
+        self._slots.acquire()
+        future = self._executor.submit(self._run, kind, batch)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        with self._lock:
+            self._futures.discard(future)
+        self._slots.release()
+
+        if future.exception() is not None:
+            logging.error('enrichment batch failed', exc_info=future.exception())
+
+    def _run(self, kind: str, batch: list):
+        """
+        Enrich a batch of documents, with a backoff between the failed attempts
+        """
+        identifiers = list(dict.fromkeys(identifier for identifier, _ in batch))
+
+        values = None
+        for attempt in range(self.retries):
+            try:
+                values = self.enrichers[kind](identifiers)
+                break
+            except requests.RequestException as exception:
+                logging.warning('%s enrichment of %d documents failed (attempt %d): %s', kind, len(batch),
+                                attempt + 1, exception)
+                if attempt < self.retries - 1:
+                    with self._lock:
+                        self.retried += 1
+                    time.sleep(backoff(attempt))
+            except Exception:
+                logging.exception('%s enrichment of %d documents failed', kind, len(batch))
+                break
+
+        if values is None:
+            self._mark_failed(kind, [entry_id for _, entry_id in batch])
+            with self._lock:
+                self.failed += len(batch)
+            return
+
+        for identifier, entry_id in batch:
+            self._save(kind, entry_id, values.get(identifier) or {})
+
+        with self._lock:
+            self.enriched += len(batch)
+
+    @staticmethod
+    def _save(kind: str, entry_id: str, doc_values: dict):
+        """
+        Save the fields of an enriched document and remove its enrichment marker
+        """
+        updates = {'set__' + field: value for field, value in doc_values.items() if value is not None}
+        COLLECTIONS[kind].objects(entry_id=entry_id).update_one(unset__enrichment=True, **updates)
+
+    @staticmethod
+    def _mark_failed(kind: str, entry_ids: list):
+        COLLECTIONS[kind].objects(entry_id__in=entry_ids).update(set__enrichment=FAILED)
+
+    def resume(self) -> int:
+        """
+        Submit the documents that were not enriched by previous runs (pending or failed)
+        Returns
+        -------
+        n_docs: int
+            number of documents submitted
+        """
+        n_docs = 0
+        for collection in (Enzyme, Gene):
+            for doc in collection.objects(enrichment__in=[PENDING, FAILED]).only('entry_id', 'crossrefs'):
+                source = enrichment_source(doc)
+                if source is None:
+                    collection.objects(entry_id=doc.entry_id).update_one(unset__enrichment=True)
+                    continue
+                self.submit(*source, doc.entry_id)
+                n_docs += 1
+
+        if n_docs:
+            logging.info('%d documents of previous runs were submitted to the enrichment', n_docs)
+        return n_docs
+
+    def progress(self) -> dict:
+        """
+        Counters of the enrichment: submitted, enriched and failed documents, retried batches and documents still
+        pending
+        """
+        with self._lock:
+            return {'submitted': self.submitted, 'enriched': self.enriched, 'failed': self.failed,
+                    'retried': self.retried, 'pending': self.submitted - self.enriched - self.failed}
+
+    def wait(self):
+        """
+        Enrich the batches that are not full and wait for all batches
+        """
+        self.flush()
+        while True:
+            with self._lock:
+                futures = list(self._futures)
+            if not futures:
+                break
+            wait(futures)
+
+        logging.info('enrichment: %s', self.progress())
+
+    def close(self):
+        """
+        Wait for all batches and stop the threads of the pool
+        """
+        self.wait()
+        self._executor.shutdown()
@@ -4,6 +4,25 @@ import datetime
 from mongoengine import Document, fields
 
 
+def _freeze(value):
+    """
+    Hashable form of a field value: the dicts become tuples of their items sorted by key and the lists become tuples
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def content_hash(doc) -> int:
+    """
+    Hash of the content fields of a document, consistent with the __eq__ of the models: equal documents have the
+    same hash
+    """
+    return hash(tuple(_freeze(getattr(doc, field)) for field in doc.content_fields))
+
+
 class Metabolite(Document):
 
     entry_id = fields.StringField(primary_key=True)
@@ -16,10 +35,14 @@ class Metabolite(Document):
     inchikey = fields.StringField()
     smiles = fields.StringField()
     database_version = fields.DictField()
+    fingerprint = fields.StringField()
     models = fields.DictField()
     timestamp = fields.DateTimeField(required=True, default=datetime.datetime.utcnow)
     state = fields.StringField()
 
+    # fields compared by __eq__ and __hash__
+    content_fields = ('entry_id', 'common_name', 'crossrefs', 'formula', 'inchi', 'inchikey', 'smiles')
+
     def __eq__(self, other):
         if isinstance(other, Metabolite):
             return self.entry_id == other.entry_id and self.common_name == other.common_name and \
@@ -28,8 +51,7 @@ class Metabolite(Document):
                 and self.smiles == other.smiles
 
     def __hash__(self):
-        return hash((self.entry_id, self.common_name, map(tuple, self.crossrefs), self.formula, self.inchi,
-                     self.inchikey, self.smiles))
+        return content_hash(self)
 
     def str_attributes(self):
         return {"formula": self.formula, "inchi": self.inchi, "inchikey": self.inchikey, "smiles": self.smiles}
@@ -49,6 +71,7 @@ class Reaction(Document):
     genes = fields.DictField()
     enzymes = fields.DictField()
     database_version = fields.DictField()
+    fingerprint = fields.StringField()
     timestamp = fields.DateTimeField(required=True, default=datetime.datetime.utcnow)
     models = fields.DictField()
     state = fields.StringField()
@@ -59,18 +82,20 @@ class Reaction(Document):
     upper_bound = fields.IntField(default=10000)
     compartment = fields.DictField()
 
+    # fields compared by __eq__ and __hash__
+    content_fields = ('entry_id', 'common_name', 'crossrefs', 'direction', 'ecnumber', 'in_pathway', 'reactants',
+                      'products', 'genes', 'enzymes')
+
     def __eq__(self, other):
         if isinstance(other, Reaction):
             return self.entry_id == other.entry_id and self.common_name == other.common_name and \
                 self.crossrefs == other.crossrefs and self.direction == other.direction and \
-                self.ecnumber == other.ecnumber and self.in_pathway == self.in_pathway and \
+                self.ecnumber == other.ecnumber and self.in_pathway == other.in_pathway and \
                 self.reactants == other.reactants and self.products == other.products and \
                 self.genes == other.genes and self.enzymes == other.enzymes
 
     def __hash__(self):
-        return hash((self.entry_id, self.common_name, map(tuple, self.crossrefs), self.direction, self.ecnumber,
-                     map(tuple, self.in_pathway), map(tuple, self.reactants), map(tuple, self.products),
-                     map(tuple, self.genes), map(tuple, self.enzymes)))
+        return content_hash(self)
 
     def str_attributes(self):
         return {"direction": self.direction, "ecnumber": self.ecnumber}
@@ -94,13 +119,19 @@ class Enzyme(Document):
     reactions = fields.DictField()
     organisms = fields.DictField()
     database_version = fields.DictField()
+    fingerprint = fields.StringField()
     timestamp = fields.DateTimeField(required=True, default=datetime.datetime.utcnow)
     state = fields.StringField()
     sequence = fields.StringField()
+    enrichment = fields.StringField()
     protein_type = fields.StringField()
     component_of = fields.DictField()
     components = fields.DictField()
 
+    # fields compared by __eq__ and __hash__
+    content_fields = ('entry_id', 'common_name', 'crossrefs', 'genes', 'reactions', 'organisms', 'protein_type',
+                      'component_of', 'components')
+
     def __eq__(self, other):
         if isinstance(other, Enzyme):
             return self.entry_id == other.entry_id and self.common_name == other.common_name and \
@@ -110,9 +141,7 @@ class Enzyme(Document):
                 self.components == other.components
 
     def __hash__(self):
-        return hash((self.entry_id, self.common_name, map(tuple, self.crossrefs), map(tuple, self.genes),
-                     map(tuple, self.reactions), map(tuple, self.organisms), self.protein_type,
-                     map(tuple, self.component_of), map(tuple, self.components)))
+        return content_hash(self)
 
     def str_attributes(self):
         return {'uniprot_status': self.uniprot_status, 'uniprot_product': self.uniprot_product,
@@ -132,9 +161,14 @@ class Gene(Document):
     reactions = fields.DictField()
     enzymes = fields.DictField()
     database_version = fields.DictField()
+    fingerprint = fields.StringField()
     timestamp = fields.DateTimeField(required=True, default=datetime.datetime.utcnow)
     state = fields.StringField()
     sequence = fields.StringField()
+    enrichment = fields.StringField()
+
+    # fields compared by __eq__ and __hash__
+    content_fields = ('entry_id', 'common_name', 'synonyms', 'crossrefs', 'reactions', 'enzymes')
 
     def __eq__(self, other):
         if isinstance(other, Gene):
@@ -143,8 +177,7 @@ class Gene(Document):
                 self.reactions == other.reactions and self.enzymes == other.enzymes
 
     def __hash__(self):
-        return hash((self.entry_id, self.common_name, map(tuple, self.synonyms), map(tuple, self.crossrefs),
-                     map(tuple, self.reactions), map(tuple, self.enzymes)))
+        return content_hash(self)
 
     def str_attributes(self):
         return {'sequence': self.sequence}
@@ -163,9 +196,14 @@ class Pathway(Document):
     super_pathways = fields.ListField(fields.StringField())
     pathway_links = fields.DictField()
     database_version = fields.DictField()
+    fingerprint = fields.StringField()
     timestamp = fields.DateTimeField(required=True, default=datetime.datetime.utcnow)
     state = fields.StringField()
 
+    # fields compared by __eq__ and __hash__
+    content_fields = ('entry_id', 'common_name', 'synonyms', 'organisms', 'reactions', 'super_pathways',
+                      'pathway_links')
+
     def __eq__(self, other):
         if isinstance(other, Pathway):
             return self.entry_id == other.entry_id and self.common_name == other.common_name and \
@@ -174,8 +212,7 @@ class Pathway(Document):
                 self.pathway_links == other.pathway_links
 
     def __hash__(self):
-        return hash((self.entry_id, self.common_name, map(tuple, self.synonyms), map(tuple, self.organisms),
-                     map(tuple, self.reactions), map(tuple, self.super_pathways), map(tuple, self.pathway_links)))
+        return content_hash(self)
 
     def str_attributes(self):
         return {'common_name': self.common_name}
@@ -200,6 +237,9 @@ class MetabolicModel(Document):
     gprs = fields.ListField()
     timestamp = fields.DateTimeField(required=True, default=datetime.datetime.utcnow)
 
+    # fields compared by __eq__ and __hash__
+    content_fields = ('model_id', 'organism', 'year', 'genes', 'enzymes', 'reactions', 'metabolites')
+
     def __eq__(self, other):
         if isinstance(other, MetabolicModel):
             return self.model_id == other.model_id and self.organism == other.organism and \
@@ -207,8 +247,7 @@ class MetabolicModel(Document):
                 self.reactions == other.reactions and self.enzymes == other.enzymes
 
     def __hash__(self):
-        return hash((self.model_id, self.organism, self.year, map(tuple, self.genes),
-                     map(tuple, self.enzymes), map(tuple, self.reactions), map(tuple, self.metabolites)))
+        return content_hash(self)
 
 
 class Organism(Document):
@@ -229,8 +268,12 @@ class Organism(Document):
     genes = fields.DictField()
     enzymes = fields.DictField()
     database_version = fields.DictField()
+    fingerprint = fields.StringField()
     timestamp = fields.DateTimeField(required=True, default=datetime.datetime.utcnow)
 
+    # fields compared by __eq__ and __hash__
+    content_fields = ('entry_id', 'taxid', 'scientific_name', 'species', 'pathways', 'enzymes')
+
     def __eq__(self, other):
         if isinstance(other, Organism):
             return (self.entry_id == other.entry_id and self.taxid == other.taxid and
@@ -238,8 +281,7 @@ class Organism(Document):
                     self.pathways == other.pathways and self.enzymes == other.enzymes)
 
     def __hash__(self):
-        return hash((self.entry_id, self.taxid, self.scientific_name, self.species,
-                     map(tuple, self.pathways), map(tuple, self.enzymes)))
+        return content_hash(self)
 
     def str_attributes(self):
         return {"scientific_name": self.scientific_name, "species": self.species, "genus": self.genus,
@@ -1,13 +1,16 @@
 import os
 import datetime
-import json
 import logging
+from itertools import chain
 
-from mongoengine import connect, DoesNotExist
+from mongoengine import connect
 from iplants_mongo.models import Metabolite, Reaction, Enzyme, Gene, Pathway, Organism
-from utils.extract import get_sequence_gene, get_uniprot_data, get_tair_protein
+from iplants_mongo.enrichment import EnrichmentPool, enrichment_source, PENDING
+from iplants_mongo.bulk import BulkUpsert, load_documents, bump_versions, classify, INSERT, UPDATE
 from utils.config import PROJECT_PATH, Mongo
-from utils.extract import files_exist
+from utils.extract import iter_json_records, find_json_file
+from utils.delta import find_delta_files, record_fingerprint, FINGERPRINT_FIELD
+from utils.settings import ENRICHMENT_WORKERS, MONGO_BULK_BATCH_SIZE
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -15,16 +18,34 @@ logging.basicConfig(level=logging.DEBUG)
 
 class DatabaseMongoUpdate:
 
-    def __init__(self, db_version):
+    def __init__(self, db_version, delta=False, enrichment_workers=ENRICHMENT_WORKERS, bulk=False,
+                 bulk_batch_size=MONGO_BULK_BATCH_SIZE):
         """
         Class to represent the mongo database
         Parameters
         ----------
         db_version: Union[str, Parameter]
             version of the cyc database
+        delta: bool
+            if True, the collections are updated from the delta files (the records added, changed and removed since
+            the previous version) when they were written by the transform
+        enrichment_workers: int
+            number of threads that get the uniprot data and the sequences of the new enzymes and genes
+        bulk: bool
+            if True, the collections are updated in bulk mode (see iplants_mongo.bulk): the records are written in
+            unordered bulk_write batches with the minimal operations of each record, instead of one or more
+            round trips per record
+        bulk_batch_size: int
+            number of records of each bulk_write of the bulk mode
         """
 
         self.db_version = db_version
+        self.delta = delta
+        self.enrichment = EnrichmentPool(workers=enrichment_workers)
+        self.bulk = bulk
+        self.bulk_batch_size = bulk_batch_size
+        # inserted, modified and unchanged documents of each collection updated in bulk mode
+        self.counts = {}
 
         self.collections = [Metabolite, Reaction, Enzyme, Gene, Pathway, Organism]
 
@@ -34,100 +55,131 @@ class DatabaseMongoUpdate:
         mongodb = Mongo()
         connect(mongodb.database, host=mongodb.host, port=mongodb.port)
 
-    def update_collection(self, new_data_file, collection):
+    def update_collection(self, new_data_file, collection, removed_file=None):
         """
-        Update a database collection with new data. It considers three cenarios:
-        1. If the entry already exists in the older version of that cyc database, it updates all attributes
+        Update a database collection with new data. The current documents of the collection are loaded once (see
+        iplants_mongo.bulk.load_documents) and each record is classified in memory. It considers three cenarios:
+        1. If the entry already exists in the older version of that cyc database, it updates all attributes, unless the
+        record has the same content fingerprint (computed by the transform) as the entry. Then the entry only gets the
+        new version, in bulk with the other unchanged entries
         2. The entry does not exist in the older version of that cyc database, but exists in the other cyc database
         (e.g. plantcyc vs metacyc), it updates the crossrefs of all collections, the list of enzymes, genes and
         pathways in the case of Reaction collection and the list of reactions in the case of Enzyme collection.
         3. The entry does not exist in the database, it creates a new entry and if it is an enzymes or gene, it will
-        get the sequence at uniprot or ncbi, respectively.
+        get the sequence at uniprot or ncbi, respectively. The entry is saved at once with enrichment='pending' and
+        its sequence is got in the background by the enrichment pool (see iplants_mongo.enrichment).
         4. It updates the state to 'deprecated' of the database entries that are not in the new version of that database
+        In bulk mode, the same scenarios are written as batches of minimal operations (see iplants_mongo.bulk) and the
+        inserted, modified and unchanged entries are counted in self.counts.
 
         Parameters
         ----------
-        new_data_file: str
-            json file with new data
+        new_data_file: Union[str, list]
+            json or ndjson file (optionally compressed) with new data, or a list of files. The records are streamed
+            from the files
         collection:
             the collection class to update
+        removed_file: str, optional
+            file with the identifiers of the records removed since the previous version. If given, new_data_file only
+            has the records that were added or changed, and the entries that are not in it are not loaded: the removed
+            entries are deprecated and the others get the new version in bulk
         Returns
         -------
         """
-        with open(os.path.join(self.datasource, new_data_file)) as json_data:
-            data = json.load(json_data)
+        if isinstance(new_data_file, str):
+            new_data_file = [new_data_file]
 
-            new_db = self.db_version.split('_')[0]
+        data = chain.from_iterable(iter_json_records(os.path.join(self.datasource, f)) for f in new_data_file)
+
+        new_db = self.db_version.split('_')[0]
+
+        new_db_ids = set()
+
+        if self.bulk:
+            upsert = BulkUpsert(collection, self.db_version, batch_size=self.bulk_batch_size,
+                                enrichment=self.enrichment)
+            for record in data:
+                new_db_ids.add(record['entry_id'])
+                upsert.add(record)
+            upsert.flush()
+
+        else:
+            documents = load_documents(collection)
+            # entries of the same database whose content did not change: they only get the new version
+            bumped = []
 
             for record in data:
+                new_db_ids.add(record['entry_id'])
+                record[FINGERPRINT_FIELD] = record_fingerprint(record)
+
                 new_doc = collection(**record)
 
-                try:
-                    db_doc = collection.objects.get(entry_id=new_doc.entry_id)
+                db_raw = documents.get(new_doc.entry_id)
+                scenario = classify(db_raw, new_db)
 
-                    if len(db_doc.database_version) == 1:
-                        if new_db in db_doc.database_version:
-                            if hash(new_doc) != hash(db_doc):
-                                db_doc.update(**record)
-                                db_doc.timestamp = datetime.datetime.now()
-                                db_doc.save()
+                if scenario == INSERT:
+                    source = enrichment_source(new_doc)
+                    if source is not None:
+                        new_doc.enrichment = PENDING
 
-                        else:
-                            self.integration_function(new_doc=new_doc, db_doc=db_doc, new_db=new_db)
-                            db_doc.database_version.update({new_db: self.db_version.split('_')[1]})
-                            db_doc.save()
+                    new_doc.save()
 
-                    else:
-                        self.integration_function(new_doc=new_doc, db_doc=db_doc, new_db=new_db)
-                        db_doc.database_version.update({new_db: self.db_version.split('_')[1]})
+                    if source is not None:
+                        self.enrichment.submit(*source, new_doc.entry_id)
+                    continue
+
+                # the document only has the loaded fields, and save only writes the fields that change
+                db_doc = collection._from_son(db_raw, created=False)
+
+                if scenario == UPDATE:
+                    if new_doc.fingerprint != db_doc.fingerprint:
+                        db_doc.update(**record)
+                        db_doc.timestamp = datetime.datetime.now()
                         db_doc.save()
+                    elif db_raw['database_version'].get(new_db) != self.db_version.split('_')[1]:
+                        bumped.append(new_doc.entry_id)
+
+                else:
+                    self.integration_function(new_doc=new_doc, db_doc=db_doc, new_db=new_db)
+                    db_doc.database_version.update({new_db: self.db_version.split('_')[1]})
+                    db_doc.save()
 
-                        if new_db == 'plantcyc':
-                            new_str_attributes = new_doc.str_attributes()
-                            new_str_attributes_assigned = {k: v for k, v in new_str_attributes.items() if v is not None}
+                    if new_db == 'plantcyc' and len(db_raw.get('database_version') or {}) != 1:
+                        new_str_attributes = new_doc.str_attributes()
+                        new_str_attributes_assigned = {k: v for k, v in new_str_attributes.items() if v is not None}
 
-                            for att in new_str_attributes_assigned:
-                                if new_str_attributes_assigned[att] != getattr(db_doc, att):
-                                    setattr(db_doc, att, new_str_attributes_assigned[att])
+                        for att in new_str_attributes_assigned:
+                            if new_str_attributes_assigned[att] != getattr(db_doc, att):
+                                setattr(db_doc, att, new_str_attributes_assigned[att])
+                        db_doc.save()
+
+                        if isinstance(new_doc, Reaction):
+                            if new_doc.reactants != db_doc.reactants:
+                                db_doc.reactants = new_doc.reactants
+                            if new_doc.products != db_doc.products:
+                                db_doc.products = new_doc.products
                             db_doc.save()
 
-                            if isinstance(new_doc, Reaction):
-                                if new_doc.reactants != db_doc.reactants:
-                                    db_doc.reactants = new_doc.reactants
-                                if new_doc.products != db_doc.products:
-                                    db_doc.products = new_doc.products
-                                db_doc.save()
-
-                except DoesNotExist:
-
-                    if isinstance(new_doc, Enzyme) and new_doc.crossrefs:
-                        if 'UNIPROT' in new_doc.crossrefs:
-                            uniprot_info = get_uniprot_data(protein_id=new_doc.crossrefs['UNIPROT'])
-                            if uniprot_info:
-                                new_doc.uniprot_product = uniprot_info['uniprot_product']
-                                new_doc.uniprot_location = uniprot_info['uniprot_location']
-                                new_doc.uniprot_status = uniprot_info['uniprot_status']
-                                new_doc.uniprot_function = [uniprot_info['uniprot_function']]
-                                new_doc.sequence = uniprot_info['sequence']
-
-                        elif 'TAIR' in new_doc.crossrefs:
-                            new_doc.sequence = get_tair_protein(tair_id=new_doc.crossrefs["TAIR"])
-
-                    elif isinstance(new_doc, Gene) and new_doc.crossrefs:
-                        ncbi_id = None
-                        if 'ENTREZ' in new_doc.crossrefs:
-                            ncbi_id = new_doc.crossrefs['ENTREZ']
-                        elif 'REFSEQ' in new_doc.crossrefs:
-                            ncbi_id = new_doc.crossrefs['REFSEQ']
-
-                        if ncbi_id:
-                            seq = get_sequence_gene(ncbi_id=ncbi_id)
-                            new_doc.sequence = seq
+            bump_versions(collection._get_collection(), bumped, new_db, self.db_version.split('_')[1])
 
-                    new_doc.save()
+        self.enrichment.flush()
+
+        if removed_file is not None:
+            removed_ids = [rec['entry_id'] for rec in iter_json_records(removed_file)]
+            now = datetime.datetime.now()
+
+            collection.objects(entry_id__in=removed_ids, state=None).update(set__state='deprecated',
+                                                                            set__timestamp=now)
+
+            unchanged = {'database_version__' + new_db + '__exists': True, 'entry_id__nin': removed_ids,
+                         'state': None}
+            collection.objects(**unchanged).update(**{'set__database_version__' + new_db: self.db_version.split('_')[1],
+                                                      'set__timestamp': now})
 
-            new_db_ids = [rec["entry_id"] for rec in data]
+        elif self.bulk:
+            upsert.deprecate(new_db_ids)
 
+        else:
             db_recs = collection.objects.filter(database_version__startswith=new_db)
             for rec in db_recs:
                 if rec.entry_id not in new_db_ids and not rec.state:
@@ -137,6 +189,11 @@ class DatabaseMongoUpdate:
                 rec.timestamp = datetime.datetime.now()
                 rec.save()
 
+        if self.bulk:
+            self.counts[vars(collection)['_class_name']] = upsert.counts
+            logging.info('%s: %d inserted, %d modified and %d unchanged documents', vars(collection)['_class_name'],
+                         upsert.counts['inserted'], upsert.counts['modified'], upsert.counts['unchanged'])
+
         logging.info('The database collection ' + vars(collection)['_class_name'] + ' was updated')
 
     def update_all_collections(self):
@@ -144,14 +201,25 @@ class DatabaseMongoUpdate:
         Update all collections of the database
         """
 
-        new_files = ['metabolite.json', 'reaction.json', 'enzyme.json', 'gene.json', 'pathway.json', 'organism.json']
+        new_files = ['metabolite', 'reaction', 'enzyme', 'gene', 'pathway', 'organism']
 
-        new_files_path = [os.path.join(str(self.datasource), x) for x in new_files]
+        new_files_path = [find_json_file(str(self.datasource), x) for x in new_files]
 
-        check = files_exist(new_files_path)
+        check = None not in new_files_path
         if check:
+            self.enrichment.resume()
+
             for i in range(len(self.collections)):
-                self.update_collection(new_data_file=new_files_path[i], collection=self.collections[i])
+                delta_files = find_delta_files(str(self.datasource), new_files[i]) if self.delta else None
+
+                if delta_files:
+                    self.update_collection(new_data_file=[delta_files['added'], delta_files['changed']],
+                                           collection=self.collections[i], removed_file=delta_files['removed'])
+                else:
+                    self.update_collection(new_data_file=new_files_path[i], collection=self.collections[i])
+
+            logging.info('waiting for the enrichment of the new enzymes and genes: %s', self.enrichment.progress())
+            self.enrichment.close()
 
             message = 'The mongo database was updated'
 
@@ -163,6 +231,9 @@ class DatabaseMongoUpdate:
 
         with open(outputfile, 'w') as output:
             output.write(message)
+            for name, counts in self.counts.items():
+                output.write('\n%s: %d inserted, %d modified, %d unchanged' % (name, counts['inserted'],
+                                                                              counts['modified'], counts['unchanged']))
 
         logging.info(message)
 
@@ -1,27 +1,32 @@
 import os
-import json
 import logging
 import datetime
-from neomodel import config, match
+from itertools import chain
+from neomodel import config, match, db
 from iplants_neo.models import Metabolite, Reaction, Enzyme, Gene, Pathway, Organism
 from utils.config import PROJECT_PATH, Neo
-from utils.extract import files_exist
+from utils.extract import iter_json_records, find_json_file
+from utils.delta import find_delta_files
 
 logging.basicConfig(level=logging.DEBUG)
 
 
 class DatabaseNeoUpdate:
 
-    def __init__(self, db_version):
+    def __init__(self, db_version, delta=False):
         """
         Class to represent the Neo4j database
         Parameters
         ----------
         db_version: Union[str, Parameter]
             version of the cyc database
+        delta: bool
+            if True, the nodes are updated from the delta files (the records added, changed and removed since the
+            previous version) when they were written by the transform
         """
 
         self._db_version = db_version
+        self.delta = delta
 
         self.project_path = PROJECT_PATH
         self.datasource = os.path.join(self.project_path, 'json_files', self.db_version)
@@ -39,7 +44,66 @@ class DatabaseNeoUpdate:
     def db_version(self, value):
         self._db_version = value
 
-    def update_metabolite(self, new_data_file):
+    def iter_records(self, new_data_file):
+        """
+        Stream the records of one or more transformed files
+        Parameters
+        ----------
+        new_data_file: Union[str, list]
+            json or ndjson file (optionally compressed) or a list of files
+        Returns
+        -------
+        records: Iterator[dict]
+            records of the files
+        """
+        if isinstance(new_data_file, str):
+            new_data_file = [new_data_file]
+
+        return chain.from_iterable(iter_json_records(os.path.join(self.datasource, f)) for f in new_data_file)
+
+    def update_versions(self, node_class, new_db_ids, removed_file=None):
+        """
+        Update the database version of the nodes of the cyc database that are in the new version and set the state of
+        the others to 'deprecated'.
+        In delta mode (removed_file given), new_db_ids only has the added and changed nodes. The removed nodes are
+        deprecated and the database version of the other nodes of the cyc database is updated in a single query, so
+        the nodes that did not change are not loaded.
+        Parameters
+        ----------
+        node_class:
+            the node class to update
+        new_db_ids: set
+            identifiers of the nodes in the new data
+        removed_file: str, optional
+            file with the identifiers of the nodes removed since the previous version
+        """
+        new_db = self.db_version.split('_')[0]
+
+        if removed_file is None:
+            db_nodes = node_class.nodes.filter(database_version__startswith=new_db)
+            for node in db_nodes:
+                if node.entry_id not in new_db_ids and not node.state:
+                    node.state = 'deprecated'
+                elif node.entry_id in new_db_ids and (node.database_version.startswith(new_db) or
+                                                      not node.database_version):
+                    node.database_version = self.db_version
+                node.timestamp = datetime.datetime.now()
+                node.save()
+            return
+
+        params = {'db': new_db, 'version': self.db_version,
+                  'removed': [rec['entry_id'] for rec in iter_json_records(removed_file)],
+                  'timestamp': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+        db.cypher_query('MATCH (n:' + node_class.__label__ + ') WHERE n.database_version STARTS WITH $db '
+                        'AND n.entry_id IN $removed AND n.state IS NULL '
+                        'SET n.state = "deprecated", n.timestamp = $timestamp', params)
+
+        db.cypher_query('MATCH (n:' + node_class.__label__ + ') WHERE n.database_version STARTS WITH $db '
+                        'AND n.state IS NULL AND NOT n.entry_id IN $removed '
+                        'SET n.database_version = $version, n.timestamp = $timestamp', params)
+
+    def update_metabolite(self, new_data_file, removed_file=None):
         """
         Update database metabolites with new data. It considers four cenarios:
         1. If the metabolite already exists in the older version of that cyc database, it updates the name attribute
@@ -50,63 +114,58 @@ class DatabaseNeoUpdate:
 
         Parameters
         ----------
-        new_data_file: str
-            json file with new metabolite data
+        new_data_file: Union[str, list]
+            json or ndjson file (optionally compressed) with new metabolite data, or a list of files
+        removed_file: str, optional
+            file with the identifiers of the metabolites removed since the previous version. If given, new_data_file
+            only has the metabolites that were added or changed (see update_versions)
         Returns
         -------
         """
-        with open(os.path.join(self.datasource, new_data_file)) as json_data:
-            data = json.load(json_data)
+        data = self.iter_records(new_data_file)
 
-            new_db = self.db_version.split('_')[0]
+        new_db = self.db_version.split('_')[0]
 
-            for record in data:
-                new_met = Metabolite(entry_id=record['entry_id'])
+        new_db_ids = set()
+        for record in data:
+            new_db_ids.add(record['entry_id'])
 
-                if 'common_name' in record:
-                    new_met.name = record['common_name']
+            new_met = Metabolite(entry_id=record['entry_id'])
 
-                new_met.database_version = self.db_version
+            if 'common_name' in record:
+                new_met.name = record['common_name']
+
+            new_met.database_version = self.db_version
+
+            try:
+                db_met = Metabolite.nodes.get(entry_id=new_met.entry_id, database_version__startswith=new_db)
+                if hash(new_met) != hash(db_met):
+                    db_met.name = new_met.name
+                    db_met.timestamp = datetime.datetime.now()
+                    db_met.database_version = self.db_version
+                    db_met.save()
+
+            except Metabolite.DoesNotExist:
 
                 try:
-                    db_met = Metabolite.nodes.get(entry_id=new_met.entry_id, database_version__startswith=new_db)
-                    if hash(new_met) != hash(db_met):
+                    db_met = Metabolite.nodes.get(entry_id=new_met.entry_id)
+                    if not db_met.name and new_met.name:
                         db_met.name = new_met.name
-                        db_met.timestamp = datetime.datetime.now()
+                        db_met.save()
+                    if not db_met.database_version:
                         db_met.database_version = self.db_version
                         db_met.save()
 
                 except Metabolite.DoesNotExist:
+                    new_met.save()
 
-                    try:
-                        db_met = Metabolite.nodes.get(entry_id=new_met.entry_id)
-                        if not db_met.name and new_met.name:
-                            db_met.name = new_met.name
-                            db_met.save()
-                        if not db_met.database_version:
-                            db_met.database_version = self.db_version
-                            db_met.save()
-
-                    except Metabolite.DoesNotExist:
-                        new_met.save()
-
-                        logging.info('new metabolite ' + new_met.entry_id + ' was inserted in the database')
+                    logging.info('new metabolite ' + new_met.entry_id + ' was inserted in the database')
 
-            new_db_ids = set([rec["entry_id"] for rec in data])
-
-            db_mets = Metabolite.nodes.filter(database_version__startswith=new_db)
-            for node in db_mets:
-                if node.entry_id not in new_db_ids and not node.state:
-                    node.state = 'deprecated'
-                elif node.entry_id in new_db_ids and (node.database_version.startswith(new_db) or
-                                                      not node.database_version):
-                    node.database_version = self.db_version
-                node.timestamp = datetime.datetime.now()
-                node.save()
+        self.update_versions(node_class=Metabolite, new_db_ids=new_db_ids, removed_file=removed_file)
 
         logging.info('update of metabolites is complete')
 
-    def update_reaction(self, new_data_file):
+    def update_reaction(self, new_data_file, removed_file=None):
         """
         Update database reactions with new data. It considers four cenarios:
         1. If the reaction already exists in the older version of that cyc database, it updates the name attribute
@@ -118,71 +177,66 @@ class DatabaseNeoUpdate:
 
         Parameters
         ----------
-        new_data_file: str
-            json file with new reaction data
+        new_data_file: Union[str, list]
+            json or ndjson file (optionally compressed) with new reaction data, or a list of files
+        removed_file: str, optional
+            file with the identifiers of the reactions removed since the previous version. If given, new_data_file
+            only has the reactions that were added or changed (see update_versions)
         Returns
         -------
         """
 
-        with open(os.path.join(self.datasource, new_data_file)) as json_data:
-            data = json.load(json_data)
+        data = self.iter_records(new_data_file)
 
-            new_db = self.db_version.split('_')[0]
+        new_db = self.db_version.split('_')[0]
 
-            for record in data:
-                new_reac = Reaction(entry_id=record['entry_id'])
+        new_db_ids = set()
+        for record in data:
+            new_db_ids.add(record['entry_id'])
 
-                print(new_reac.entry_id)
+            new_reac = Reaction(entry_id=record['entry_id'])
 
-                if 'common_name' in record:
-                    new_reac.name = record['common_name']
+            print(new_reac.entry_id)
 
-                new_reac.database_version = self.db_version
+            if 'common_name' in record:
+                new_reac.name = record['common_name']
 
-                try:
-                    db_reac = Reaction.nodes.get(entry_id=new_reac.entry_id, database_version__startswith=new_db)
+            new_reac.database_version = self.db_version
 
-                    if hash(new_reac) != hash(db_reac):
-                        db_reac.name = new_reac.name
-                        db_reac.timestamp = datetime.datetime.now()
-                        db_reac.database_version = self.db_version
-                        db_reac.save()
+            try:
+                db_reac = Reaction.nodes.get(entry_id=new_reac.entry_id, database_version__startswith=new_db)
 
-                    create_reaction_mets_rels(entry_data=record, reac_node=db_reac, replace=True)
+                if hash(new_reac) != hash(db_reac):
+                    db_reac.name = new_reac.name
+                    db_reac.timestamp = datetime.datetime.now()
+                    db_reac.database_version = self.db_version
+                    db_reac.save()
 
-                except Reaction.DoesNotExist:
+                create_reaction_mets_rels(entry_data=record, reac_node=db_reac, replace=True)
 
-                    try:
-                        db_reac = Reaction.nodes.get(entry_id=new_reac.entry_id)
-                        if not db_reac.name and new_reac.name:
-                            db_reac.name = new_reac.name
-                        if not db_reac.database_version:
-                            db_reac.database_version = self.db_version
-                        db_reac.save()
+            except Reaction.DoesNotExist:
 
-                        if not db_reac.reactants and not db_reac.products:
-                            create_reaction_mets_rels(entry_data=record, reac_node=db_reac)
+                try:
+                    db_reac = Reaction.nodes.get(entry_id=new_reac.entry_id)
+                    if not db_reac.name and new_reac.name:
+                        db_reac.name = new_reac.name
+                    if not db_reac.database_version:
+                        db_reac.database_version = self.db_version
+                    db_reac.save()
 
-                    except Reaction.DoesNotExist:
-                        new_reac.save()
-                        create_reaction_mets_rels(entry_data=record, reac_node=new_reac)
-                        logging.info('new reaction ' + new_reac.entry_id + ' was inserted in the database')
+                    if not db_reac.reactants and not db_reac.products:
+                        create_reaction_mets_rels(entry_data=record, reac_node=db_reac)
 
-            new_db_ids = set([rec["entry_id"] for rec in data])
+                except Reaction.DoesNotExist:
+                    new_reac.save()
+                    create_reaction_mets_rels(entry_data=record, reac_node=new_reac)
+                    logging.info('new reaction ' + new_reac.entry_id + ' was inserted in the database')
 
-            db_reacs = Reaction.nodes.filter(database_version__startswith=new_db)
-            for node in db_reacs:
-                if node.entry_id not in new_db_ids and not node.state:
-                    node.state = 'deprecated'
-                elif node.entry_id in new_db_ids and (node.database_version.startswith(new_db) or
-                                                      not node.database_version):
-                    node.database_version = self.db_version
-                node.timestamp = datetime.datetime.now()
-                node.save()
+        self.update_versions(node_class=Reaction, new_db_ids=new_db_ids, removed_file=removed_file)
 
         logging.info('update of reactions is complete')
 
-    def update_enzyme(self, new_data_file):
+    def update_enzyme(self, new_data_file, removed_file=None):
         """
         Update database enzymes with new data. It considers four cenarios:
         1. If the enzyme already exists in the older version of that cyc database, it updates the name attribute
@@ -194,73 +248,68 @@ class DatabaseNeoUpdate:
 
         Parameters
         ----------
-        new_data_file: str
-            json file with new enzyme data
+        new_data_file: Union[str, list]
+            json or ndjson file (optionally compressed) with new enzyme data, or a list of files
+        removed_file: str, optional
+            file with the identifiers of the enzymes removed since the previous version. If given, new_data_file
+            only has the enzymes that were added or changed (see update_versions)
         Returns
         -------
         """
 
-        with open(os.path.join(self.datasource, new_data_file)) as json_data:
-            data = json.load(json_data)
+        data = self.iter_records(new_data_file)
 
-            new_db = self.db_version.split('_')[0]
+        new_db = self.db_version.split('_')[0]
 
-            for record in data:
-                new_enz = Enzyme(entry_id=record['entry_id'])
+        new_db_ids = set()
+        for record in data:
+            new_db_ids.add(record['entry_id'])
 
-                if 'common_name' in record:
-                    new_enz.name = record['common_name']
+            new_enz = Enzyme(entry_id=record['entry_id'])
 
-                new_enz.database_version = self.db_version
+            if 'common_name' in record:
+                new_enz.name = record['common_name']
+
+            new_enz.database_version = self.db_version
+
+            try:
+                db_enz = Enzyme.nodes.get(entry_id=new_enz.entry_id, database_version__startswith=new_db)
+                if hash(new_enz) != hash(db_enz):
+                    db_enz.name = new_enz.name
+                    db_enz.database_version = self.db_version
+                    db_enz.timestamp = datetime.datetime.now()
+                    db_enz.save()
+
+                create_enzyme_rels(entry_data=record, enz_node=db_enz, db=new_db)
+
+            except Enzyme.DoesNotExist:
+                pass
 
                 try:
-                    db_enz = Enzyme.nodes.get(entry_id=new_enz.entry_id, database_version__startswith=new_db)
-                    if hash(new_enz) != hash(db_enz):
+                    db_enz = Enzyme.nodes.get(entry_id=new_enz.entry_id)
+                    if not db_enz.name and new_enz.name:
                         db_enz.name = new_enz.name
+                        db_enz.save()
+                    if not db_enz.database_version:
                         db_enz.database_version = self.db_version
-                        db_enz.timestamp = datetime.datetime.now()
                         db_enz.save()
 
                     create_enzyme_rels(entry_data=record, enz_node=db_enz, db=new_db)
 
                 except Enzyme.DoesNotExist:
-                    pass
-
-                    try:
-                        db_enz = Enzyme.nodes.get(entry_id=new_enz.entry_id)
-                        if not db_enz.name and new_enz.name:
-                            db_enz.name = new_enz.name
-                            db_enz.save()
-                        if not db_enz.database_version:
-                            db_enz.database_version = self.db_version
-                            db_enz.save()
 
-                        create_enzyme_rels(entry_data=record, enz_node=db_enz, db=new_db)
+                    new_enz.save()
 
-                    except Enzyme.DoesNotExist:
+                    create_enzyme_rels(entry_data=record, enz_node=new_enz, db=new_db)
 
-                        new_enz.save()
+                    new_enz.timestamp = datetime.datetime.now()
+                    new_enz.save()
 
-                        create_enzyme_rels(entry_data=record, enz_node=new_enz, db=new_db)
-
-                        new_enz.timestamp = datetime.datetime.now()
-                        new_enz.save()
-
-            new_db_ids = set([rec["entry_id"] for rec in data])
-
-            db_enzs = Enzyme.nodes.filter(database_version__startswith=new_db)
-            for node in db_enzs:
-                if node.entry_id not in new_db_ids and not node.state:
-                    node.state = 'deprecated'
-                elif node.entry_id in new_db_ids and (node.database_version.startswith(new_db) or
-                                                      not node.database_version):
-                    node.database_version = self.db_version
-                node.timestamp = datetime.datetime.now()
-                node.save()
+        self.update_versions(node_class=Enzyme, new_db_ids=new_db_ids, removed_file=removed_file)
 
         logging.info('update of enzymes is complete')
 
-    def update_gene(self, new_data_file):
+    def update_gene(self, new_data_file, removed_file=None):
         """
         Update database genes with new data. It considers four cenarios:
         1. If the gene already exists in the older version of that cyc database, it updates the name attribute
@@ -272,70 +321,64 @@ class DatabaseNeoUpdate:
 
         Parameters
         ----------
-        new_data_file: str
-            json file with new gene data
+        new_data_file: Union[str, list]
+            json or ndjson file (optionally compressed) with new gene data, or a list of files
+        removed_file: str, optional
+            file with the identifiers of the genes removed since the previous version. If given, new_data_file
+            only has the genes that were added or changed (see update_versions)
         Returns
         -------
         """
-        with open(os.path.join(self.datasource, new_data_file)) as json_data:
-            data = json.load(json_data)
+        data = self.iter_records(new_data_file)
+
+        new_db = self.db_version.split('_')[0]
+
+        new_db_ids = set()
+        for record in data:
+            new_db_ids.add(record['entry_id'])
+
+            new_gene = Gene(entry_id=record['entry_id'])
+
+            if 'common_name' in record:
+                new_gene.name = record['common_name']
 
-            new_db = self.db_version.split('_')[0]
+            new_gene.database_version = self.db_version
 
-            for record in data:
-                new_gene = Gene(entry_id=record['entry_id'])
+            try:
+                db_gene = Gene.nodes.get(entry_id=new_gene.entry_id, database_version__startswith=new_db)
+                if hash(new_gene) != hash(db_gene):
+                    db_gene.name = new_gene.name
+                    db_gene.database_version = self.db_version
+                    db_gene.timestamp = datetime.datetime.now()
+                    db_gene.save()
 
-                if 'common_name' in record:
-                    new_gene.name = record['common_name']
+                create_gene_rels(entry_data=record, gene_node=db_gene, db=new_db)
 
-                new_gene.database_version = self.db_version
+            except Gene.DoesNotExist:
 
                 try:
-                    db_gene = Gene.nodes.get(entry_id=new_gene.entry_id, database_version__startswith=new_db)
-                    if hash(new_gene) != hash(db_gene):
+                    db_gene = Gene.nodes.get(entry_id=new_gene.entry_id)
+                    if not db_gene.name and new_gene.name:
                         db_gene.name = new_gene.name
+                        db_gene.save()
+                    if not db_gene.database_version:
                         db_gene.database_version = self.db_version
-                        db_gene.timestamp = datetime.datetime.now()
                         db_gene.save()
 
                     create_gene_rels(entry_data=record, gene_node=db_gene, db=new_db)
 
                 except Gene.DoesNotExist:
+                    new_gene.save()
 
-                    try:
-                        db_gene = Gene.nodes.get(entry_id=new_gene.entry_id)
-                        if not db_gene.name and new_gene.name:
-                            db_gene.name = new_gene.name
-                            db_gene.save()
-                        if not db_gene.database_version:
-                            db_gene.database_version = self.db_version
-                            db_gene.save()
-
-                        create_gene_rels(entry_data=record, gene_node=db_gene, db=new_db)
+                    create_gene_rels(entry_data=record, gene_node=new_gene, db=new_db)
 
-                    except Gene.DoesNotExist:
-                        new_gene.save()
+                    logging.info('new gene ' + new_gene.entry_id + ' was inserted in the database')
 
-                        create_gene_rels(entry_data=record, gene_node=new_gene, db=new_db)
-
-                        logging.info('new gene ' + new_gene.entry_id + ' was inserted in the database')
-
-            new_db_ids = set([rec["entry_id"] for rec in data])
-
-            db_genes = Gene.nodes.filter(database_version__startswith=new_db)
-            for node in db_genes:
-                if node.entry_id not in new_db_ids and not node.state:
-                    node.state = 'deprecated'
-                elif node.entry_id in new_db_ids and (node.database_version.startswith(new_db) or
-                                                      not node.database_version):
-                    node.database_version = self.db_version
-
-                node.timestamp = datetime.datetime.now()
-                node.save()
+        self.update_versions(node_class=Gene, new_db_ids=new_db_ids, removed_file=removed_file)
 
         logging.info('update of genes is complete')
 
-    def update_pathway(self, new_data_file):
+    def update_pathway(self, new_data_file, removed_file=None):
         """
         Update database pathways with new data. It considers four cenarios:
         1. If the pathway already exists in the older version of that cyc database, it updates the name attribute
@@ -347,65 +390,60 @@ class DatabaseNeoUpdate:
 
         Parameters
         ----------
-        new_data_file: str
-            json file with new pathway data
+        new_data_file: Union[str, list]
+            json or ndjson file (optionally compressed) with new pathway data, or a list of files
+        removed_file: str, optional
+            file with the identifiers of the pathways removed since the previous version. If given, new_data_file
+            only has the pathways that were added or changed (see update_versions)
         Returns
         -------
         """
 
-        with open(os.path.join(self.datasource, new_data_file)) as json_data:
-            data = json.load(json_data)
+        data = self.iter_records(new_data_file)
+
+        new_db = self.db_version.split('_')[0]
 
-            new_db = self.db_version.split('_')[0]
+        new_db_ids = set()
+        for record in data:
+            new_db_ids.add(record['entry_id'])
 
-            for record in data:
-                new_path = Pathway(entry_id=record['entry_id'])
+            new_path = Pathway(entry_id=record['entry_id'])
 
-                if 'common_name' in record:
-                    new_path.name = record['common_name']
+            if 'common_name' in record:
+                new_path.name = record['common_name']
 
-                new_path.database_version = self.db_version
+            new_path.database_version = self.db_version
+
+            try:
+                db_path = Pathway.nodes.get(entry_id=new_path.entry_id, database_version__startswith=new_db)
+                if new_path.name and new_path.name != db_path.name:
+                    db_path.name = new_path.name
+                    db_path.database_version = self.db_version
+                    db_path.timestamp = datetime.datetime.now()
+                    db_path.save()
+
+                create_path_rels(entry_data=record, path_node=db_path, db=new_db)
+
+            except Pathway.DoesNotExist:
 
                 try:
-                    db_path = Pathway.nodes.get(entry_id=new_path.entry_id, database_version__startswith=new_db)
-                    if new_path.name and new_path.name != db_path.name:
+                    db_path = Pathway.nodes.get(entry_id=new_path.entry_id)
+                    if not db_path.name and new_path.name:
                         db_path.name = new_path.name
+                        db_path.save()
+                    if not db_path.database_version:
                         db_path.database_version = self.db_version
-                        db_path.timestamp = datetime.datetime.now()
                         db_path.save()
 
                     create_path_rels(entry_data=record, path_node=db_path, db=new_db)
 
                 except Pathway.DoesNotExist:
 
-                    try:
-                        db_path = Pathway.nodes.get(entry_id=new_path.entry_id)
-                        if not db_path.name and new_path.name:
-                            db_path.name = new_path.name
-                            db_path.save()
-                        if not db_path.database_version:
-                            db_path.database_version = self.db_version
-                            db_path.save()
-
-                        create_path_rels(entry_data=record, path_node=db_path, db=new_db)
-
-                    except Pathway.DoesNotExist:
-
-                        new_path.save()
+                    new_path.save()
 
-                        create_path_rels(entry_data=record, path_node=new_path, db=new_db)
+                    create_path_rels(entry_data=record, path_node=new_path, db=new_db)
 
-            new_db_ids = set([rec["entry_id"] for rec in data])
-
-            db_paths = Pathway.nodes.filter(database_version__startswith=new_db)
-            for node in db_paths:
-                if node.entry_id not in new_db_ids and not node.state:
-                    node.state = 'deprecated'
-                elif node.entry_id in new_db_ids and (node.database_version.startswith(new_db) or
-                                                      not node.database_version):
-                    node.database_version = self.db_version
-                node.timestamp = datetime.datetime.now()
-                node.save()
+        self.update_versions(node_class=Pathway, new_db_ids=new_db_ids, removed_file=removed_file)
 
         logging.info('update of pathways is complete')
 
@@ -414,16 +452,22 @@ class DatabaseNeoUpdate:
         update all info in the database
         """
 
-        new_files = ['metabolite.json', 'reaction.json', 'enzyme.json', 'gene.json', 'pathway.json']
-        new_files_path = [os.path.join(str(self.datasource), x) for x in new_files]
+        new_files = ['metabolite', 'reaction', 'enzyme', 'gene', 'pathway']
+        new_files_path = [find_json_file(str(self.datasource), x) for x in new_files]
 
-        check = files_exist(new_files_path)
+        check = None not in new_files_path
         if check:
-            self.update_metabolite(new_data_file=new_files_path[0])
-            self.update_reaction(new_data_file=new_files_path[1])
-            self.update_enzyme(new_data_file=new_files_path[2])
-            self.update_gene(new_data_file=new_files_path[3])
-            self.update_pathway(new_data_file=new_files_path[4])
+            updates = [self.update_metabolite, self.update_reaction, self.update_enzyme, self.update_gene,
+                       self.update_pathway]
+
+            for i in range(len(updates)):
+                delta_files = find_delta_files(str(self.datasource), new_files[i]) if self.delta else None
+
+                if delta_files:
+                    updates[i](new_data_file=[delta_files['added'], delta_files['changed']],
+                               removed_file=delta_files['removed'])
+                else:
+                    updates[i](new_data_file=new_files_path[i])
 
             message = 'The neo4j database was updated'
 
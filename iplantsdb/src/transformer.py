@@ -1,16 +1,24 @@
 import os
-import re
+import json
+import time
+import shutil
+import random
 import logging
+from typing import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from abc import ABCMeta, abstractmethod
-from pydantic import BaseModel
-from utils.extract import data_by_record, write_json, get_coeffs_reactions, get_enzrxn_data, get_coeffs_complexes, \
-    get_enz_type_genes
-import taxoniq
+from pydantic import BaseModel, ValidationError
+from utils.extract import write_json_records, iter_json_records, JSON_FORMATS
+from utils.columnar import write_columnar
+from utils.delta import write_deltas, previous_version, record_digest, DELTA_FOLDER, FINGERPRINT_FIELD
+from utils.timing import StageTimer, MemoryPeak, peak_rss_mb
+from utils.pgdb import ParsedPGDB
+from utils.taxonomy import TaxonomyResolver
+from utils.tokenizers import strip_html, parse_dblink, parse_pathway_link, parse_formula
 
 logging.basicConfig(level=logging.DEBUG)
 
 from utils.config import PROJECT_PATH
-from utils.extract import taxid_biocyc_api
 
 
 class Metabolite(BaseModel):
@@ -23,7 +31,8 @@ class Metabolite(BaseModel):
     inchi: str = None
     inchikey: str = None
     smiles: str = None
-    database_version: str = None
+    database_version: dict = None
+    fingerprint: str = None
 
 
 class Reaction(BaseModel):
@@ -44,7 +53,8 @@ class Reaction(BaseModel):
     by_complex: bool = None
     sub_reactions: dict = None
     compartment: dict = None
-    database_version: str = None
+    database_version: dict = None
+    fingerprint: str = None
 
 
 class Enzyme(BaseModel):
@@ -58,7 +68,8 @@ class Enzyme(BaseModel):
     protein_type: str = None
     components: dict = None
     component_of: dict = None
-    database_version: str = None
+    database_version: dict = None
+    fingerprint: str = None
     uniprot_product: str = None
     uniprot_status: str = None
     uniprot_function: str = None
@@ -73,7 +84,8 @@ class Gene(BaseModel):
     crossrefs: dict = None
     reactions: dict = None
     enzymes: dict = None
-    database_version: str = None
+    database_version: dict = None
+    fingerprint: str = None
     sequence: str = None
 
 
@@ -85,7 +97,8 @@ class Pathway(BaseModel):
     organisms: dict = None
     pathway_links: dict = None
     super_pathways: list = None
-    database_version: str = None
+    database_version: dict = None
+    fingerprint: str = None
 
 
 class Organism(BaseModel):
@@ -104,7 +117,8 @@ class Organism(BaseModel):
     pathways: dict = None
     genes: dict = None
     enzymes: dict = None
-    database_version: str = None
+    database_version: dict = None
+    fingerprint: str = None
 
 
 class Transformer(metaclass=ABCMeta):
@@ -112,11 +126,14 @@ class Transformer(metaclass=ABCMeta):
     Abstract base class for all transformers
     """
 
-    def __init__(self, data_path, db_version):
+    collection = None
+    model = None
+
+    def __init__(self, data_path, db_version, pgdb=None, validation_rate=0.0, output_format='ndjson'):
         """
-        A transformer must implement the transform method that will transform the data to load to the database.
-        The data to transform should in a file enconded in the source attribute.
-        The transformed data is saved into a json file
+        A transformer must implement the build_records method that yields the transformed records to load to the
+        database. The data to transform should in a file enconded in the source attribute.
+        The transformed records are streamed into a json file of the collection
 
         Parameters
         ----------
@@ -124,17 +141,32 @@ class Transformer(metaclass=ABCMeta):
             the json_path of the file containing the information to extract from the cyc database
         db_version: Union[str, Parameter]
             version of the source database (e.g. Plantcyc_15.0)
+        pgdb: ParsedPGDB, optional
+            parsed data of the cyc database. It should be shared by all transformers of a transform run, so that each
+            dat file is parsed once. If not given, the transformer parses the files it needs.
+        validation_rate: float
+            fraction of the transformed records that are validated against the pydantic model of the transformer.
+            The records are built as plain dicts, so by default they are not validated.
+        output_format: str
+            format of the output file: 'ndjson' (one record per line), 'ndjson.gz', 'ndjson.zst' or 'json' (a list)
         """
+        if output_format not in JSON_FORMATS:
+            raise ValueError('output_format must be one of ' + ', '.join(JSON_FORMATS))
 
         self._datasource = data_path
+        self.pgdb = pgdb if pgdb is not None else ParsedPGDB(data_path)
         self._db_version = db_version
         self.db_name = self.db_version.split('_')[0]
+        self.validation_rate = validation_rate
+        self.output_format = output_format
 
         self.project_path = PROJECT_PATH
 
         self.output_folder = os.path.join(self.project_path, 'json_files', self.db_version)
-        if not os.path.isdir(self.output_folder):
-            os.mkdir(self.output_folder)
+        os.makedirs(self.output_folder, exist_ok=True)
+
+        self.timer = StageTimer()
+        self.stats = {}
 
     @property
     def datasource(self) -> str:
@@ -143,6 +175,7 @@ class Transformer(metaclass=ABCMeta):
     @datasource.setter
     def datasource(self, value):
         self._datasource = value
+        self.pgdb = ParsedPGDB(value)
 
     @property
     def db_version(self) -> str:
@@ -152,19 +185,149 @@ class Transformer(metaclass=ABCMeta):
     def db_version(self, value):
         self._db_version = value
 
-    @abstractmethod
-    def transform(self):
+    @property
+    def output_file(self) -> str:
+        return os.path.join(self.output_folder, self.collection + '.' + self.output_format)
+
+    @staticmethod
+    def fingerprinted(records: Iterable[dict]) -> Iterator[dict]:
+        """
+        Yield the transformed records with the fingerprint of their content (see utils.delta.record_digest), which is
+        stored with the documents, so that the update of the database and the delta files can skip the records that
+        did not change
+        Parameters
+        ----------
+        records: Iterable[dict]
+            transformed records
+
+        Yields
+        ------
+        record: dict
+            transformed record with its fingerprint
+        """
+        for record in records:
+            record[FINGERPRINT_FIELD] = record_digest(record)
+            yield record
+
+    def validated(self, records: Iterable[dict]) -> Iterator[dict]:
+        """
+        Yield the transformed records, validating a random sample of them against the pydantic model of the
+        transformer. The invalid records are logged and the number of invalid records is kept in invalid_records.
+        Parameters
+        ----------
+        records: Iterable[dict]
+            transformed records
+
+        Yields
+        ------
+        record: dict
+            transformed record
+        """
+        self.invalid_records = 0
+
+        if not self.validation_rate:
+            yield from records
+            return
+
+        sampler = random.Random(0)
+        checked = 0
+        for record in records:
+            if sampler.random() < self.validation_rate:
+                checked += 1
+                try:
+                    self.model(**record)
+                except ValidationError as e:
+                    self.invalid_records += 1
+                    logging.warning('%s %s is not valid: %s', self.model.__name__, record.get('entry_id'), e)
+
+            yield record
+
+        logging.info('%d of %d sampled %s records are not valid', self.invalid_records, checked,
+                     self.model.__name__)
+
+    def validate(self, records: Iterable[dict]) -> int:
         """
-        Abstract method to transform the input data into json file to load into the database
+        Validate a random sample of the transformed records against the pydantic model of the transformer. The invalid
+        records are logged.
+        Parameters
+        ----------
+        records: Iterable[dict]
+            transformed records
+
         Returns
         -------
+        invalid: int
+            number of sampled records that are not valid
+        """
+        for _ in self.validated(records):
+            pass
+
+        return self.invalid_records
+
+    @abstractmethod
+    def build_records(self) -> Iterator[dict]:
+        """
+        Abstract method that yields the records transformed from the input data
+        Yields
+        ------
+        record: dict
+            transformed record
         """
         pass
 
+    def transform(self, trace_memory: bool = False) -> int:
+        """
+        Transform the input data and stream the records into the output file of the collection, so that the
+        collection is never held in memory. The files of the collection written in other formats are removed.
+        The time spent in each stage (parse, index, build, fingerprint, validate and write), the records per second
+        and the peak resident memory of the process are kept in the stats attribute.
+        Parameters
+        ----------
+        trace_memory: bool
+            if True, the peak memory allocated by the transformer alone is traced (see utils.timing.MemoryPeak) and
+            kept in the stats too. The tracing makes the transform several times slower
+        Returns
+        -------
+        n_records: int
+            number of records written
+        """
+        self.timer = StageTimer()
+        start = time.perf_counter()
+
+        with MemoryPeak(enabled=trace_memory) as memory, self.timer.stage('write'):
+            records = self.timer.timed(self.build_records(), 'build')
+            records = self.timer.timed(self.fingerprinted(records), 'fingerprint')
+            records = self.timer.timed(self.validated(records), 'validate')
+            n_records = write_json_records(records, self.output_file)
+
+        wall_time = time.perf_counter() - start
+
+        for output_format in JSON_FORMATS:
+            old_file = os.path.join(self.output_folder, self.collection + '.' + output_format)
+            if old_file != self.output_file and os.path.exists(old_file):
+                os.remove(old_file)
+
+        self.stats = {'records': n_records,
+                      'wall_time': wall_time,
+                      'records_per_second': n_records / wall_time if wall_time else 0.0,
+                      'process_peak_rss_mb': peak_rss_mb(),
+                      'stages': dict(self.timer.stages)}
+        if trace_memory:
+            self.stats['peak_memory_mb'] = memory.peak_mb
+
+        logging.info('%s data was transformed and %s was written', self.collection, self.output_file)
+        logging.info('%s: %d records in %.2f s (%s)', self.collection, n_records, wall_time,
+                     ', '.join('%s %.2f s' % stage for stage in self.timer.stages.items()))
+
+        return n_records
+
 
 class TransformerMetabolite(Transformer):
 
-    def __init__(self, data_path, db_version):
+    collection = 'metabolite'
+    model = Metabolite
+
+    def __init__(self, data_path, db_version, pgdb=None, validation_rate=0.0, output_format='ndjson'):
         """
         Transforms the metabolite data of the cyc database. It reads the compounds.dat file and saves the information
         of each metabolite in a structured Metabolite object.
@@ -174,14 +337,20 @@ class TransformerMetabolite(Transformer):
             the json_path of the compounds.dat file of the cyc database
         db_version: Union[str, Parameter]
             version of the database
+        pgdb: ParsedPGDB, optional
+            parsed data of the cyc database shared with the other transformers
+        validation_rate: float
+            fraction of the transformed records that are validated against the pydantic model
+        output_format: str
+            format of the output file: 'ndjson', 'ndjson.gz', 'ndjson.zst' or 'json'
         """
 
-        super().__init__(data_path, db_version)
+        super().__init__(data_path, db_version, pgdb, validation_rate, output_format)
 
-    def transform(self):
+    def build_records(self) -> Iterator[dict]:
         """
         Reads the compounds.dat file to extract the following info and
-        writes a json file with metabolite instances:
+        yields the metabolite instances:
         - entry_id
         - common_name
         - synonyms
@@ -191,66 +360,54 @@ class TransformerMetabolite(Transformer):
         - inchikey
         - smiles
 
-        Returns
-        -------
-        all_metabolites: list
-            list of dicts with metabolite information
+        Yields
+        ------
+        new_met: dict
+            metabolite information
         """
 
-        filepath = os.path.join(self.datasource, 'compounds.dat')
+        data = self.timer.timed(self.pgdb.iter_records('compounds.dat'), 'parse')
 
-        data = data_by_record(filepath)
-
-        all_metabolites = []
         for met_dic in data:
             met_id = met_dic['UNIQUE-ID'][0]
-            new_met = Metabolite(entry_id=met_id)
+            new_met = {'entry_id': met_id}
 
-            new_met.database_version = {self.db_name: self.db_version.split('_')[1]}
+            new_met['database_version'] = {self.db_name: self.db_version.split('_')[1]}
 
             if 'COMMON-NAME' in met_dic:
-                new_met.common_name = re.sub('<[^<]+?>', '', met_dic['COMMON-NAME'][0])
+                new_met['common_name'] = strip_html(met_dic['COMMON-NAME'][0])
 
             if 'SYNONYMS' in met_dic:
-                new_met.synonyms = [re.sub('<[^<]+?>', '', x) for x in met_dic['SYNONYMS']]
+                new_met['synonyms'] = [strip_html(x) for x in met_dic['SYNONYMS']]
 
             if 'DBLINKS' in met_dic:
-                new_met.crossrefs = {}
+                new_met['crossrefs'] = {}
                 for dblink in met_dic['DBLINKS']:
-                    ref = dblink.split('NIL')[0][:-1]
-                    db = re.search('\((.*?) ', ref).group()[1:-1]
-                    db_id = re.search('"(.*?)"', ref).group()[1:-1]
-                    new_met.crossrefs[db] = db_id
+                    ref = parse_dblink(dblink)
+                    if ref:
+                        new_met['crossrefs'][ref[0]] = ref[1]
 
             if 'CHEMICAL-FORMULA' in met_dic:
-                form = ''.join(met_dic['CHEMICAL-FORMULA']).replace('(', '').replace(')', '').replace(' ', '')
-                new_met.formula = form
+                new_met['formula'] = parse_formula(met_dic['CHEMICAL-FORMULA'])
             if 'INCHI' in met_dic:
-                new_met.inchi = met_dic['INCHI'][0]
+                new_met['inchi'] = met_dic['INCHI'][0]
             if 'INCHI-KEY' in met_dic:
-                new_met.inchikey = met_dic['INCHI-KEY'][0]
+                new_met['inchikey'] = met_dic['INCHI-KEY'][0]
             if 'SMILES' in met_dic:
-                new_met.smiles = met_dic['SMILES'][0]
+                new_met['smiles'] = met_dic['SMILES'][0]
 
             if 'TYPES' in met_dic:
-                new_met.met_type = met_dic['TYPES']
-
-            new_met_json = new_met.dict()
-            new_met_json = {k: v for k, v in new_met_json.items() if v is not None}
+                new_met['met_type'] = met_dic['TYPES']
 
-            all_metabolites.append(new_met_json)
-
-        output_file = os.path.join(self.output_folder, 'metabolite.json')
-        write_json(all_metabolites, output_file)
-
-        logging.info('metabolite data was transformed and ' + output_file + ' was written')
-
-        return all_metabolites
+            yield new_met
 
 
 class TransformerReaction(Transformer):
 
-    def __init__(self, data_path, db_version):
+    collection = 'reaction'
+    model = Reaction
+
+    def __init__(self, data_path, db_version, pgdb=None, validation_rate=0.0, output_format='ndjson'):
         """
         Transforms the reaction data of the cyc database. It reads the reactions.dat file and saves the information
         of each reaction in a structured Reaction object.
@@ -260,14 +417,20 @@ class TransformerReaction(Transformer):
             the folder of the reactions.dat file of the cyc database
         db_version: Union[str, Parameter]
             version of the database
+        pgdb: ParsedPGDB, optional
+            parsed data of the cyc database shared with the other transformers
+        validation_rate: float
+            fraction of the transformed records that are validated against the pydantic model
+        output_format: str
+            format of the output file: 'ndjson', 'ndjson.gz', 'ndjson.zst' or 'json'
         """
 
-        super().__init__(data_path, db_version)
+        super().__init__(data_path, db_version, pgdb, validation_rate, output_format)
 
-    def transform(self):
+    def build_records(self) -> Iterator[dict]:
         """
         Reads the reactions.dat file to extract the following info and
-        writes a json file with reaction instances:
+        yields the reaction instances:
         - entry_id
         - common_name
         - synonyms
@@ -287,107 +450,93 @@ class TransformerReaction(Transformer):
         - instance reactions
         - sub reactions
 
-        Returns
-        -------
-        all_reactions: list
-            list of dicts with reaction information
+        Yields
+        ------
+        new_reac: dict
+            reaction information
         """
 
-        try:
-            filepath = os.path.join(self.datasource, 'reactions.dat')
-            data = data_by_record(filepath)
-        except FileNotFoundError:
-            filepath = os.path.join(self.datasource, '#reactions.dat#')
-            data = data_by_record(filepath)
-
-        all_reactions = []
-
-        coeffs = get_coeffs_reactions(reac_file=filepath)
+        data = self.timer.timed(self.pgdb.iter_records('reactions.dat'), 'parse')
 
-        enzs = get_enzrxn_data(db_path=self.datasource, for_rxn=True)
+        with self.timer.stage('index'):
+            enzs = self.pgdb.rxn_enzs
 
-        enz_data = get_enz_type_genes(self.datasource)
+            enz_data = self.pgdb.enzyme_types
 
         for reac_dic in data:
             reac_id = reac_dic['UNIQUE-ID'][0]
-            new_reac = Reaction(entry_id=reac_id)
+            new_reac = {'entry_id': reac_id}
 
-            new_reac.database_version = {self.db_name: self.db_version.split('_')[1]}
+            new_reac['database_version'] = {self.db_name: self.db_version.split('_')[1]}
 
             if 'COMMON-NAME' in reac_dic:
-                new_reac.common_name = re.sub('<[^<]+?>', '', reac_dic['COMMON-NAME'][0])
+                new_reac['common_name'] = strip_html(reac_dic['COMMON-NAME'][0])
 
             if 'SYNONYMS' in reac_dic:
-                new_reac.synonyms = [re.sub('<[^<]+?>', '', x) for x in reac_dic['SYNONYMS']]
+                new_reac['synonyms'] = [strip_html(x) for x in reac_dic['SYNONYMS']]
 
             if 'DBLINKS' in reac_dic:
-                new_reac.crossrefs = {}
+                new_reac['crossrefs'] = {}
                 for dblink in reac_dic['DBLINKS']:
-                    ref = dblink.split('NIL')[0][:-1]
-                    db = re.search('\((.*?) ', ref).group()[1:-1]
-                    db_id = re.search('"(.*?)"', ref).group()[1:-1]
-                    new_reac.crossrefs[db] = db_id
+                    ref = parse_dblink(dblink)
+                    if ref:
+                        new_reac['crossrefs'][ref[0]] = ref[1]
 
             if 'EC-NUMBER' in reac_dic:
-                new_reac.ecnumber = reac_dic['EC-NUMBER'][0]
+                new_reac['ecnumber'] = reac_dic['EC-NUMBER'][0]
 
-            new_reac.upper_bound = 100000
+            new_reac['upper_bound'] = 100000
 
             if 'REACTION-DIRECTION' in reac_dic:
                 dire = reac_dic['REACTION-DIRECTION'][0]
 
                 if dire == 'REVERSIBLE':
-                    new_reac.direction = dire
-                    new_reac.lower_bound = -100000
+                    new_reac['direction'] = dire
+                    new_reac['lower_bound'] = -100000
 
                 else:
-                    new_reac.direction = 'IRREVERSIBLE'
-                    new_reac.lower_bound = 0
+                    new_reac['direction'] = 'IRREVERSIBLE'
+                    new_reac['lower_bound'] = 0
 
             else:
-                new_reac.direction = 'REVERSIBLE'
+                new_reac['direction'] = 'REVERSIBLE'
 
-            if 'LEFT' in reac_dic:
-                mets_left = {m: coeffs[reac_id]['LEFT'][m] for m in reac_dic['LEFT']}
+            if new_reac['direction'] == 'REVERSIBLE' or 'LEFT-TO-RIGHT' in reac_dic['REACTION-DIRECTION'][0]:
+                reactants_side, products_side = 'LEFT', 'RIGHT'
             else:
-                mets_left = None
+                reactants_side, products_side = 'RIGHT', 'LEFT'
 
-            if 'RIGHT' in reac_dic:
-                mets_right = {m: coeffs[reac_id]['RIGHT'][m] for m in reac_dic['RIGHT']}
-            else:
-                mets_right = None
-
-            if new_reac.direction == 'REVERSIBLE' or 'LEFT-TO-RIGHT' in reac_dic['REACTION-DIRECTION'][0]:
-                new_reac.reactants = mets_left
-                new_reac.products = mets_right
+            if reactants_side in reac_dic:
+                new_reac['reactants'] = {m: reac_dic.annotation(reactants_side, m, 'COEFFICIENT', 1.0)
+                                         for m in reac_dic[reactants_side]}
 
-            else:
-                new_reac.products = mets_left
-                new_reac.reactants = mets_right
+            if products_side in reac_dic:
+                new_reac['products'] = {m: reac_dic.annotation(products_side, m, 'COEFFICIENT', 1.0)
+                                        for m in reac_dic[products_side]}
 
             if 'IN-PATHWAY' in reac_dic:
-                new_reac.in_pathway = {self.db_name: [x for x in reac_dic['IN-PATHWAY'] if 'RXN' not in x]}
+                new_reac['in_pathway'] = {self.db_name: [x for x in reac_dic['IN-PATHWAY'] if 'RXN' not in x]}
 
             if 'TYPES' in reac_dic:
                 if 'Transport-Reactions' in reac_dic['TYPES']:
-                    new_reac.reaction_type = 'TRANSPORT'
+                    new_reac['reaction_type'] = 'TRANSPORT'
                 else:
-                    new_reac.reaction_type = 'ENZYMATIC'
+                    new_reac['reaction_type'] = 'ENZYMATIC'
 
             if 'REACTION-LIST' in reac_dic:
-                new_reac.sub_reactions = {self.db_name: reac_dic['REACTION-LIST']}
+                new_reac['sub_reactions'] = {self.db_name: reac_dic['REACTION-LIST']}
 
             if 'RXN-LOCATIONS' in reac_dic:
-                new_reac.compartment = {self.db_name: reac_dic['RXN-LOCATIONS']}
+                new_reac['compartment'] = {self.db_name: reac_dic['RXN-LOCATIONS']}
 
             if reac_id in enzs:
-                new_reac.enzymes = {self.db_name: enzs[reac_id]}
+                new_reac['enzymes'] = {self.db_name: enzs[reac_id]}
             else:
-                new_reac.enzymes = {self.db_name: []}
+                new_reac['enzymes'] = {self.db_name: []}
 
             genes = []
 
-            for enz in new_reac.enzymes[self.db_name]:
+            for enz in new_reac['enzymes'][self.db_name]:
                 if 'GENES' in enz_data[enz]:
                     enz_genes = enz_data[enz]['GENES']
                     genes.extend(enz_genes)
@@ -396,28 +545,21 @@ class TransformerReaction(Transformer):
                     enz_type = enz_data[enz]['TYPE']
 
                     if enz_type == 'Protein-Complexes':
-                        new_reac.by_complex = True
-
-            new_reac.genes = {self.db_name: list(set(genes))}
-            if not new_reac.by_complex:
-                new_reac.by_complex = False
+                        new_reac['by_complex'] = True
 
-            new_reac_json = new_reac.dict()
-            new_reac_json = {k: v for k, v in new_reac_json.items() if v is not None}
+            new_reac['genes'] = {self.db_name: list(set(genes))}
+            if 'by_complex' not in new_reac:
+                new_reac['by_complex'] = False
 
-            all_reactions.append(new_reac_json)
-
-        output_file = os.path.join(self.output_folder, 'reaction.json')
-        write_json(all_reactions, output_file)
-
-        logging.info('reaction data was transformed and ' + output_file + ' was written')
-
-        return all_reactions
+            yield new_reac
 
 
 class TransformerEnzyme(Transformer):
 
-    def __init__(self, data_path, db_version):
+    collection = 'enzyme'
+    model = Enzyme
+
+    def __init__(self, data_path, db_version, pgdb=None, validation_rate=0.0, output_format='ndjson'):
         """
         Transforms the enzyme data of the cyc database. It reads the proteins.dat file and saves the information
         of each enzyme in a structured Enzyme object.
@@ -427,14 +569,20 @@ class TransformerEnzyme(Transformer):
             the folder of the proteins.dat file of the cyc database
         db_version: Union[str, Parameter]
             version of the database
+        pgdb: ParsedPGDB, optional
+            parsed data of the cyc database shared with the other transformers
+        validation_rate: float
+            fraction of the transformed records that are validated against the pydantic model
+        output_format: str
+            format of the output file: 'ndjson', 'ndjson.gz', 'ndjson.zst' or 'json'
         """
 
-        super().__init__(data_path, db_version)
+        super().__init__(data_path, db_version, pgdb, validation_rate, output_format)
 
-    def transform(self):
+    def build_records(self) -> Iterator[dict]:
         """
         Reads the proteins.dat file to extract the following info and
-        writes a json file with enzymes instances:
+        yields the enzymes instances:
         - entry_id
         - common_name
         - synonyms
@@ -447,84 +595,76 @@ class TransformerEnzyme(Transformer):
         - organisms
         - database version
 
-        Returns
-        -------
-        all_enzymes: list
-            list of dicts with enzyme information
+        Yields
+        ------
+        new_enz: dict
+            enzyme information
         """
 
-        filepath = os.path.join(self.datasource, 'proteins.dat')
+        with self.timer.stage('parse'):
+            data = self.pgdb.records('proteins.dat')
 
-        data = data_by_record(filepath)
+        with self.timer.stage('index'):
+            rxns = self.pgdb.enz_rxns
 
-        rxns = get_enzrxn_data(db_path=self.datasource, for_rxn=False)
+            comp_coeffs = self.pgdb.complex_coefficients
 
-        all_enzymes = []
         for enz_dic in data:
             enz_id = enz_dic['UNIQUE-ID'][0]
-            new_enz = Enzyme(entry_id=enz_id)
+            new_enz = {'entry_id': enz_id}
 
-            new_enz.database_version = {self.db_name: self.db_version.split('_')[1]}
+            new_enz['database_version'] = {self.db_name: self.db_version.split('_')[1]}
 
             if 'COMMON-NAME' in enz_dic:
-                new_enz.common_name = re.sub('<[^<]+?>', '', enz_dic['COMMON-NAME'][0])
+                new_enz['common_name'] = strip_html(enz_dic['COMMON-NAME'][0])
 
             if 'SYNONYMS' in enz_dic:
-                new_enz.synonyms = [re.sub('<[^<]+?>', '', x) for x in enz_dic['SYNONYMS']]
+                new_enz['synonyms'] = [strip_html(x) for x in enz_dic['SYNONYMS']]
 
             if 'TYPES' in enz_dic:
-                new_enz.protein_type = enz_dic['TYPES'][0]
+                new_enz['protein_type'] = enz_dic['TYPES'][0]
 
-            if 'DBLINKS' in enz_dic and new_enz.protein_type != 'Protein-Complexes':
-                new_enz.crossrefs = {}
+            if 'DBLINKS' in enz_dic and new_enz.get('protein_type') != 'Protein-Complexes':
+                new_enz['crossrefs'] = {}
                 for dblink in enz_dic['DBLINKS']:
-                    ref = dblink.split('NIL ')[0][:-1]
-                    db = re.search('\((.*?) ', ref).group()[1:-1].strip()
-                    db_id = re.search('"(.*?)"', ref).group()[1:-1].strip()
-                    new_enz.crossrefs[db] = db_id
+                    ref = parse_dblink(dblink)
+                    if ref:
+                        new_enz['crossrefs'][ref[0].strip()] = ref[1].strip()
 
             if 'GENE' in enz_dic:
-                new_enz.genes = {self.db_name: enz_dic['GENE']}
+                new_enz['genes'] = {self.db_name: enz_dic['GENE']}
 
             if 'SPECIES' in enz_dic:
-                new_enz.organisms = {self.db_name: enz_dic['SPECIES']}
+                new_enz['organisms'] = {self.db_name: enz_dic['SPECIES']}
 
             if 'COMPONENT-OF' in enz_dic:
-                new_enz.component_of = {self.db_name: enz_dic['COMPONENT-OF']}
+                new_enz['component_of'] = {self.db_name: enz_dic['COMPONENT-OF']}
 
             if 'COMPONENTS' in enz_dic:
-                comp_coeffs = get_coeffs_complexes(self.datasource)
-                new_enz.components = {self.db_name: comp_coeffs[enz_id]}
+                new_enz['components'] = {self.db_name: comp_coeffs[enz_id]}
 
             if enz_id in rxns:
-                new_enz.reactions = {self.db_name: rxns[enz_id]}
+                new_enz['reactions'] = {self.db_name: list(rxns[enz_id])}
             else:
-                new_enz.reactions = {self.db_name: []}
+                new_enz['reactions'] = {self.db_name: []}
 
-            if new_enz.component_of:
+            if 'component_of' in new_enz:
                 complex_reacs = []
-                for cplx in new_enz.component_of[self.db_name]:
+                for cplx in new_enz['component_of'][self.db_name]:
                     if cplx in rxns:
                         complex_reacs.extend(rxns[cplx])
 
-                new_enz.reactions[self.db_name].extend(list(set(complex_reacs)))
-
-            new_enz_json = new_enz.dict()
-            new_enz_json = {k: v for k, v in new_enz_json.items() if v is not None}
-
-            all_enzymes.append(new_enz_json)
+                new_enz['reactions'][self.db_name].extend(list(set(complex_reacs)))
 
-        output_file = os.path.join(self.output_folder, 'enzyme.json')
-        write_json(all_enzymes, output_file)
-
-        logging.info('enzyme data was transformed and ' + output_file + ' was written')
-
-        return all_enzymes
+            yield new_enz
 
 
 class TransformerGene(Transformer):
 
-    def __init__(self, data_path, db_version):
+    collection = 'gene'
+    model = Gene
+
+    def __init__(self, data_path, db_version, pgdb=None, validation_rate=0.0, output_format='ndjson'):
         """
         Transforms the gene data of the cyc database. It reads the genes.dat file and saves the information
         of each gene in a structured Gene object.
@@ -534,14 +674,20 @@ class TransformerGene(Transformer):
             the folder of the genes.dat file of the cyc database
         db_version: Union[str, Parameter]
             version of the database
+        pgdb: ParsedPGDB, optional
+            parsed data of the cyc database shared with the other transformers
+        validation_rate: float
+            fraction of the transformed records that are validated against the pydantic model
+        output_format: str
+            format of the output file: 'ndjson', 'ndjson.gz', 'ndjson.zst' or 'json'
         """
 
-        super().__init__(data_path, db_version)
+        super().__init__(data_path, db_version, pgdb, validation_rate, output_format)
 
-    def transform(self):
+    def build_records(self) -> Iterator[dict]:
         """
         Reads the genes.dat file to extract the following info and
-        writes a json file with genes instances:
+        yields the genes instances:
         - entry_id
         - common_name
         - synonyms
@@ -550,69 +696,54 @@ class TransformerGene(Transformer):
         - reactions
         - database version
 
-        Returns
-        -------
-        all_genes: list
-            list of dicts with gene information
+        Yields
+        ------
+        new_gene: dict
+            gene information
         """
 
-        filepath = os.path.join(self.datasource, 'genes.dat')
-
-        data = data_by_record(filepath)
+        data = self.timer.timed(self.pgdb.iter_records('genes.dat'), 'parse')
 
-        enz_rxns = get_enzrxn_data(db_path=self.datasource, for_rxn=False)
+        with self.timer.stage('index'):
+            enz_rxns = self.pgdb.enz_rxns
 
-        all_genes = []
         for gene_dic in data:
             gene_id = gene_dic['UNIQUE-ID'][0]
-            new_gene = Gene(entry_id=gene_id)
+            new_gene = {'entry_id': gene_id}
 
-            new_gene.database_version = {self.db_name: self.db_version.split('_')[1]}
+            new_gene['database_version'] = {self.db_name: self.db_version.split('_')[1]}
 
             if 'COMMON-NAME' in gene_dic:
-                new_gene.common_name = re.sub('<[^<]+?>', '', gene_dic['COMMON-NAME'][0])
+                new_gene['common_name'] = strip_html(gene_dic['COMMON-NAME'][0])
             if 'SYNONYMS' in gene_dic:
-                new_gene.synonyms = [re.sub('<[^<]+?>', '', x) for x in gene_dic['SYNONYMS']]
+                new_gene['synonyms'] = [strip_html(x) for x in gene_dic['SYNONYMS']]
             if 'DBLINKS' in gene_dic:
-                new_gene.crossrefs = {}
+                new_gene['crossrefs'] = {}
                 for dblink in gene_dic['DBLINKS']:
-                    ref = dblink.split('NIL')[0][:-1]
-                    try:
-                        db = re.search('\((.*?) ', ref).group()[1:-1]
-                        db_id = re.search('"(.*?)"', ref).group()[1:-1]
-                        if ',' in db_id:
-                            db_id = db_id.split(',')[0]
-                    except AttributeError:
-                        continue
-                    new_gene.crossrefs[db] = db_id
+                    ref = parse_dblink(dblink)
+                    if ref:
+                        new_gene['crossrefs'][ref[0]] = ref[1].split(',')[0]
 
             if 'PRODUCT' in gene_dic:
-                new_gene.enzymes = {self.db_name: gene_dic['PRODUCT']}
+                new_gene['enzymes'] = {self.db_name: gene_dic['PRODUCT']}
 
                 reactions = []
 
-                for enz in new_gene.enzymes[self.db_name]:
+                for enz in new_gene['enzymes'][self.db_name]:
                     if enz in enz_rxns:
                         reactions.extend(enz_rxns[enz])
 
-                new_gene.reactions = {self.db_name: list(set(reactions))}
-
-            new_gene_json = new_gene.dict()
-            new_gene_json = {k: v for k, v in new_gene_json.items() if v is not None}
-
-            all_genes.append(new_gene_json)
+                new_gene['reactions'] = {self.db_name: list(set(reactions))}
 
-        output_file = os.path.join(self.output_folder, 'gene.json')
-        write_json(all_genes, output_file)
-
-        logging.info('gene data was transformed and ' + output_file + ' was written')
-
-        return all_genes
+            yield new_gene
 
 
 class TransformerPathway(Transformer):
 
-    def __init__(self, data_path, db_version):
+    collection = 'pathway'
+    model = Pathway
+
+    def __init__(self, data_path, db_version, pgdb=None, validation_rate=0.0, output_format='ndjson'):
         """
         Transforms the pathway data of the cyc database. It reads the pathways.dat file and saves the information
         of each pathway in a structured Pathway object.
@@ -622,14 +753,20 @@ class TransformerPathway(Transformer):
             the folder of the pathways.dat file of the cyc database
         db_version: Union[str, Parameter]
             version of the database
+        pgdb: ParsedPGDB, optional
+            parsed data of the cyc database shared with the other transformers
+        validation_rate: float
+            fraction of the transformed records that are validated against the pydantic model
+        output_format: str
+            format of the output file: 'ndjson', 'ndjson.gz', 'ndjson.zst' or 'json'
         """
 
-        super().__init__(data_path, db_version)
+        super().__init__(data_path, db_version, pgdb, validation_rate, output_format)
 
-    def transform(self):
+    def build_records(self) -> Iterator[dict]:
         """
         Reads the pathways.dat file to extract the following info and
-        writes a json file with genes instances:
+        yields the genes instances:
         - entry_id
         - common_name
         - synonyms
@@ -638,91 +775,78 @@ class TransformerPathway(Transformer):
         - reactions
         - database version
 
-        Returns
-        -------
-        all_paths: list
-            list of dicts with pathway information
+        Yields
+        ------
+        new_path: dict
+            pathway information
         """
 
-        filepath = os.path.join(self.datasource, 'pathways.dat')
-
-        data = data_by_record(filepath)
+        with self.timer.stage('parse'):
+            data = self.pgdb.records('pathways.dat')
 
-        all_paths = []
         for path_dic in data:
             path_id = path_dic['UNIQUE-ID'][0]
-            new_path = Pathway(entry_id=path_id)
+            new_path = {'entry_id': path_id}
 
-            new_path.database_version = {self.db_name: self.db_version.split('_')[1]}
+            new_path['database_version'] = {self.db_name: self.db_version.split('_')[1]}
 
             if 'COMMON-NAME' in path_dic:
-                new_path.common_name = re.sub('<[^<]+?>', '', path_dic['COMMON-NAME'][0])
+                new_path['common_name'] = strip_html(path_dic['COMMON-NAME'][0])
             if 'SYNONYMS' in path_dic:
-                new_path.synonyms = [re.sub('<[^<]+?>', '', x) for x in path_dic['SYNONYMS']]
+                new_path['synonyms'] = [strip_html(x) for x in path_dic['SYNONYMS']]
 
             if 'REACTION-LIST' in path_dic:
-                new_path.reactions = {self.db_name: path_dic['REACTION-LIST']}
+                new_path['reactions'] = {self.db_name: path_dic['REACTION-LIST']}
 
             if 'SPECIES' in path_dic:
-                new_path.organisms = {self.db_name: path_dic['SPECIES']}
+                new_path['organisms'] = {self.db_name: path_dic['SPECIES']}
 
             if 'SUPER-PATHWAYS' in path_dic:
-                new_path.super_pathways = path_dic['SUPER-PATHWAYS']
+                new_path['super_pathways'] = path_dic['SUPER-PATHWAYS']
 
             if 'PATHWAY-LINKS' in path_dic:
                 path_links = {}
                 for link in path_dic['PATHWAY-LINKS']:
-                    if '"' in link:
-                        match = re.search('"(.*?)"', link).group().replace(' ', '_')[1:-1]
-                        link = re.sub('"(.*?)"', match, link)
-
-                    if 'OUTGOING' in link:
-                        info = link[1:-1].replace(' . :OUTGOING)', '').replace('(', '').split(" ")
-                    elif 'INCOMING' in link:
-                        info = link[1:-1].replace(' . :INCOMING)', '').replace('(', '').split(" ")
-                    else:
-                        info = link[1:-1].split(' ')
-
-                    met = info[0].replace('|', '')
-                    paths = info[1:]
-                    path_links[met] = [x.replace('|', '') for x in paths]
-
-                new_path.pathway_links = path_links
-
-            new_path_json = new_path.dict()
-            new_path_json = {k: v for k, v in new_path_json.items() if v is not None}
-
-            all_paths.append(new_path_json)
-
-        output_file = os.path.join(self.output_folder, 'pathway.json')
-        write_json(all_paths, output_file)
+                    path_link = parse_pathway_link(link)
+                    if path_link:
+                        path_links[path_link[0]] = path_link[1]
 
-        logging.info('pathway data was transformed and ' + output_file + ' was written')
+                new_path['pathway_links'] = path_links
 
-        return all_paths
+            yield new_path
 
 
 class TransformerOrganism(Transformer):
 
-    def __init__(self, data_path, db_version):
+    collection = 'organism'
+    model = Organism
+
+    def __init__(self, data_path, db_version, pgdb=None, validation_rate=0.0, output_format='ndjson'):
         """
         Transforms the organism data of the cyc database. It reads the pathways.dat and proteins.dat file and gets
-        the organisms in the database. Then, it uses the organism identifiers to get metadata from biocyc API.
-        No organism metadata is available on the dat files.
+        the organisms in the database. Then, it gets the taxonomy of the organisms from the species.dat file and the
+        local taxoniq index (see utils.taxonomy). The biocyc API is only used for the organisms without a taxonomy
+        identifier in the dat files.
         Parameters
         ----------
         data_path: Union[str, Parameter]
             the folder of the pathways.dat and proteins.dat files of the cyc database
         db_version: Union[str, Parameter]
             version of the database
+        pgdb: ParsedPGDB, optional
+            parsed data of the cyc database shared with the other transformers
+        validation_rate: float
+            fraction of the transformed records that are validated against the pydantic model
+        output_format: str
+            format of the output file: 'ndjson', 'ndjson.gz', 'ndjson.zst' or 'json'
         """
 
-        super().__init__(data_path, db_version)
+        super().__init__(data_path, db_version, pgdb, validation_rate, output_format)
 
-    def transform(self):
+    def build_records(self) -> Iterator[dict]:
         """
-        Reads the pathways.dat and proteins.dat files to extract organism identifiers. Then, uses the biocyc API to
-        get the following info and writes a json file with organism instances:
+        Reads the pathways.dat and proteins.dat files to extract organism identifiers. Then, resolves their taxonomy
+        to get the following info and yields the organism instances:
         - entry_id
         - common_name
         - scientific_name
@@ -739,120 +863,226 @@ class TransformerOrganism(Transformer):
         - enzymes
         - database version
 
-        Returns
-        -------
-        all_orgs: list
-            list of dicts with organism information
+        Yields
+        ------
+        new_org: dict
+            organism information
         """
 
-        file_path = os.path.join(self.datasource, 'pathways.dat')
-        file_enz = os.path.join(self.datasource, 'proteins.dat')
+        with self.timer.stage('parse'):
+            paths = self.pgdb.records('pathways.dat')
+            enzs = self.pgdb.records('proteins.dat')
 
-        paths = data_by_record(file_path)
-        enzs = data_by_record(file_enz)
+        with self.timer.stage('index'):
+            organisms = self.pgdb.organism_index
 
-        orgs_ids = []
-        org_paths = {}
-        org_enzs = {}
-        org_genes = {}
+        with self.timer.stage('taxonomy'):
+            taxonomy = TaxonomyResolver(self.pgdb).resolve(organisms)
 
-        for path_dic in paths:
-            if 'SPECIES' in path_dic:
-                path_id = path_dic['UNIQUE-ID'][0]
-                organisms = path_dic['SPECIES']
-                for o in organisms:
-                    if o not in orgs_ids:
-                        orgs_ids.append(o)
-                    if o in org_paths:
-                        org_paths[o].append(path_id)
-                    else:
-                        org_paths[o] = [path_id]
-
-        for enz_dic in enzs:
-            if 'SPECIES' in enz_dic:
-                enz_id = enz_dic['UNIQUE-ID'][0]
-                organisms = enz_dic['SPECIES']
-                for o in organisms:
-                    if o not in orgs_ids:
-                        orgs_ids.append(o)
-                    if o in org_enzs:
-                        org_enzs[o].append(enz_id)
-                    else:
-                        org_enzs[o] = [enz_id]
-
-                if 'GENE' in enz_dic:
-                    genes = enz_dic['GENE']
-                    for o in organisms:
-                        for gene in genes:
-                            if o in org_genes:
-                                org_genes[o].append(gene)
-                            else:
-                                org_genes[o] = [gene]
-
-        all_orgs = []
-
-        for org in orgs_ids:
-
-            new_org = Organism(entry_id=org)
-            try:
-                new_org.pathways = {self.db_name: org_paths[org]}
-            except KeyError:
-                new_org.pathways = {self.db_name: []}
-
-            try:
-                new_org.enzymes = {self.db_name: org_enzs[org]}
-            except KeyError:
-                new_org.enzymes = {self.db_name: []}
-
-            try:
-                new_org.genes = {self.db_name: org_genes[org]}
-            except KeyError:
-                new_org.genes = {self.db_name: []}
-
-            new_org.database_version = {self.db_name: self.db_version.split('_')[1]}
-
-            if org.startswith('TAX-'):
-                new_org.taxid = org.split('-')[1]
-            else:
-                new_org.taxid = taxid_biocyc_api(org)
+        for org, members in organisms.items():
 
-            lineage_data = {}
-            if new_org.taxid:
-                try:
-                    taxon = taxoniq.Taxon(new_org.taxid)
-                except KeyError:
+            new_org = {'entry_id': org,
+                       'pathways': {self.db_name: members['pathways']},
+                       'enzymes': {self.db_name: members['enzymes']},
+                       'genes': {self.db_name: members['genes']}}
+
+            new_org['database_version'] = {self.db_name: self.db_version.split('_')[1]}
+
+            taxid, lineage = taxonomy[org]
+
+            if taxid is not None:
+                new_org['taxid'] = taxid
+
+            if taxid:
+                if lineage is None:
                     continue
-                try:
-                    new_org.common_name = taxon.common_name
-                except taxoniq.NoValue:
-                    new_org.common_name = ''
+                new_org.update(lineage)
+
+            yield new_org
+
+
+TRANSFORMERS = (TransformerMetabolite, TransformerReaction, TransformerEnzyme, TransformerGene, TransformerPathway,
+                TransformerOrganism)
+
+
+def run_transformer(transformer_class, data_path, db_version, pgdb=None, validation_rate=0.0,
+                    output_format='ndjson', columnar_format=None, trace_memory=False) -> dict:
+    """
+    Run a transformer and log its wall time
+    Parameters
+    ----------
+    transformer_class: type
+        the Transformer subclass to run
+    data_path: str
+        the folder of the dat files of the cyc database
+    db_version: str
+        version of the database
+    pgdb: ParsedPGDB, optional
+        parsed data of the cyc database shared with the other transformers
+    validation_rate: float
+        fraction of the transformed records that are validated against the pydantic model
+    output_format: str
+        format of the output file: 'ndjson', 'ndjson.gz', 'ndjson.zst' or 'json'
+    columnar_format: str, optional
+        if 'parquet' or 'arrow', the transformed collection is also written as columnar tables in the columnar folder
+        of the output folder
+    trace_memory: bool
+        if True, the peak memory allocated by the transformer alone is traced (see Transformer.transform)
+
+    Returns
+    -------
+    stats: dict
+        records, wall time, records per second, peak resident memory of its process, time of each stage and, if
+        traced, peak memory of the transformer
+    """
+    start = time.perf_counter()
+
+    transformer = transformer_class(data_path=data_path, db_version=db_version, pgdb=pgdb,
+                                    validation_rate=validation_rate, output_format=output_format)
+    transformer.transform(trace_memory=trace_memory)
+
+    stats = transformer.stats
+
+    if columnar_format:
+        columnar_start = time.perf_counter()
+        with MemoryPeak(enabled=trace_memory) as memory:
+            write_columnar(iter_json_records(transformer.output_file), transformer.collection,
+                           os.path.join(transformer.output_folder, 'columnar'), columnar_format)
+        stats['stages']['columnar'] = time.perf_counter() - columnar_start
+        stats['process_peak_rss_mb'] = peak_rss_mb()
+        if trace_memory:
+            stats['peak_memory_mb'] = max(stats['peak_memory_mb'], memory.peak_mb)
+
+    stats['wall_time'] = time.perf_counter() - start
+    logging.info('%s finished in %.2f s', transformer_class.__name__, stats['wall_time'])
+
+    return stats
 
-                new_org.scientific_name = taxon.scientific_name
 
-                lineage = [(t.rank.name, t.scientific_name) for t in taxon.ranked_lineage]
+def transform_all(data_path, db_version, workers=1, validation_rate=0.0, output_format='ndjson',
+                  columnar_format=None) -> dict:
+    """
+    Run all transformers of a cyc database. With more than one worker, the transformers run in a pool of processes.
+    The dat files are parsed once, each large file split between the workers, and the transformers read the records
+    from the parsed-record cache.
+    The stats of each transformer are written to the transform_report_<db_version>.json file of update_outputs.
+    Parameters
+    ----------
+    data_path: str
+        the folder of the dat files of the cyc database
+    db_version: str
+        version of the database
+    workers: int
+        number of processes. If 1, the transformers run one after another in this process and share the parsed data
+    validation_rate: float
+        fraction of the transformed records that are validated against the pydantic models
+    output_format: str
+        format of the output files: 'ndjson', 'ndjson.gz', 'ndjson.zst' or 'json'
+    columnar_format: str, optional
+        if 'parquet' or 'arrow', the transformed collections are also written as columnar tables
+
+    Returns
+    -------
+    stats: dict
+        stats of each transformer (see run_transformer)
+    """
+    start = time.perf_counter()
+
+    stats = {}
+    options = {'validation_rate': validation_rate, 'output_format': output_format, 'columnar_format': columnar_format}
+
+    if workers <= 1:
+        pgdb = ParsedPGDB(data_path)
+        for transformer_class in TRANSFORMERS:
+            stats[transformer_class.__name__] = run_transformer(transformer_class, data_path, db_version, pgdb,
+                                                                 **options)
+
+    else:
+        ParsedPGDB(data_path, workers=workers).cache_files()
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {transformer_class.__name__: executor.submit(run_transformer, transformer_class, data_path,
+                                                                    db_version, **options)
+                       for transformer_class in TRANSFORMERS}
+
+            for name, future in futures.items():
+                stats[name] = future.result()
+
+    write_transform_report(db_version, stats, wall_time=time.perf_counter() - start, workers=workers)
 
-                for pair in lineage:
-                    lineage_data[pair[0]] = pair[1]
+    return stats
 
-            new_org_json = new_org.dict()
-            new_org_json = {k: v for k, v in new_org_json.items() if v is not None}
 
-            if new_org.taxid:
-                for k in lineage_data:
-                    if k == 'class':
-                        new_org_json['org_class'] = lineage_data[k]
-                    else:
-                        new_org_json[k] = lineage_data[k]
+def write_transform_report(db_version, stats, wall_time, workers=1) -> str:
+    """
+    Write the stats of the transformers of a transform run to a json file next to the update_outputs marker files
+    Parameters
+    ----------
+    db_version: str
+        version of the database
+    stats: dict
+        stats of each transformer (see run_transformer)
+    wall_time: float
+        seconds spent by the transform run
+    workers: int
+        number of processes of the transform run
+
+    Returns
+    -------
+    report_file: str
+        path of the report
+    """
+    report = {'db_version': db_version,
+              'workers': workers,
+              'wall_time': wall_time,
+              'records': sum(transformer_stats['records'] for transformer_stats in stats.values()),
+              'transformers': stats}
+
+    report_folder = os.path.join(PROJECT_PATH, 'update_outputs')
+    os.makedirs(report_folder, exist_ok=True)
+
+    report_file = os.path.join(report_folder, 'transform_report_' + str(db_version) + '.json')
+    with open(report_file, 'w') as output:
+        json.dump(report, output, indent=2)
 
-            all_orgs.append(new_org_json)
+    slowest = max(stats, key=lambda name: stats[name]['wall_time']) if stats else None
+    logging.info('transform of %s took %.2f s (slowest: %s). The report was written to %s', db_version, wall_time,
+                 slowest, report_file)
 
-        output_file = os.path.join(self.output_folder, 'organism.json')
-        write_json(all_orgs, output_file)
+    return report_file
+
+
+def write_version_deltas(db_version, previous_db_version=None, output_format='ndjson') -> dict:
+    """
+    Compare the transformed files of a database version with the files of the previous version and write the added,
+    changed and removed records of each collection to the delta folder, for the loaders to update only what changed.
+    Parameters
+    ----------
+    db_version: str
+        version of the database
+    previous_db_version: str, optional
+        version to compare with. If not given, it is the most recent older version with transformed files
+    output_format: str
+        format of the delta files: 'ndjson', 'ndjson.gz', 'ndjson.zst' or 'json'
+
+    Returns
+    -------
+    counts: dict
+        number of added, changed and removed records of each collection. It is empty if there is no previous version
+    """
+    json_folder = os.path.join(PROJECT_PATH, 'json_files')
 
-        logging.info('organism data was transformed and ' + output_file + ' was written')
+    if previous_db_version is None:
+        previous_db_version = previous_version(json_folder, db_version)
 
-        return all_orgs
+    if previous_db_version is None or not os.path.isdir(os.path.join(json_folder, previous_db_version)):
+        logging.warning('There is no previous version of %s to compare. The collections will be updated completely',
+                        db_version)
+        shutil.rmtree(os.path.join(json_folder, db_version, DELTA_FOLDER), ignore_errors=True)
+        return {}
 
+    return write_deltas(os.path.join(json_folder, db_version), os.path.join(json_folder, previous_db_version),
+                        [transformer_class.collection for transformer_class in TRANSFORMERS], output_format)
 
 # if __name__ == '__main__':
 #     db_data = "C:/Users/BiSBII/Documents/Pathway Tools/ptools-local/pgdbs/registry/plantcyc/14.0.1/data/"
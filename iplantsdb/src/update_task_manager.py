@@ -2,13 +2,13 @@ import os
 import subprocess
 
 import luigi
-from transformer import TransformerMetabolite, TransformerReaction, TransformerEnzyme, TransformerGene, \
-    TransformerPathway, TransformerOrganism
+from transformer import transform_all, write_version_deltas
 from iplants_mongo.mongodb_update import DatabaseMongoUpdate
 from iplants_neo.neodb_update import DatabaseNeoUpdate
 from download_database import DownloadPMNDatabase, DownloadMetaDatabase
 import logging
 from utils.config import PROJECT_PATH
+from utils.settings import MONGO_BULK_BATCH_SIZE
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -54,6 +54,13 @@ class TransformData(luigi.Task):
     password = luigi.Parameter(default=None)
     download_link = luigi.Parameter(default=None)
 
+    transform_workers = luigi.IntParameter(default=1, significant=False)
+    validation_rate = luigi.FloatParameter(default=0.0, significant=False)
+    output_format = luigi.Parameter(default='ndjson', significant=False)
+    columnar_format = luigi.Parameter(default=None, significant=False)
+    delta = luigi.BoolParameter(default=False)
+    previous_version = luigi.Parameter(default=None, significant=False)
+
     @property
     def db_version(self):
         return str(self.db) + '_' + str(self.version)
@@ -76,23 +83,14 @@ class TransformData(luigi.Task):
         else:
             data_path = os.path.join(PROJECT_PATH, 'downloads', str(self.db), str(self.version), 'data')
 
-        transfmet = TransformerMetabolite(data_path=data_path, db_version=self.db_version)
-        transfmet.transform()
-
-        transfreac = TransformerReaction(data_path=data_path, db_version=self.db_version)
-        transfreac.transform()
-
-        transfenz = TransformerEnzyme(data_path=data_path, db_version=self.db_version)
-        transfenz.transform()
-
-        transgene = TransformerGene(data_path=data_path, db_version=self.db_version)
-        transgene.transform()
+        transform_all(data_path=data_path, db_version=self.db_version, workers=self.transform_workers,
+                      validation_rate=self.validation_rate, output_format=self.output_format,
+                      columnar_format=self.columnar_format)
 
-        transpath = TransformerPathway(data_path=data_path, db_version=self.db_version)
-        transpath.transform()
-
-        transorg = TransformerOrganism(data_path=data_path, db_version=self.db_version)
-        transorg.transform()
+        if self.delta:
+            previous_db_version = str(self.db) + '_' + str(self.previous_version) if self.previous_version else None
+            write_version_deltas(db_version=self.db_version, previous_db_version=previous_db_version,
+                                 output_format=self.output_format)
 
         logging.info('New data is transformed and json files were created for each collection')
 
@@ -108,16 +106,20 @@ class LoadDataMongo(luigi.Task):
     password = luigi.Parameter(default=None)
     download_link = luigi.Parameter(default=None)
 
+    delta = luigi.BoolParameter(default=False)
+    bulk = luigi.BoolParameter(default=False, significant=False)
+    bulk_batch_size = luigi.IntParameter(default=MONGO_BULK_BATCH_SIZE, significant=False)
+
     @property
     def db_version(self):
         return str(self.db) + '_' + str(self.version)
 
     def requires(self):
         if self.db != 'metacyc':
-            return TransformData(version=self.version, db=self.db)
+            return TransformData(version=self.version, db=self.db, delta=self.delta)
         else:
             return TransformData(version=self.version, db=self.db, username=self.username, password=self.password,
-                                 download_link=self.download_link)
+                                 download_link=self.download_link, delta=self.delta)
 
     def output(self):
         output_file = os.path.join(PROJECT_PATH, 'update_outputs',
@@ -125,7 +127,8 @@ class LoadDataMongo(luigi.Task):
         return luigi.LocalTarget(output_file)
 
     def run(self):
-        database = DatabaseMongoUpdate(db_version=self.db_version)
+        database = DatabaseMongoUpdate(db_version=self.db_version, delta=self.delta, bulk=self.bulk,
+                                       bulk_batch_size=self.bulk_batch_size)
         database.update_all_collections()
 
 
@@ -137,36 +140,42 @@ class LoadDataNeo4j(luigi.Task):
     password = luigi.Parameter(default=None)
     download_link = luigi.Parameter(default=None)
 
+    delta = luigi.BoolParameter(default=False)
+
     @property
     def db_version(self):
         return str(self.db) + '_' + str(self.version)
 
     def requires(self):
         if self.db != 'metacyc':
-            return TransformData(db=self.db, version=self.version)
+            return TransformData(db=self.db, version=self.version, delta=self.delta)
         else:
             return TransformData(version=self.version, db=self.db, username=self.username, password=self.password,
-                                 download_link=self.download_link)
+                                 download_link=self.download_link, delta=self.delta)
 
     def output(self):
         output_file = os.path.join(PROJECT_PATH, 'update_outputs', 'updateneo4j_' + self.db_version + '.txt')
         return luigi.LocalTarget(output_file)
 
     def run(self):
-        database = DatabaseNeoUpdate(db_version=self.db_version)
+        database = DatabaseNeoUpdate(db_version=self.db_version, delta=self.delta)
         database.update_database()
 
 
-def execute_update_pipeline(dbname, version, username=None, password=None, download_link=None):
+def execute_update_pipeline(dbname, version, username=None, password=None, download_link=None, delta=False,
+                            bulk=False, bulk_batch_size=MONGO_BULK_BATCH_SIZE):
     p = subprocess.Popen('luigid', stdout=subprocess.PIPE, shell=False)
     logging.info('starting the update pipeline')
     if dbname != 'metacyc':
-        res = luigi.build([LoadDataMongo(db=dbname, version=version), LoadDataNeo4j(db=dbname, version=version)])
+        res = luigi.build([LoadDataMongo(db=dbname, version=version, delta=delta, bulk=bulk,
+                                         bulk_batch_size=bulk_batch_size),
+                           LoadDataNeo4j(db=dbname, version=version, delta=delta)])
     else:
         res = luigi.build([LoadDataMongo(db=dbname, version=version, username=username, password=password,
-                                         download_link=download_link),
+                                         download_link=download_link, delta=delta, bulk=bulk,
+                                         bulk_batch_size=bulk_batch_size),
                            LoadDataNeo4j(db=dbname, version=version, username=username, password=password,
-                                         download_link=download_link)])
+                                         download_link=download_link, delta=delta)])
     p.kill()
 
     if not res:
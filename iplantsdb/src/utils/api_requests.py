@@ -1,59 +1,266 @@
 import io
+import os
+import json
 import time
+import random
+import sqlite3
+import hashlib
+import logging
+import threading
+import email.utils
+from urllib.parse import urlsplit
+from typing import Union
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+from .config import PROJECT_PATH
+from .settings import (REQUEST_RETRIES, REQUEST_TIMEOUT, REQUEST_BACKOFF, REQUEST_MAX_BACKOFF, HOST_POOL_SIZE,
+                       HOST_MAX_CONCURRENCY)
+
+HTTP_CACHE = os.path.join(PROJECT_PATH, 'cache', 'http_cache.sqlite')
+
+# responses worth another attempt: rate limited, server errors and timeouts. The other errors (e.g. 404) fail at once
+RETRY_STATUS = (408, 429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    """
+    Spaces the calls of several threads so that there are at most requests_per_second calls per second
+    """
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1 / requests_per_second if requests_per_second else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """
+        Block until the next call is allowed
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Host:
+    """
+    Connections and limits of the requests to a host: a session with a pool of connections (it also keeps the
+    cookies, such as the login of biocyc), a rate limit and a maximum number of concurrent requests
+    """
+
+    def __init__(self, requests_per_second: float = 0.0, max_concurrency: int = HOST_MAX_CONCURRENCY):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(HOST_POOL_SIZE, max_concurrency))
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.limiter = RateLimiter(requests_per_second)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+def configure_host(host: str, requests_per_second: float = 0.0, max_concurrency: int = HOST_MAX_CONCURRENCY) -> Host:
+    """
+    Set the limits of the requests to a host. The session of the host (and its cookies) is kept.
+    Parameters
+    ----------
+    host: str
+        host and port of the urls (e.g. eutils.ncbi.nlm.nih.gov)
+    requests_per_second: float
+        maximum number of requests per second. 0 for no limit
+    max_concurrency: int
+        maximum number of requests at the same time
+
+    Returns
+    -------
+    host: Host
+        connections and limits of the host
+    """
+    with _hosts_lock:
+        if host not in _hosts:
+            _hosts[host] = Host(requests_per_second, max_concurrency)
+        else:
+            _hosts[host].limiter = RateLimiter(requests_per_second)
+            _hosts[host].slots = threading.BoundedSemaphore(max_concurrency)
+        return _hosts[host]
+
+
+def get_host(url: str) -> Host:
+    """
+    Connections and limits of the host of a url. Hosts that were not configured have no rate limit.
+    """
+    host = urlsplit(url).netloc
+    with _hosts_lock:
+        if host not in _hosts:
+            _hosts[host] = Host()
+        return _hosts[host]
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Session shared by the requests to the host of a url
+    """
+    return get_host(url).session
+
+
+class ResponseCache:
+    """
+    Responses kept in a sqlite file, so that a request is not repeated while its response is fresh
+    """
+
+    def __init__(self, filename: str = HTTP_CACHE):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        self._connection = sqlite3.connect(filename, check_same_thread=False)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, created REAL, '
+                                 'status INTEGER, headers TEXT, content BLOB)')
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(method: str, url: str, params: dict = None, data=None) -> str:
+        request_id = json.dumps([method.lower(), url, params, data], sort_keys=True, default=str)
+        return hashlib.sha256(request_id.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, ttl: float) -> Union[requests.Response, None]:
+        with self._lock:
+            row = self._connection.execute('SELECT created, status, headers, content FROM responses WHERE key = ?',
+                                           (key,)).fetchone()
+        if row is None or time.time() - row[0] > ttl:
+            return None
+        return _cached_response(row[1], json.loads(row[2]), row[3])
+
+    def set(self, key: str, response: requests.Response):
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                                     (key, time.time(), response.status_code, json.dumps(dict(response.headers)),
+                                      response.content))
+
+    def close(self):
+        self._connection.close()
+
+
+_cache = None
+
+
+def response_cache() -> ResponseCache:
+    """
+    Response cache shared by the requests of a process
+    """
+    global _cache
+    if _cache is None:
+        _cache = ResponseCache()
+    return _cache
+
+
+def _cached_response(status: int, headers: dict, content: bytes) -> requests.Response:
+    """
+    Response built from a cached content. Its raw attribute can be streamed like the one of a network response.
+    """
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers)
+    response.headers.pop('Content-Encoding', None)
+    response._content = content
+    response.raw = HTTPResponse(body=io.BytesIO(content), preload_content=False, status=status)
+    return response
 
-from .settings import REQUEST_RETRIES, REQUEST_TIMEOUT
 
+def _failed_response(url: str, reason: str, status: int = 503) -> requests.Response:
+    """
+    Empty response of a request that failed without a response. It can be read and closed like a network response.
+    """
+    response = requests.Response()
+    response.status_code = status
+    response.reason = reason
+    response.url = url
+    response._content = b''
+    response.raw = HTTPResponse(body=io.BytesIO(b''), preload_content=False, status=status)
+    return response
 
-def _request(url: str,
-             method: str = 'get',
-             params: dict = None,
-             **kwargs):
-
-    requests_kwargs = dict(data=None,
-                           headers=None,
-                           cookies=None,
-                           files=None,
-                           auth=None,
-                           timeout=REQUEST_TIMEOUT,
-                           allow_redirects=True,
-                           proxies=None,
-                           hooks=None,
-                           stream=None,
-                           verify=None,
-                           cert=None,
-                           json=None)
-
-    for key, val in kwargs.items():
-        requests_kwargs[key] = val
-
-    response = None
+
+def retry_after(response: requests.Response) -> Union[float, None]:
+    """
+    Seconds to wait before the next request, from the Retry-After header (in seconds or as a date)
+    """
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+
+    if value.strip().isdigit():
+        return float(value)
 
     try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - time.time())
 
-        response = requests.request(method=method,
-                                    url=url,
-                                    params=params,
-                                    **requests_kwargs)
 
-        try:
-            response.raise_for_status()
+def backoff(attempt: int, base: float = REQUEST_BACKOFF, cap: float = REQUEST_MAX_BACKOFF) -> float:
+    """
+    Exponential backoff with full jitter: a random wait between 0 and base * 2 ** attempt seconds
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
 
-        except requests.exceptions.HTTPError as exception:
-            response = None
 
-    except requests.exceptions.RequestException as exception:
-        response = None
+def _release_on_close(response: requests.Response, slots: threading.BoundedSemaphore):
+    """
+    Release a slot of a host when a streamed response is closed, since its connection stays in use until then
+    """
+    close = response.close
+    lock = threading.Lock()
+    released = False
 
-    if response is None:
+    def close_and_release():
+        nonlocal released
+        try:
+            close()
+        finally:
+            with lock:
+                if not released:
+                    released = True
+                    slots.release()
 
-        print(f'Failed connect to {url} with {params}')
+    response.close = close_and_release
 
-        response = requests.Response()
-        response.status_code = 404
 
+def _request(url: str,
+             method: str = 'get',
+             params: dict = None,
+             **kwargs) -> requests.Response:
+    """
+    One attempt of a request through the session and the limits of the host. The connection errors are returned as
+    a 503 response. A streamed response holds its slot of the host until it is closed.
+    """
+    kwargs.setdefault('timeout', REQUEST_TIMEOUT)
+
+    host = get_host(url)
+    host.limiter.wait()
+
+    slots = host.slots
+    slots.acquire()
+    try:
+        response = host.session.request(method=method, url=url, params=params, **kwargs)
+    except requests.exceptions.RequestException as exception:
+        slots.release()
+        return _failed_response(url, str(exception))
+    except BaseException:
+        slots.release()
+        raise
+
+    if kwargs.get('stream'):
+        _release_on_close(response, slots)
+    else:
+        slots.release()
     return response
 
 
@@ -61,38 +268,65 @@ def request(url: str,
             method: str = 'get',
             params: dict = None,
             retries: int = REQUEST_RETRIES,
+            cache_ttl: float = None,
             **kwargs) -> requests.Response:
+    """
+    Request a url. The requests to the same host share a pool of connections and are limited by the limits of the host
+    (see configure_host). The rate-limited, server and connection errors are tried again after an exponential backoff
+    with jitter, or after the time of the Retry-After header of the response.
+    Parameters
+    ----------
+    url: str
+        url of the request
+    method: str
+        http method
+    params: dict
+        query parameters
+    retries: int
+        maximum number of attempts
+    cache_ttl: float
+        seconds that the successful responses are kept in the response cache. None to not use the cache
+    kwargs:
+        other arguments of requests.Session.request (e.g. data, headers, stream or timeout)
+
+    Returns
+    -------
+    response: requests.Response
+        the response of the last attempt. Connection errors get a 503 status code. A streamed response must be closed
+        (e.g. with a with statement), so that its connection and its slot of the host are released
+    """
+    cache_key = None
+    if cache_ttl:
+        cache_key = ResponseCache.key(method, url, params, kwargs.get('data'))
+        response = response_cache().get(cache_key, cache_ttl)
+        if response is not None:
+            return response
+
+    attempts = max(retries, 1)
+    for attempt in range(attempts):
+        logging.debug('Attempt request %d to %s for params %s', attempt, url, params if params else {})
+
+        response = _request(url=url, method=method, params=params, **kwargs)
+
+        if response.status_code not in RETRY_STATUS:
+            break
+
+        if attempt < attempts - 1:
+            response.close()
+            wait = retry_after(response)
+            time.sleep(min(wait, REQUEST_MAX_BACKOFF) if wait is not None else backoff(attempt))
+
+    if not response.ok:
+        logging.warning('Request to %s for params %s failed: %s %s', url, params if params else {},
+                        response.status_code, response.reason)
+
+    elif cache_key is not None:
+        response_cache().set(cache_key, response)
+        if kwargs.get('stream'):
+            response.close()
+            response = _cached_response(response.status_code, dict(response.headers), response.content)
 
-    if retries > 0:
-
-        for i in range(retries):
-
-            print(f'Attempt request {i} to {url} for params {params if params else {}}')
-
-            response = _request(url=url,
-                                method=method,
-                                params=params,
-                                **kwargs)
-
-            if response.status_code == 404:
-                time.sleep(2)
-
-            else:
-                return response
-
-        response = requests.Response()
-        response.status_code = 404
-
-        return response
-
-    else:
-
-        print(f'Request to {url} for params {params if params else {}}')
-
-        return _request(url=url,
-                        method=method,
-                        params=params,
-                        **kwargs)
+    return response
 
 
 def read_response(response: requests.Response, **kwargs):
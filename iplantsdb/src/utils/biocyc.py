@@ -0,0 +1,212 @@
+import os
+import json
+import logging
+import threading
+import xml.etree.ElementTree as ETe
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from typing import Iterable, Union
+
+from .config import PROJECT_PATH, BioCyc
+from .settings import REQUEST_TIMEOUT, BIOCYC_WORKERS, BIOCYC_REQUESTS_PER_SECOND
+from .api_requests import request, configure_host
+
+BIOCYC_URL = 'https://websvc.biocyc.org'
+TAXID_CACHE = os.path.join(PROJECT_PATH, 'cache', 'biocyc_taxids.json')
+
+
+def parse_taxid(content: bytes) -> Union[int, None]:
+    """
+    Taxonomy identifier of the organism of a biocyc getxml response
+    Parameters
+    ----------
+    content: bytes
+        xml of the organism
+
+    Returns
+    -------
+    taxid: int, Optional
+        taxonomy identifier or None if the response has no organism class
+    """
+    taxid = None
+
+    tree = ETe.fromstring(content)
+    for child in tree.iter():
+        if child.tag == 'Organism' and 'resource' in child.attrib:
+            taxid = int(child.attrib['frameid'].split('-')[1])
+
+    return taxid
+
+
+class BioCycClient:
+    """
+    Client of the biocyc web services. It logs in once and reuses the connections of the biocyc session of
+    utils.api_requests for all requests, runs the lookups of several organisms concurrently under a rate limit, and
+    keeps the taxonomy identifier of each organism in a json file, so that an organism is never looked up twice, even
+    by other runs and other databases.
+    """
+
+    def __init__(self,
+                 email: str = None,
+                 password: str = None,
+                 base_url: str = BIOCYC_URL,
+                 cache_file: Union[str, None] = TAXID_CACHE,
+                 workers: int = BIOCYC_WORKERS,
+                 requests_per_second: float = BIOCYC_REQUESTS_PER_SECOND,
+                 timeout: float = REQUEST_TIMEOUT):
+        """
+        Parameters
+        ----------
+        email: str
+            email of the biocyc account. The one of the configuration file by default
+        password: str
+            password of the biocyc account. The one of the configuration file by default
+        base_url: str
+            url of the biocyc web services
+        cache_file: str, Optional
+            json file of the taxonomy identifiers already looked up. None to disable the cache
+        workers: int
+            number of concurrent lookups
+        requests_per_second: float
+            maximum number of requests per second. 0 to disable the limit
+        timeout: float
+            timeout of each request in seconds
+        """
+        self.email = BioCyc.email if email is None else email
+        self.password = BioCyc.password if password is None else password
+        self.base_url = base_url.rstrip('/')
+        self.cache_file = cache_file
+        self.workers = workers
+        self.timeout = timeout
+        self.requests = 0
+
+        configure_host(urlsplit(self.base_url).netloc, requests_per_second, max_concurrency=workers)
+
+        self._logged_in = False
+        self._login_lock = threading.Lock()
+        self._cache = None
+        self._cache_lock = threading.Lock()
+
+    def login(self):
+        """
+        Log in to biocyc. The session cookie is kept by the session of the biocyc host, so the login is only done
+        until it succeeds.
+        """
+        with self._login_lock:
+            if self._logged_in:
+                return
+
+            self.requests += 1
+            res = request(self.base_url + '/credentials/login/', method='post',
+                          data={'email': self.email, 'password': self.password}, timeout=self.timeout)
+            if not res.ok:
+                logging.warning('biocyc login failed: %s %s', res.status_code, res.reason)
+                return
+
+            self._logged_in = True
+
+    @property
+    def cache(self) -> dict:
+        """
+        Taxonomy identifier of each organism already looked up
+        """
+        if self._cache is None:
+            self._cache = {}
+            if self.cache_file and os.path.isfile(self.cache_file):
+                with open(self.cache_file) as cache_file:
+                    self._cache = json.load(cache_file)
+        return self._cache
+
+    def save_cache(self):
+        """
+        Write the cache to the cache file. A temporary file is written first, so a failed write does not corrupt the
+        cache.
+        """
+        if not self.cache_file:
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_file)), exist_ok=True)
+
+        with self._cache_lock:
+            tmp_file = self.cache_file + '.tmp'
+            with open(tmp_file, 'w') as cache_file:
+                json.dump(self.cache, cache_file)
+            os.replace(tmp_file, self.cache_file)
+
+    def _lookup(self, org: str) -> Union[int, None]:
+        """
+        Look up the taxonomy identifier of an organism in biocyc and keep it in the cache. The organisms that failed
+        because of a connection error are not kept, so they are looked up again in the next run.
+        """
+        self.login()
+
+        self.requests += 1
+        res = request(self.base_url + '/getxml', params={'id': 'META:' + org}, timeout=self.timeout)
+        if not res.ok:
+            return None
+
+        try:
+            taxid = parse_taxid(res.content)
+        except (ETe.ParseError, ValueError, IndexError) as exception:
+            logging.warning('biocyc lookup of %s failed: %s', org, exception)
+            return None
+
+        with self._cache_lock:
+            self.cache[org] = taxid
+
+        return taxid
+
+    def taxid(self, org: str) -> Union[int, None]:
+        """
+        Taxonomy identifier of an organism
+        Parameters
+        ----------
+        org: str
+            organism identifier in metacyc
+
+        Returns
+        -------
+        taxid: int, Optional
+            taxonomy identifier for the organism
+        """
+        return self.taxids([org])[org]
+
+    def taxids(self, orgs: Iterable[str]) -> dict:
+        """
+        Taxonomy identifiers of several organisms. The organisms that are not in the cache are looked up concurrently
+        and the cache file is updated.
+        Parameters
+        ----------
+        orgs: Iterable[str]
+            organism identifiers in metacyc
+
+        Returns
+        -------
+        taxids: dict
+            taxonomy identifier (or None) of each organism
+        """
+        orgs = list(dict.fromkeys(orgs))
+        missing = [org for org in orgs if org not in self.cache]
+
+        if missing:
+            logging.info('looking up %d organisms in biocyc', len(missing))
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                found = dict(zip(missing, executor.map(self._lookup, missing)))
+            self.save_cache()
+        else:
+            found = {}
+
+        return {org: found[org] if org in found else self.cache[org] for org in orgs}
+
+
+_client = None
+
+
+def biocyc_client() -> BioCycClient:
+    """
+    Client shared by the biocyc lookups of a process
+    """
+    global _client
+    if _client is None:
+        _client = BioCycClient()
+    return _client
@@ -0,0 +1,188 @@
+import os
+import logging
+from typing import Iterable
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    import pyarrow.feather
+except ImportError:
+    pyarrow = None
+
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+
+# names of the columns of the edge tables of the list and dict fields. The fields that are not listed get generic
+# key, subkey and value columns
+EDGE_COLUMNS = {
+    'synonyms': ('synonym',),
+    'met_type': ('type',),
+    'super_pathways': ('pathway',),
+    'crossrefs': ('database', 'identifier'),
+    'formula': ('element', 'count'),
+    'reactants': ('metabolite', 'stoichiometry'),
+    'products': ('metabolite', 'stoichiometry'),
+    'pathway_links': ('metabolite', 'pathway'),
+    'database_version': ('database', 'version'),
+    'in_pathway': ('database', 'pathway'),
+    'sub_reactions': ('database', 'reaction'),
+    'compartment': ('database', 'compartment'),
+    'enzymes': ('database', 'enzyme'),
+    'genes': ('database', 'gene'),
+    'reactions': ('database', 'reaction'),
+    'pathways': ('database', 'pathway'),
+    'organisms': ('database', 'organism'),
+    'component_of': ('database', 'complex'),
+    'components': ('database', 'component', 'coefficient'),
+}
+
+
+class _Table:
+    """
+    Columns of a table that is filled one row at a time. The rows do not need to have the same columns: the missing
+    values are None.
+    """
+
+    def __init__(self):
+        self.columns = {}
+        self.n_rows = 0
+
+    def append(self, row: dict):
+        for column, value in row.items():
+            if column not in self.columns:
+                self.columns[column] = [None] * self.n_rows
+            self.columns[column].append(value)
+
+        self.n_rows += 1
+
+        for values in self.columns.values():
+            if len(values) < self.n_rows:
+                values.append(None)
+
+    def to_arrow(self):
+        arrays = {}
+        for column, values in self.columns.items():
+            try:
+                arrays[column] = pyarrow.array(values)
+            except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+                # mixed types, such as the coefficients that are 1.0 by default and strings in the dat files
+                arrays[column] = _mixed_array(values)
+
+        return pyarrow.table(arrays)
+
+
+def _mixed_array(values: list):
+    """
+    Arrow array of a column with values of different types. The values are numbers if all of them can be converted
+    to float and strings otherwise (e.g. a coefficient n).
+    """
+    try:
+        return pyarrow.array([None if v is None else float(v) for v in values], pyarrow.float64())
+    except ValueError:
+        return pyarrow.array([None if v is None else str(v) for v in values], pyarrow.string())
+
+
+def _edge_rows(entry_id: str, field: str, value) -> Iterable[dict]:
+    """
+    Explode a list or dict field of a record into the rows of its edge table
+    """
+    if isinstance(value, list):
+        name = EDGE_COLUMNS.get(field, ('value',))[-1]
+        for item in value:
+            yield {'entry_id': entry_id, name: item}
+        return
+
+    names = EDGE_COLUMNS.get(field)
+
+    for key, item in value.items():
+        if isinstance(item, dict):
+            key_name, subkey_name, value_name = names if names and len(names) == 3 else ('key', 'subkey', 'value')
+            for subkey, subitem in item.items():
+                yield {'entry_id': entry_id, key_name: key, subkey_name: subkey, value_name: subitem}
+
+        elif isinstance(item, list):
+            key_name, value_name = names[-2:] if names else ('key', 'value')
+            for subitem in item:
+                yield {'entry_id': entry_id, key_name: key, value_name: subitem}
+
+        else:
+            key_name, value_name = names[-2:] if names else ('key', 'value')
+            yield {'entry_id': entry_id, key_name: key, value_name: item}
+
+
+def build_tables(records: Iterable[dict], collection: str) -> dict:
+    """
+    Split the records of a collection into a table of the scalar fields, with one row per record, and an edge table
+    for each list or dict field, with one row per item (e.g. the reaction_reactants table has the entry_id,
+    metabolite and stoichiometry columns).
+    Parameters
+    ----------
+    records: Iterable[dict]
+        transformed records of the collection
+    collection: str
+        name of the collection (e.g. reaction)
+    Returns
+    -------
+    tables: dict
+        arrow table of each table name
+    """
+    if pyarrow is None:
+        raise ImportError('the pyarrow package is needed to write columnar files')
+
+    tables = {collection: _Table()}
+
+    for record in records:
+        entry_id = record['entry_id']
+        row = {}
+        for field, value in record.items():
+            if isinstance(value, (list, dict)):
+                table_name = collection + '_' + field
+                if table_name not in tables:
+                    tables[table_name] = _Table()
+                for edge in _edge_rows(entry_id, field, value):
+                    tables[table_name].append(edge)
+            else:
+                row[field] = value
+
+        tables[collection].append(row)
+
+    return {name: table.to_arrow() for name, table in tables.items()}
+
+
+def write_columnar(records: Iterable[dict], collection: str, output_folder: str, file_format: str = 'parquet') -> list:
+    """
+    Write the records of a collection as columnar tables, one file per table (see build_tables). Parquet files can be
+    read one column at a time and arrow (feather) files can be memory-mapped.
+    Parameters
+    ----------
+    records: Iterable[dict]
+        transformed records of the collection
+    collection: str
+        name of the collection (e.g. reaction)
+    output_folder: str
+        folder of the columnar files
+    file_format: str
+        'parquet' or 'arrow'
+    Returns
+    -------
+    filenames: list
+        the files written
+    """
+    if file_format not in COLUMNAR_FORMATS:
+        raise ValueError('file_format must be one of ' + ', '.join(COLUMNAR_FORMATS))
+
+    tables = build_tables(records, collection)
+
+    os.makedirs(output_folder, exist_ok=True)
+
+    filenames = []
+    for name, table in tables.items():
+        filename = os.path.join(output_folder, name + '.' + file_format)
+        if file_format == 'parquet':
+            pyarrow.parquet.write_table(table, filename)
+        else:
+            pyarrow.feather.write_feather(table, filename, compression='uncompressed')
+        filenames.append(filename)
+
+    logging.info('%s columnar tables were written to %s', collection, output_folder)
+
+    return filenames
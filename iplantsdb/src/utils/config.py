@@ -18,6 +18,16 @@ class Neo:
     password = str(db_configs.get('iplants-databases-configurations', 'neo4j_pass'))
 
 
+class BioCyc:
+    email = str(db_configs.get('iplants-databases-configurations', 'biocyc_email'))
+    password = str(db_configs.get('iplants-databases-configurations', 'biocyc_password'))
+
+
+class NCBI:
+    email = str(db_configs.get('iplants-databases-configurations', 'biocyc_email'))
+    api_key = db_configs.get('iplants-databases-configurations', 'ncbi_api_key', fallback=None)
+
+
 class API:
     """
     Change API base_url when updated
@@ -0,0 +1,221 @@
+import os
+import re
+import shutil
+import json
+import hashlib
+import logging
+from typing import Iterator, Iterable, Union
+
+from .extract import iter_json_records, write_json_records, find_json_file
+
+DELTA_FOLDER = 'delta'
+DELTA_KINDS = ('added', 'changed', 'removed')
+
+# fields that change in every version of a database without a change of the record content
+VOLATILE_FIELDS = ('database_version',)
+
+# field of the records (and of the mongo documents) with the digest of the record content
+FINGERPRINT_FIELD = 'fingerprint'
+
+
+def record_digest(record: dict) -> str:
+    """
+    Content hash of a transformed record. The record is serialized as canonical json (sorted keys, no spaces), so the
+    digest does not depend on the order of the fields, and the fields that change in every version and the stored
+    fingerprint are left out.
+    Parameters
+    ----------
+    record: dict
+        transformed record
+
+    Returns
+    -------
+    digest: str
+        blake2b hex digest of the record content
+    """
+    content = {k: v for k, v in record.items() if k not in VOLATILE_FIELDS and k != FINGERPRINT_FIELD}
+    serialized = json.dumps(content, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.blake2b(serialized.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def record_fingerprint(record: dict) -> str:
+    """
+    Fingerprint of a transformed record: the one stored in the record by the transform or, for the files written
+    before the fingerprints, its digest
+    """
+    return record.get(FINGERPRINT_FIELD) or record_digest(record)
+
+
+def version_key(version: str) -> tuple:
+    """
+    Sort key of a database version, comparing the numeric parts as numbers (e.g. 9.0 < 14.0 < 14.0.1 < 14a). The
+    numbers and the letters of a version are separate parts, and a number sorts before letters at the same position.
+    """
+    return tuple((0, int(part)) if part.isdigit() else (1, part) for part in re.findall(r'\d+|[^\d.\-]+', version))
+
+
+def previous_version(json_folder: str, db_version: str) -> Union[str, None]:
+    """
+    Find the most recent version of the same database that is older than db_version and has transformed files
+    Parameters
+    ----------
+    json_folder: str
+        folder with the transformed files of each database version (json_files)
+    db_version: str
+        version of the database (e.g. plantcyc_15.0)
+
+    Returns
+    -------
+    db_version: str, Optional
+        the previous version (e.g. plantcyc_14.0) or None if there is none
+    """
+    db_name, version = db_version.split('_')
+
+    versions = []
+    if os.path.isdir(json_folder):
+        for folder in os.listdir(json_folder):
+            name, _, other_version = folder.partition('_')
+            if name == db_name and other_version and version_key(other_version) < version_key(version):
+                versions.append(other_version)
+
+    if not versions:
+        return None
+
+    return db_name + '_' + max(versions, key=version_key)
+
+
+def record_digests(filename: str) -> dict:
+    """
+    Digest of each record of a transformed file. Only the digests are kept in memory.
+    Parameters
+    ----------
+    filename: str
+        json or ndjson file with transformed records
+
+    Returns
+    -------
+    digests: dict
+        digest of each entry_id
+    """
+    return {record['entry_id']: record_fingerprint(record) for record in iter_json_records(filename)}
+
+
+def _select_records(filename: str, old_digests: dict, kind: str) -> Iterator[dict]:
+    """
+    Yield the records of a transformed file that were added or changed since the previous version
+    """
+    for record in iter_json_records(filename):
+        old_digest = old_digests.get(record['entry_id'])
+        if kind == 'added' and old_digest is None:
+            yield record
+        elif kind == 'changed' and old_digest is not None and old_digest != record_fingerprint(record):
+            yield record
+
+
+def write_delta(new_file: str, old_file: str, output_folder: str, collection: str,
+                output_format: str = 'ndjson') -> dict:
+    """
+    Compare the transformed records of a collection with the records of the previous version and write the records
+    that were added, the records that changed and the identifiers of the records that were removed to
+    <collection>.added, <collection>.changed and <collection>.removed files. The new file is streamed, so only the
+    digests of the previous version are kept in memory.
+    Parameters
+    ----------
+    new_file: str
+        transformed file of the new version
+    old_file: str
+        transformed file of the previous version
+    output_folder: str
+        folder of the delta files
+    collection: str
+        name of the collection (e.g. reaction)
+    output_format: str
+        format of the delta files: 'ndjson', 'ndjson.gz', 'ndjson.zst' or 'json'
+
+    Returns
+    -------
+    counts: dict
+        number of added, changed and removed records
+    """
+    os.makedirs(output_folder, exist_ok=True)
+
+    old_digests = record_digests(old_file)
+
+    counts = {}
+    for kind in ('added', 'changed'):
+        filename = os.path.join(output_folder, collection + '.' + kind + '.' + output_format)
+        counts[kind] = write_json_records(_select_records(new_file, old_digests, kind), filename)
+
+    for record in iter_json_records(new_file):
+        old_digests.pop(record['entry_id'], None)
+
+    filename = os.path.join(output_folder, collection + '.removed.' + output_format)
+    counts['removed'] = write_json_records(({'entry_id': entry_id} for entry_id in old_digests), filename)
+
+    logging.info('%s delta: %d added, %d changed and %d removed records', collection, counts['added'],
+                 counts['changed'], counts['removed'])
+
+    return counts
+
+
+def write_deltas(new_folder: str, old_folder: str, collections: Iterable[str], output_format: str = 'ndjson') -> dict:
+    """
+    Write the delta files of each collection (see write_delta) to the delta folder of the new version. The delta
+    files of a previous run are removed.
+    Parameters
+    ----------
+    new_folder: str
+        folder of the transformed files of the new version
+    old_folder: str
+        folder of the transformed files of the previous version
+    collections: Iterable[str]
+        names of the collections
+    output_format: str
+        format of the delta files
+
+    Returns
+    -------
+    counts: dict
+        number of added, changed and removed records of each collection. The collections without a transformed file in
+        both versions are left out, and the loaders update them from the complete file.
+    """
+    output_folder = os.path.join(new_folder, DELTA_FOLDER)
+    shutil.rmtree(output_folder, ignore_errors=True)
+
+    counts = {}
+    for collection in collections:
+        new_file = find_json_file(new_folder, collection)
+        old_file = find_json_file(old_folder, collection)
+
+        if new_file is None or old_file is None:
+            logging.warning('%s has no transformed file to compare in %s and %s', collection, new_folder, old_folder)
+            continue
+
+        counts[collection] = write_delta(new_file, old_file, output_folder, collection, output_format)
+
+    return counts
+
+
+def find_delta_files(folder: str, collection: str) -> Union[dict, None]:
+    """
+    Find the delta files of a collection
+    Parameters
+    ----------
+    folder: str
+        folder of the transformed files of a database version
+    collection: str
+        name of the collection (e.g. reaction)
+
+    Returns
+    -------
+    delta_files: dict, Optional
+        file of the added, changed and removed records or None if the delta of the collection was not written
+    """
+    delta_folder = os.path.join(folder, DELTA_FOLDER)
+
+    delta_files = {kind: find_json_file(delta_folder, collection + '.' + kind) for kind in DELTA_KINDS}
+
+    if None in delta_files.values():
+        return None
+
+    return delta_files
@@ -0,0 +1,195 @@
+import os
+import sqlite3
+import logging
+import threading
+import xml.etree.ElementTree as ETe
+from urllib.parse import urlsplit
+from typing import Iterable, Iterator, IO, Union
+
+import requests
+
+from .config import PROJECT_PATH, NCBI
+from .api_requests import request, configure_host
+from .settings import ENTREZ_BATCH_SIZE, ENTREZ_REQUESTS_PER_SECOND, ENTREZ_REQUESTS_PER_SECOND_API_KEY
+
+EFETCH_URL = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi'
+SEQUENCE_CACHE = os.path.join(PROJECT_PATH, 'cache', 'ncbi_sequences.sqlite')
+
+# maximum number of parameters of a sqlite query
+QUERY_CHUNK = 900
+
+
+def iter_tinyseq(handle: Union[str, IO]) -> Iterator[dict]:
+    """
+    Stream the records of an efetch response in fasta format as xml (TinySeq), which, unlike the fasta text, has the
+    gi and the accession of each record
+    Parameters
+    ----------
+    handle: Union[str, IO]
+        xml file or binary file object
+
+    Yields
+    ------
+    record: dict
+        gi, accver and sequence of the record
+    """
+    root = None
+
+    for event, elem in ETe.iterparse(handle, events=('start', 'end')):
+        if root is None:
+            root = elem
+
+        if event == 'end' and elem.tag == 'TSeq':
+            yield {'gi': elem.findtext('TSeq_gi'),
+                   'accver': elem.findtext('TSeq_accver'),
+                   'sequence': elem.findtext('TSeq_sequence')}
+            root.clear()
+
+
+def record_keys(record: dict) -> list:
+    """
+    Identifiers that can be used to request a record: the gi, the accession with version and the accession without
+    version
+    """
+    keys = []
+    if record['gi']:
+        keys.append(record['gi'])
+    if record['accver']:
+        keys.append(record['accver'])
+        keys.append(record['accver'].split('.')[0])
+    return keys
+
+
+class EntrezSequenceFetcher:
+    """
+    Nucleotide sequences of the genes from NCBI. The sequences are requested in batches of comma-joined identifiers in
+    fasta format, under the NCBI rate limit, and kept in a sqlite cache, so that a gene is never requested twice.
+    """
+
+    def __init__(self,
+                 cache_file: Union[str, None] = SEQUENCE_CACHE,
+                 batch_size: int = ENTREZ_BATCH_SIZE,
+                 email: str = None,
+                 api_key: str = None,
+                 url: str = EFETCH_URL):
+        """
+        Parameters
+        ----------
+        cache_file: str, Optional
+            sqlite file of the sequences already requested. None to keep them in memory only
+        batch_size: int
+            number of identifiers of each request
+        email: str
+            email sent to NCBI with the requests. The one of the configuration file by default
+        api_key: str
+            NCBI API key, which raises the rate limit. The one of the configuration file (if any) by default
+        url: str
+            url of the efetch service
+        """
+        self.batch_size = batch_size
+        self.email = NCBI.email if email is None else email
+        self.api_key = NCBI.api_key if api_key is None else api_key
+        self.url = url
+        self.requests = 0
+
+        configure_host(urlsplit(url).netloc,
+                       ENTREZ_REQUESTS_PER_SECOND_API_KEY if self.api_key else ENTREZ_REQUESTS_PER_SECOND)
+
+        if cache_file:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+        self._connection = sqlite3.connect(cache_file or ':memory:', check_same_thread=False)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS sequences (ncbi_id TEXT PRIMARY KEY, sequence TEXT)')
+        self._lock = threading.Lock()
+
+    def cached(self, ncbi_ids: list) -> dict:
+        """
+        Sequences of the cache. The identifiers that were not found in NCBI are in the cache with a None sequence.
+        """
+        cached = {}
+        with self._lock:
+            for i in range(0, len(ncbi_ids), QUERY_CHUNK):
+                chunk = ncbi_ids[i:i + QUERY_CHUNK]
+                rows = self._connection.execute('SELECT ncbi_id, sequence FROM sequences WHERE ncbi_id IN (%s)'
+                                                % ','.join('?' * len(chunk)), chunk)
+                cached.update(rows)
+        return cached
+
+    def _fetch(self, ncbi_ids: list) -> Union[dict, None]:
+        """
+        Request the sequences of a batch of identifiers. None if the request failed.
+        """
+        params = {'db': 'nucleotide', 'id': ','.join(ncbi_ids), 'rettype': 'fasta', 'retmode': 'xml',
+                  'tool': 'iplantsdb', 'email': self.email}
+        if self.api_key:
+            params['api_key'] = self.api_key
+
+        self.requests += 1
+        with request(self.url, method='post', data=params, stream=True) as response:
+            if response.status_code != 200:
+                logging.warning('NCBI request of %d sequences failed', len(ncbi_ids))
+                return None
+
+            requested = set(ncbi_ids)
+            found = {}
+            response.raw.decode_content = True
+            try:
+                for record in iter_tinyseq(response.raw):
+                    for key in record_keys(record):
+                        if key in requested:
+                            found[key] = record['sequence']
+            except ETe.ParseError as exception:
+                logging.warning('NCBI response of %d sequences could not be read: %s', len(ncbi_ids), exception)
+                return None
+
+        return {ncbi_id: found.get(ncbi_id) for ncbi_id in ncbi_ids}
+
+    def sequences(self, ncbi_ids: Iterable[str], raise_errors: bool = False) -> dict:
+        """
+        Sequences of several genes. The identifiers that are not in the cache are requested in batches.
+        Parameters
+        ----------
+        ncbi_ids: Iterable[str]
+            ENTREZ or REFSEQ identifiers of the genes
+        raise_errors: bool
+            if True, a failed request raises requests.HTTPError. Otherwise its identifiers get a None sequence and are
+            requested again in the next call
+
+        Returns
+        -------
+        sequences: dict
+            nucleotide sequence (or None) of each identifier
+        """
+        ncbi_ids = list(dict.fromkeys(ncbi_ids))
+
+        sequences = self.cached(ncbi_ids)
+        missing = [ncbi_id for ncbi_id in ncbi_ids if ncbi_id not in sequences]
+
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            found = self._fetch(batch)
+            if found is None:
+                if raise_errors:
+                    raise requests.HTTPError('NCBI request of %d sequences failed' % len(batch))
+                continue
+
+            sequences.update(found)
+            with self._lock, self._connection:
+                self._connection.executemany('INSERT OR REPLACE INTO sequences VALUES (?, ?)', found.items())
+
+        return {ncbi_id: sequences.get(ncbi_id) for ncbi_id in ncbi_ids}
+
+    def close(self):
+        self._connection.close()
+
+
+_fetcher = None
+
+
+def entrez_fetcher() -> EntrezSequenceFetcher:
+    """
+    Fetcher shared by the gene sequence lookups of a process
+    """
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = EntrezSequenceFetcher()
+    return _fetcher
@@ -1,16 +1,145 @@
 import json
 import os
+import sys
+import gzip
 from .protrein import UniProtProtein
-from Bio import Entrez, SeqIO, Seq
-import urllib
 from .config import PROJECT_PATH
+from .biocyc import biocyc_client
+from .sequences import sequence_provider, TAIR_PROTEOME
+from .uniprot_mirror import uniprot_mirror
+from .uniprot import fetch_uniprot_entries
+from .entrez import entrez_fetcher
 import xml.etree.ElementTree as ETe
-import requests
-from typing import Union
-from configparser import RawConfigParser
+from typing import Union, Iterable, Iterator
 
-db_configs = RawConfigParser()
-db_configs.read('/iplantsdb/conf/iplantsdb.conf')
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON_FORMATS = ('ndjson', 'ndjson.gz', 'ndjson.zst', 'json')
+
+
+class PGDBRecord(dict):
+    """
+    Record of a cyc database dat file. It maps each attribute to the list of its values, like the dicts returned by
+    data_by_record, and keeps the annotations of the values (the lines starting with ^, such as ^COEFFICIENT or
+    ^COMPARTMENT, that follow an attribute value)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.annotations = {}
+
+    def annotate(self, attribute: str, value: str, annotation: str, annotation_value: str):
+        """
+        Add an annotation to a value of an attribute
+        Parameters
+        ----------
+        attribute: str
+            attribute name (e.g. LEFT)
+        value: str
+            annotated value of the attribute (e.g. WATER)
+        annotation: str
+            annotation name without the ^ (e.g. COEFFICIENT)
+        annotation_value: str
+            value of the annotation
+        """
+        self.annotations.setdefault(attribute, {}).setdefault(value, {})[annotation] = annotation_value
+
+    def annotation(self, attribute: str, value: str, annotation: str, default=None):
+        """
+        Get the annotation of a value of an attribute
+        Parameters
+        ----------
+        attribute: str
+            attribute name (e.g. LEFT)
+        value: str
+            annotated value of the attribute (e.g. WATER)
+        annotation: str
+            annotation name without the ^ (e.g. COEFFICIENT)
+        default:
+            value to return if the annotation does not exist
+
+        Returns
+        -------
+        annotation_value: str
+            value of the annotation or the default value
+        """
+        try:
+            return self.annotations[attribute][value][annotation]
+        except KeyError:
+            return default
+
+
+def parse_records(lines: Iterable[str]) -> Iterator[PGDBRecord]:
+    """
+    Parse the lines of a dat file and yield each record as soon as it is complete
+    Parameters
+    ----------
+    lines: Iterable[str]
+        lines of the dat file (e.g. an open file)
+
+    Returns
+    -------
+    records: Iterator[PGDBRecord]
+        records of the dat file
+    """
+    record = None
+    last_key = last_value = None
+
+    for line in lines:
+        line = line.strip()
+
+        if record is None:
+            if line and line[0] != "#" and "UNIQUE-ID" in line:
+                record = PGDBRecord()
+                last_key = last_value = None
+            else:
+                continue
+
+        if line == '//':
+            yield record
+            record = None
+            continue
+
+        if line.count(' - ') != 1:
+            continue
+
+        key, value = line.split(' - ')
+        key = sys.intern(key)
+
+        if key[0] == '^':
+            if last_key is not None:
+                record.annotate(last_key, last_value, sys.intern(key[1:]), value)
+            continue
+
+        if key not in record:
+            record[key] = [value]
+        else:
+            record[key].append(value)
+        last_key, last_value = key, value
+
+    if record:
+        yield record
+
+
+def iter_records(filename: str) -> Iterator[PGDBRecord]:
+    """
+    Read a dat file record by record. Only one record is kept in memory at a time.
+    Some dat files have latin-1 characters in comments, which are replaced when decoding the file.
+    Parameters
+    ----------
+    filename: str
+        json_path for the dat file
+
+    Returns
+    -------
+    records: Iterator[PGDBRecord]
+        records of the dat file, with the annotations of the attribute values
+    """
+    with open(filename, 'r', encoding='utf-8', errors='replace') as datafile:
+        yield from parse_records(datafile)
 
 
 def data_by_record(filename: str) -> list:
@@ -26,31 +155,7 @@ def data_by_record(filename: str) -> list:
     all_records: list
         dicts where each dict has the info of each record
     """
-    all_records = []
-    datafile = open(filename, 'r')
-    line = datafile.readline().strip()
-
-    while line:
-        if line[0] != "#" and "UNIQUE-ID" in line:
-            record = []
-            while line != '//':
-                record.append(line)
-                line = datafile.readline().strip()
-
-            record_dic = {}
-            for info in record:
-                if info.count(' - ') == 1:
-                    key, value = info.split(' - ')
-                    if key not in record_dic:
-                        record_dic[key] = [value]
-                    else:
-                        record_dic[key].append(value)
-
-            all_records.append(record_dic)
-        else:
-            line = datafile.readline().strip()
-
-    return all_records
+    return list(iter_records(filename))
 
 
 def write_json(dic: list, filename: str):
@@ -67,6 +172,127 @@ def write_json(dic: list, filename: str):
         json.dump(dic, json_file)
 
 
+def open_json_file(filename: str, mode: str = 'rt', path: str = None):
+    """
+    Open a json or ndjson file as text. Files ending in .gz are gzip compressed and files ending in .zst are zstd
+    compressed (it needs the zstandard package).
+    Parameters
+    ----------
+    filename: str
+        name of the file. Its extension sets the compression
+    mode: str
+        'rt' to read or 'wt' to write
+    path: str, optional
+        path to open instead of filename, with the compression of filename (e.g. a temporary file)
+    Returns
+    -------
+    file:
+        the open text file
+    """
+    path = path or filename
+
+    if filename.endswith('.gz'):
+        return gzip.open(path, mode, encoding='utf-8')
+
+    if filename.endswith('.zst'):
+        if zstandard is None:
+            raise ImportError('the zstandard package is needed to read and write ' + filename)
+        return zstandard.open(path, mode, encoding='utf-8')
+
+    return open(path, mode, encoding='utf-8')
+
+
+def write_json_records(records: Iterable[dict], filename: str) -> int:
+    """
+    Write the records to a file as they are produced, so that they are not kept in memory. Files ending in .json get
+    a json list and the other files (.ndjson, .ndjson.gz, .ndjson.zst) get one json record per line. The file is
+    written to a temporary file that replaces filename at the end, so a failed run does not leave a partial file.
+    Parameters
+    ----------
+    records: Iterable[dict]
+        records to save in the file
+    filename: str
+        name of the file
+    Returns
+    -------
+    n_records: int
+        number of records written
+    """
+    tmp_file = filename + '.' + str(os.getpid()) + '.tmp'
+    is_list = filename.endswith('.json')
+
+    n_records = 0
+    try:
+        with open_json_file(filename, 'wt', path=tmp_file) as json_file:
+            if is_list:
+                json_file.write('[')
+
+            for record in records:
+                if is_list:
+                    if n_records:
+                        json_file.write(', ')
+                    json_file.write(json.dumps(record))
+                else:
+                    json_file.write(json.dumps(record) + '\n')
+                n_records += 1
+
+            if is_list:
+                json_file.write(']')
+
+        os.replace(tmp_file, filename)
+
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+    return n_records
+
+
+def iter_json_records(filename: str) -> Iterator[dict]:
+    """
+    Read the records of a json file written by write_json or write_json_records. The ndjson files (optionally
+    compressed) are read one line at a time. The json files have a single list and are loaded at once.
+    Parameters
+    ----------
+    filename: str
+        name of the json or ndjson file
+    Returns
+    -------
+    records: Iterator[dict]
+        records of the file
+    """
+    with open_json_file(filename) as json_file:
+        if filename.endswith('.json'):
+            yield from json.load(json_file)
+            return
+
+        for line in json_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def find_json_file(folder: str, name: str) -> Union[str, None]:
+    """
+    Find the transformed file of a collection in any of the formats written by the transformers
+    Parameters
+    ----------
+    folder: str
+        folder of the transformed files of a database version
+    name: str
+        name of the collection file without extension (e.g. metabolite)
+    Returns
+    -------
+    filename: str, Optional
+        path of the file or None if the collection was not transformed
+    """
+    for extension in JSON_FORMATS:
+        filename = os.path.join(folder, name + '.' + extension)
+        if os.path.isfile(filename):
+            return filename
+
+    return None
+
+
 def get_coeffs_reactions(reac_file: str) -> dict:
     """
     Get the coefficients of the reactions
@@ -80,41 +306,12 @@ def get_coeffs_reactions(reac_file: str) -> dict:
         reaction coefficients
     """
 
-    datfile = open(reac_file, 'r')
     records = {}
-    line = datfile.readline()
-    unique_id = ''
-
-    while line:
-        if line[0] != "#" and "UNIQUE-ID" in line:
-            unique_id = line.strip().split(" - ")[1]
-            records[unique_id] = {}
-            line = datfile.readline()
-            records[unique_id]['LEFT'] = {}
-            records[unique_id]['RIGHT'] = {}
-
-        elif line[:4] == 'LEFT':
-            substrate = line.strip().split(" - ")[1]
-            line = datfile.readline()
-            if line[:12] == "^COEFFICIENT":
-                stoic = line.strip().split(" - ")[1]
-
-                records[unique_id]['LEFT'][substrate] = stoic
-            else:
-                records[unique_id]['LEFT'][substrate] = 1.0
-
-        elif line[:5] == "RIGHT":
-            substrate = line.strip().split(" - ")[1]
-            line = datfile.readline()
-            if line[:12] == "^COEFFICIENT":
-                stoic = line.strip().split(" - ")[1]
-
-                records[unique_id]['RIGHT'][substrate] = stoic
-            else:
-                records[unique_id]['RIGHT'][substrate] = 1.0
-
-        else:
-            line = datfile.readline()
+    for record in iter_records(reac_file):
+        unique_id = record['UNIQUE-ID'][0]
+        records[unique_id] = {side: {met: record.annotation(side, met, 'COEFFICIENT', 1.0)
+                                     for met in record.get(side, [])}
+                              for side in ('LEFT', 'RIGHT')}
 
     return records
 
@@ -141,7 +338,7 @@ def get_enzrxn_data(db_path: str, for_rxn: bool = True) -> dict:
     """
 
     filename = os.path.join(db_path, 'enzrxns.dat')
-    data = data_by_record(filename=filename)
+    data = iter_records(filename)
 
     enz_rxn = {}
     rxn_enz = {}
@@ -188,7 +385,7 @@ def get_enz_type_genes(db_path: str) -> dict:
     """
 
     filename = os.path.join(db_path, 'proteins.dat')
-    data = data_by_record(filename=filename)
+    data = iter_records(filename)
 
     enz_dict = {}
     for record in data:
@@ -215,31 +412,27 @@ def get_coeffs_complexes(db_path: str) -> dict:
     records: dict
         complex coefficents
     """
-    datfile = open(os.path.join(db_path, 'proteins.dat'), 'r')
     records = {}
-    line = datfile.readline()
-    unique_id = ''
-
-    while line:
-        if line[0] != "#" and "UNIQUE-ID" in line:
-            unique_id = line.strip().split(" - ")[1]
-            records[unique_id] = {}
-            line = datfile.readline()
-
-        elif line[:10] == 'COMPONENTS':
-            comp = line.strip().split(" - ")[1]
-            line = datfile.readline()
-            if line[:12] == "^COEFFICIENT":
-                stoic = line.strip().split(" - ")[1]
-                records[unique_id][comp] = stoic
+    for record in iter_records(os.path.join(db_path, 'proteins.dat')):
+        records[record['UNIQUE-ID'][0]] = complex_coefficients(record)
 
-            else:
-                records[unique_id][comp] = 1.0
+    return records
 
-        else:
-            line = datfile.readline()
 
-    return records
+def complex_coefficients(record: PGDBRecord) -> dict:
+    """
+    Get the coefficients of the components of a protein complex record
+    Parameters
+    ----------
+    record: PGDBRecord
+        record of the proteins.dat file
+
+    Returns
+    -------
+    coefficients: dict
+        coefficient of each component
+    """
+    return {comp: record.annotation('COMPONENTS', comp, 'COEFFICIENT', 1.0) for comp in record.get('COMPONENTS', [])}
 
 
 def get_uniprot_data(protein_id: str) -> Union[dict, None]:
@@ -251,6 +444,9 @@ def get_uniprot_data(protein_id: str) -> Union[dict, None]:
     - uniprot product
     - sequence
 
+    The data comes from the local uniprot mirror (see utils.uniprot_mirror) if it was built and has the enzyme, and
+    from the uniprot API otherwise.
+
     Parameters
     ----------
     protein_id: str
@@ -262,6 +458,12 @@ def get_uniprot_data(protein_id: str) -> Union[dict, None]:
         uniprot data
     """
 
+    mirror = uniprot_mirror()
+    if mirror is not None:
+        uniprot_dic = mirror.get(protein_id)
+        if uniprot_dic is not None:
+            return uniprot_dic
+
     uniprot_dic = {}
     p = UniProtProtein(accession=protein_id)
     try:
@@ -284,6 +486,37 @@ def get_uniprot_data(protein_id: str) -> Union[dict, None]:
     return uniprot_dic
 
 
+def get_uniprot_data_many(protein_ids: Iterable[str], raise_errors: bool = False) -> dict:
+    """
+    Get the uniprot data of several enzymes (see get_uniprot_data). The enzymes that are not in the local uniprot
+    mirror are fetched from the uniprot API in batches.
+    Parameters
+    ----------
+    protein_ids: Iterable[str]
+        uniprot identifiers of the enzymes
+    raise_errors: bool
+        if True, a failed request to the uniprot API raises requests.HTTPError
+
+    Returns
+    -------
+    uniprot_data: dict
+        uniprot data of each identifier found
+    """
+    protein_ids = list(dict.fromkeys(protein_ids))
+
+    uniprot_data = {}
+
+    mirror = uniprot_mirror()
+    if mirror is not None:
+        uniprot_data.update(mirror.get_many(protein_ids))
+
+    missing = [protein_id for protein_id in protein_ids if protein_id not in uniprot_data]
+    if missing:
+        uniprot_data.update(fetch_uniprot_entries(missing, raise_errors=raise_errors))
+
+    return uniprot_data
+
+
 def get_sequence_gene(ncbi_id: str) -> Union[str, None]:
     """
     Get the sequence of a gene
@@ -297,23 +530,39 @@ def get_sequence_gene(ncbi_id: str) -> Union[str, None]:
     sequence: str
         gene nucleotide sequence
     """
-    Entrez.email = str(db_configs.get('iplants-databases-configurations', 'biocyc_email'))
-    try:
-        handle = Entrez.efetch(db="nucleotide", id=ncbi_id, rettype="gb", retmode="txt")
-    except urllib.error.HTTPError:
-        return
-    try:
-        rec = SeqIO.read(handle, format="gb")
-        sequence = str(rec.seq)
-    except Seq.UndefinedSequenceError:
-        return
+    return get_sequences_genes([ncbi_id])[ncbi_id]
 
-    return sequence
+
+def get_sequences_genes(ncbi_ids: Iterable[str], raise_errors: bool = False) -> dict:
+    """
+    Get the sequences of several genes, in batches of identifiers (see utils.entrez). The crossrefs with several
+    comma-separated identifiers get the sequence of the first identifier found.
+    Parameters
+    ----------
+    ncbi_ids: Iterable[str]
+        ENTREZ or REFSEQ identifiers of the genes
+    raise_errors: bool
+        if True, a failed request to NCBI raises requests.HTTPError
+
+    Returns
+    -------
+    sequences: dict
+        gene nucleotide sequence (or None) of each identifier
+    """
+    ncbi_ids = list(dict.fromkeys(ncbi_ids))
+    parts = {ncbi_id: [part.strip() for part in ncbi_id.split(',') if part.strip()] for ncbi_id in ncbi_ids}
+
+    sequences = entrez_fetcher().sequences((part for id_parts in parts.values() for part in id_parts),
+                                           raise_errors=raise_errors)
+
+    return {ncbi_id: next((sequences[part] for part in id_parts if sequences[part]), None)
+            for ncbi_id, id_parts in parts.items()}
 
 
 def get_tair_protein(tair_id: str) -> Union[str, None]:
     """
-    Get protein sequence from TAIR10 protein fasta file
+    Get protein sequence from the ARAPORT11 protein fasta file. The file is indexed in the first call (see
+    utils.sequences), so each call only reads the record of the tair_id
     Parameters
     ----------
     tair_id: str
@@ -321,25 +570,14 @@ def get_tair_protein(tair_id: str) -> Union[str, None]:
 
     Returns
     -------
-    sequence_dic[tair_id]: str
+    sequence: str
         sequence for the tair_id
     None if tair_id not in fasta file
     """
+    if '.' not in tair_id:
+        tair_id = tair_id + '.1'
 
-    data = os.path.join(PROJECT_PATH, 'protein_sequences', 'ARAPORT11_protein.fasta')
-
-    sequence_dic = {}
-    fasta_records = SeqIO.parse(data, format='fasta')
-    for rec in fasta_records:
-        sequence_dic[rec.id] = str(rec.seq)
-
-    try:
-        if '.' not in tair_id:
-            tair_id = tair_id + '.1'
-        sequence = sequence_dic[tair_id]
-        return sequence
-    except KeyError:
-        return
+    return sequence_provider().sequence(TAIR_PROTEOME, tair_id)
 
 
 def files_exist(list_of_files: list) -> bool:
@@ -375,26 +613,7 @@ def taxid_biocyc_api(org: str) -> Union[int, None]:
         taxonomy identifier for the organism
 
     """
-    api = 'https://websvc.biocyc.org/getxml?id=META:' + org
-
-    taxid = ''
-
-    try:
-        s = requests.Session()
-        s.post('https://websvc.biocyc.org/credentials/login/',
-               data={'email': str(db_configs.get('iplants-databases-configurations', 'biocyc_email')),
-                     'password': str(db_configs.get('iplants-databases-configurations',
-                                                    'biocyc_password'))})
-        res = s.get(api)
-        tree = ETe.fromstring(res.content)
-        for child in tree.iter():
-            if child.tag == 'Organism' and 'resource' in child.attrib:
-                taxid_complete = child.attrib['frameid']
-                taxid = int(taxid_complete.split('-')[1])
-    except:
-        taxid = None
-
-    return taxid
+    return biocyc_client().taxid(org)
 
 
 def get_reac_rev_xml(filename: str) -> Union[dict, None]:
@@ -0,0 +1,509 @@
+import os
+import io
+import gc
+import hashlib
+import logging
+import pickle
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from typing import Iterator, Iterable
+
+from .extract import PGDBRecord, parse_records, iter_records, complex_coefficients
+
+DAT_FILES = ('compounds.dat', 'reactions.dat', 'proteins.dat', 'enzrxns.dat', 'genes.dat', 'pathways.dat')
+
+CACHE_FORMAT_VERSION = 1
+CACHE_SUFFIX = '.records.pickle'
+CACHE_BATCH_SIZE = 1000
+
+MIN_CHUNK_SIZE = 1 << 20
+
+
+def _without_gc(function, *args):
+    """
+    Call a function that unpickles records with the garbage collector paused. Otherwise, it would run many times for
+    the thousands of new containers, and it cannot find cycles in them.
+    """
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return function(*args)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def file_digest(filename: str) -> str:
+    """
+    Content hash of a file
+    Parameters
+    ----------
+    filename: str
+        complete path of the file
+
+    Returns
+    -------
+    digest: str
+        blake2b hex digest of the file content
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(filename: str) -> str:
+    """
+    Path of the parsed-record cache of a dat file, saved next to the dat file
+    """
+    return filename + CACHE_SUFFIX
+
+
+def _cache_header(filename: str) -> dict:
+    stat = os.stat(filename)
+    return {'format': CACHE_FORMAT_VERSION, 'size': stat.st_size, 'mtime': stat.st_mtime_ns,
+            'digest': file_digest(filename)}
+
+
+def is_cache_valid(filename: str) -> bool:
+    """
+    Checks if the parsed-record cache of a dat file can be used. The cache is keyed by the size, modification time and
+    content hash of the dat file: it is valid if the size is the same and either the modification time or the content
+    hash is the same.
+    Parameters
+    ----------
+    filename: str
+        complete path of the dat file
+
+    Returns
+    -------
+    bool:
+        True if the cache exists and was created for the current content of the dat file
+    """
+    try:
+        with open(cache_path(filename), 'rb') as cache:
+            header = pickle.load(cache)
+        stat = os.stat(filename)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return False
+
+    if not isinstance(header, dict) or header.get('format') != CACHE_FORMAT_VERSION:
+        return False
+
+    if header['size'] != stat.st_size:
+        return False
+
+    if header['mtime'] == stat.st_mtime_ns:
+        return True
+
+    return header['digest'] == file_digest(filename)
+
+
+def read_cache(filename: str) -> Iterator[PGDBRecord]:
+    """
+    Read the records of a dat file from its parsed-record cache. The records are saved in batches, so only one batch
+    is kept in memory at a time.
+    Parameters
+    ----------
+    filename: str
+        complete path of the dat file
+
+    Returns
+    -------
+    records: Iterator[PGDBRecord]
+        records of the dat file
+    """
+    with open(cache_path(filename), 'rb') as cache:
+        pickle.load(cache)
+        while True:
+            try:
+                batch = _without_gc(pickle.load, cache)
+            except EOFError:
+                break
+            yield from batch
+
+
+def write_cache(filename: str, records: Iterable[PGDBRecord]) -> Iterator[PGDBRecord]:
+    """
+    Save the records of a dat file in its parsed-record cache while they are consumed. The cache is only kept if all
+    records were consumed. If the cache cannot be written, the records are yielded anyway.
+    Parameters
+    ----------
+    filename: str
+        complete path of the dat file
+    records: Iterable[PGDBRecord]
+        records of the dat file
+
+    Returns
+    -------
+    records: Iterator[PGDBRecord]
+        the same records
+    """
+    header = _cache_header(filename)
+
+    tmp_file = cache_path(filename) + '.' + str(os.getpid()) + '.tmp'
+    try:
+        cache = open(tmp_file, 'wb')
+    except OSError as e:
+        logging.warning('the parsed-record cache of ' + filename + ' cannot be written: ' + str(e))
+        yield from records
+        return
+
+    complete = False
+    try:
+        pickle.dump(header, cache, protocol=pickle.HIGHEST_PROTOCOL)
+        batch = []
+        for record in records:
+            batch.append(record)
+            yield record
+            if len(batch) == CACHE_BATCH_SIZE:
+                pickle.dump(batch, cache, protocol=pickle.HIGHEST_PROTOCOL)
+                batch = []
+        pickle.dump(batch, cache, protocol=pickle.HIGHEST_PROTOCOL)
+        complete = True
+    finally:
+        cache.close()
+        if complete:
+            os.replace(tmp_file, cache_path(filename))
+        else:
+            os.remove(tmp_file)
+
+
+def record_chunks(filename: str, chunk_size: int) -> list:
+    """
+    Split a dat file in byte ranges of about chunk_size bytes. Each range ends right after a // line, so that it only
+    has complete records.
+    Parameters
+    ----------
+    filename: str
+        complete path of the dat file
+    chunk_size: int
+        approximate size of each range in bytes
+
+    Returns
+    -------
+    chunks: list
+        (start, end) byte offsets of each range, in the order of the file
+    """
+    size = os.path.getsize(filename)
+    chunks = []
+    start = 0
+
+    with open(filename, 'rb') as datfile:
+        while start < size:
+            datfile.seek(min(start + chunk_size, size))
+            if datfile.tell() < size:
+                # the current line may be incomplete
+                datfile.readline()
+
+            line = datfile.readline()
+            while line and line.strip() != b'//':
+                line = datfile.readline()
+
+            end = datfile.tell()
+            chunks.append((start, end))
+            start = end
+
+    return chunks
+
+
+def _parse_chunk(filename: str, start: int, end: int, part_file: str) -> int:
+    """
+    Parse a byte range of a dat file in a worker process and save its records in a part of the parsed-record cache
+    """
+    with open(filename, 'rb') as datfile:
+        datfile.seek(start)
+        data = datfile.read(end - start)
+
+    lines = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', errors='replace')
+
+    n_records = 0
+    with open(part_file, 'wb') as part:
+        batch = []
+        for record in parse_records(lines):
+            batch.append(record)
+            if len(batch) == CACHE_BATCH_SIZE:
+                pickle.dump(batch, part, protocol=pickle.HIGHEST_PROTOCOL)
+                n_records += len(batch)
+                batch = []
+        if batch:
+            pickle.dump(batch, part, protocol=pickle.HIGHEST_PROTOCOL)
+            n_records += len(batch)
+
+    return n_records
+
+
+def parallel_cache(filename: str, workers: int, chunk_size: int = None):
+    """
+    Parse a dat file in a pool of processes and write its parsed-record cache. The file is split in byte ranges at
+    record boundaries, each worker saves the records of a range in a part file and the parts are joined in the order
+    of the file, so the records never go through this process.
+    Parameters
+    ----------
+    filename: str
+        complete path of the dat file
+    workers: int
+        number of processes
+    chunk_size: int, optional
+        approximate size of each range in bytes. By default, the file is split in four ranges per worker, with at
+        least MIN_CHUNK_SIZE bytes each
+    """
+    if not chunk_size:
+        chunk_size = max(MIN_CHUNK_SIZE, os.path.getsize(filename) // (workers * 4) + 1)
+
+    header = _cache_header(filename)
+    chunks = record_chunks(filename, chunk_size)
+    # the pid keeps apart the files of runs on the same download folder
+    parts = [cache_path(filename) + '.' + str(os.getpid()) + '.' + str(i) + '.part' for i in range(len(chunks))]
+    tmp_file = cache_path(filename) + '.' + str(os.getpid()) + '.tmp'
+
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            n_records = sum(executor.map(_parse_chunk, [filename] * len(chunks), *zip(*chunks), parts))
+
+        with open(tmp_file, 'wb') as cache:
+            pickle.dump(header, cache, protocol=pickle.HIGHEST_PROTOCOL)
+            for part in parts:
+                with open(part, 'rb') as part_data:
+                    shutil.copyfileobj(part_data, cache)
+        os.replace(tmp_file, cache_path(filename))
+
+    finally:
+        for part in parts + [tmp_file]:
+            if os.path.exists(part):
+                os.remove(part)
+
+    logging.debug('%d records of %s were parsed in %d chunks', n_records, filename, len(chunks))
+
+
+def _can_split(filename: str, workers: int) -> bool:
+    return workers > 1 and os.path.getsize(filename) > MIN_CHUNK_SIZE
+
+
+def load_records(filename: str, use_cache: bool = True, workers: int = 1) -> Iterator[PGDBRecord]:
+    """
+    Read the records of a dat file, from the parsed-record cache if it is valid. Otherwise, the dat file is parsed
+    and the cache is written.
+    Parameters
+    ----------
+    filename: str
+        complete path of the dat file
+    use_cache: bool
+        if false, the dat file is always parsed and no cache is written
+    workers: int
+        number of processes used to parse a large dat file. The dat file is only split between processes when the
+        cache is used
+
+    Returns
+    -------
+    records: Iterator[PGDBRecord]
+        records of the dat file
+    """
+    if not use_cache:
+        return iter_records(filename)
+
+    if is_cache_valid(filename):
+        logging.debug('reading the records of ' + filename + ' from the parsed-record cache')
+        return read_cache(filename)
+
+    if _can_split(filename, workers):
+        parallel_cache(filename, workers)
+        return read_cache(filename)
+
+    return write_cache(filename, iter_records(filename))
+
+
+class ParsedPGDB:
+
+    def __init__(self, data_path: str, use_cache: bool = True, workers: int = 1):
+        """
+        Parsed data of a cyc database (PGDB). It is shared by the transformers of a transform run, so that each dat
+        file is parsed once and the indexes between files are built once, when they are first needed.
+        Parameters
+        ----------
+        data_path: str
+            the folder of the dat files of the cyc database
+        use_cache: bool
+            if true, the parsed records are saved in a cache next to each dat file and read from it in the next runs
+        workers: int
+            number of processes used to parse each large dat file
+        """
+
+        self.data_path = data_path
+        self.use_cache = use_cache
+        self.workers = workers
+
+        self._records = {}
+
+    def path(self, filename: str) -> str:
+        """
+        Complete path of a dat file. Some releases save the reactions.dat file as #reactions.dat#
+        Parameters
+        ----------
+        filename: str
+            name of the dat file (e.g. proteins.dat)
+
+        Returns
+        -------
+        path: str
+            complete path of the dat file
+        """
+        path = os.path.join(self.data_path, filename)
+        if not os.path.isfile(path) and os.path.isfile(os.path.join(self.data_path, '#' + filename + '#')):
+            path = os.path.join(self.data_path, '#' + filename + '#')
+        return path
+
+    def records(self, filename: str) -> list:
+        """
+        Records of a dat file. The file is parsed in the first call and the records are kept for the next calls.
+        Parameters
+        ----------
+        filename: str
+            name of the dat file (e.g. proteins.dat)
+
+        Returns
+        -------
+        records: list
+            records of the dat file
+        """
+        if filename not in self._records:
+            self._records[filename] = list(load_records(self.path(filename), use_cache=self.use_cache,
+                                                        workers=self.workers))
+        return self._records[filename]
+
+    def iter_records(self, filename: str) -> Iterator[PGDBRecord]:
+        """
+        Iterate over the records of a dat file without keeping them. If the file was already parsed, the kept
+        records are used.
+        Parameters
+        ----------
+        filename: str
+            name of the dat file (e.g. compounds.dat)
+
+        Returns
+        -------
+        records: Iterator[PGDBRecord]
+            records of the dat file
+        """
+        if filename in self._records:
+            return iter(self._records[filename])
+        return load_records(self.path(filename), use_cache=self.use_cache, workers=self.workers)
+
+    def cache_files(self, filenames: tuple = DAT_FILES):
+        """
+        Write the parsed-record cache of the dat files that do not have a valid one, without keeping the records.
+        It is used before running transformers in other processes, so that they read the records from the cache.
+        Parameters
+        ----------
+        filenames: tuple
+            names of the dat files
+        """
+        if not self.use_cache:
+            return
+
+        for filename in filenames:
+            path = self.path(filename)
+            if not os.path.isfile(path) or is_cache_valid(path):
+                continue
+
+            if _can_split(path, self.workers):
+                parallel_cache(path, self.workers)
+            else:
+                for _ in write_cache(path, iter_records(path)):
+                    pass
+
+    @cached_property
+    def _enzrxn_index(self) -> tuple:
+        enz_rxns = {}
+        rxn_enzs = {}
+
+        for record in self.iter_records('enzrxns.dat'):
+            if 'ENZYME' not in record or 'REACTION' not in record:
+                continue
+
+            enz = record['ENZYME'][0]
+            rxn = record['REACTION'][0]
+
+            if rxn not in rxn_enzs:
+                rxn_enzs[rxn] = [enz]
+            else:
+                rxn_enzs[rxn].append(enz)
+
+            if enz not in enz_rxns:
+                enz_rxns[enz] = [rxn]
+            else:
+                enz_rxns[enz].append(rxn)
+
+        return enz_rxns, rxn_enzs
+
+    @property
+    def enz_rxns(self) -> dict:
+        """
+        Reactions of each enzyme, from the enzrxns.dat file
+        """
+        return self._enzrxn_index[0]
+
+    @property
+    def rxn_enzs(self) -> dict:
+        """
+        Enzymes of each reaction, from the enzrxns.dat file
+        """
+        return self._enzrxn_index[1]
+
+    @cached_property
+    def enzyme_types(self) -> dict:
+        """
+        Type and genes of each enzyme, from the proteins.dat file
+        """
+        enz_dict = {}
+        for record in self.records('proteins.dat'):
+            enz_id = record['UNIQUE-ID'][0]
+            enz_dict[enz_id] = {}
+            if 'TYPES' in record:
+                enz_dict[enz_id]['TYPE'] = record['TYPES'][0]
+            if 'GENE' in record:
+                enz_dict[enz_id]['GENES'] = record['GENE']
+
+        return enz_dict
+
+    @cached_property
+    def complex_coefficients(self) -> dict:
+        """
+        Coefficients of the components of each protein complex, from the proteins.dat file
+        """
+        return {record['UNIQUE-ID'][0]: complex_coefficients(record)
+                for record in self.records('proteins.dat') if 'COMPONENTS' in record}
+
+    @cached_property
+    def organism_index(self) -> dict:
+        """
+        Pathways, enzymes and genes of each organism (SPECIES) of the pathways.dat and proteins.dat files, in one pass
+        over each file. The organisms are in order of first appearance and the lists have no repeated identifiers.
+
+        Returns
+        -------
+        organism_index: dict
+            dict with the pathways, enzymes and genes lists of each organism identifier
+        """
+        index = {}
+
+        def members(organism: str) -> dict:
+            if organism not in index:
+                # dicts are used as ordered sets
+                index[organism] = {'pathways': {}, 'enzymes': {}, 'genes': {}}
+            return index[organism]
+
+        for record in self.records('pathways.dat'):
+            for organism in record.get('SPECIES', ()):
+                members(organism)['pathways'][record['UNIQUE-ID'][0]] = None
+
+        for record in self.records('proteins.dat'):
+            for organism in record.get('SPECIES', ()):
+                organism_members = members(organism)
+                organism_members['enzymes'][record['UNIQUE-ID'][0]] = None
+                organism_members['genes'].update(dict.fromkeys(record.get('GENE', ())))
+
+        return {organism: {field: list(ids) for field, ids in organism_members.items()}
+                for organism, organism_members in index.items()}
@@ -1,8 +1,163 @@
+import re
+from typing import Iterable, Union
+
 import pandas as pd
 
 from .bioapi import BioAPI
 from .uniprot import fetch_uniprot_record, query_uniprot
 
+LOCUS_COLUMN = 'Gene names'
+NAME_COLUMN = 'Gene names  (primary )'
+NON_ALPHANUMERIC = re.compile(r'[\W_]+')
+
+
+def normalize_gene_names(names: pd.Series, split: bool = True) -> pd.Series:
+    """
+    Lower case gene names of a uniprot query. If split, the names of each row are split in words without the non
+    alphanumeric characters, with one row per word. The rows keep the index of the query and the empty names are left
+    out.
+    Parameters
+    ----------
+    names: pd.Series
+        gene names column of a uniprot query
+    split: bool
+        whether to split the names in words
+
+    Returns
+    -------
+    names: pd.Series
+        normalized names
+    """
+    names = names.fillna('').astype(str).str.lower()
+
+    if split:
+        names = names.str.split().explode().fillna('').str.replace(NON_ALPHANUMERIC, '', regex=True)
+
+    return names[names.str.len() > 0]
+
+
+def substrings(text: str) -> set:
+    """
+    All the non empty substrings of a text
+    """
+    return {text[i:j] for i in range(len(text)) for j in range(i + 1, len(text) + 1)}
+
+
+def normalize_term(term: str, split: bool = True) -> str:
+    """
+    Lower case locus tag or gene name, without the non alphanumeric characters if the names are split in words (see
+    normalize_gene_names)
+    """
+    term = term.lower()
+    if split:
+        term = NON_ALPHANUMERIC.sub('', term)
+    return term
+
+
+def match_gene_names(names: pd.Series, terms: Iterable[str], split: bool = True) -> dict:
+    """
+    Rows of the query whose names are a term, for each term. The exact matches of all terms are found with one join of
+    the terms and the names. The terms without an exact match fall back to the rows whose names contain the term or
+    are contained in it (with str.contains and isin over the substrings of the term), one scan of the names per term.
+    Parameters
+    ----------
+    names: pd.Series
+        names normalized by normalize_gene_names
+    terms: Iterable[str]
+        locus tags or gene names
+    split: bool
+        whether the names were split in words
+
+    Returns
+    -------
+    matches: dict
+        labels of the matching rows of each term
+    """
+    terms = list(dict.fromkeys(terms))
+    keys = pd.DataFrame({'term': terms, 'key': [normalize_term(term, split=split) for term in terms]})
+    words = pd.DataFrame({'key': names.to_numpy(), 'row': names.index})
+
+    exact = keys.merge(words, on='key').drop_duplicates(['term', 'row'])
+    matches = {}
+    for term, row in zip(exact['term'], exact['row']):
+        matches.setdefault(term, []).append(row)
+
+    for term, key in zip(keys['term'], keys['key']):
+        if term not in matches:
+            mask = names.str.contains(key, regex=False) | names.isin(substrings(key))
+            matches[term] = list(names.index[mask.to_numpy()].unique())
+    return matches
+
+
+def query_accessions(query: pd.DataFrame,
+                     locus_tags: Iterable[str] = (),
+                     names: Iterable[str] = (),
+                     taxonomy: Union[str, int] = None) -> dict:
+    """
+    Uniprot accessions of several locus tags and gene names from the result of one uniprot query (e.g. of all the
+    proteins of an organism). The gene names columns are normalized once for all terms.
+    Parameters
+    ----------
+    query: pd.DataFrame
+        result of query_uniprot
+    locus_tags: Iterable[str]
+        locus tags, matched with the words of the gene names
+    names: Iterable[str]
+        primary gene names
+    taxonomy: Union[str, int], Optional
+        taxonomy identifier of the organism of the proteins
+
+    Returns
+    -------
+    accessions: dict
+        accession of each locus tag and name, or None if no entry or more than one entry matches it
+    """
+    if taxonomy:
+        query = query[query['Organism ID'].astype(str) == str(taxonomy)]
+
+    entries = dict(zip(query.index, query['Entry']))
+
+    accessions = {}
+    for column, split, terms in ((LOCUS_COLUMN, True, list(locus_tags)), (NAME_COLUMN, False, list(names))):
+        if not terms:
+            continue
+
+        normalized = normalize_gene_names(query[column], split=split)
+
+        for term, rows in match_gene_names(normalized, terms, split=split).items():
+            accessions[term] = entries[rows[0]] if len(rows) == 1 else None
+
+    return accessions
+
+
+def organism_accessions(taxonomy: Union[str, int],
+                        locus_tags: Iterable[str] = (),
+                        names: Iterable[str] = (),
+                        limit: int = 100000) -> dict:
+    """
+    Uniprot accessions of the genes of an organism, with one uniprot query of all the proteins of the organism
+    Parameters
+    ----------
+    taxonomy: Union[str, int]
+        taxonomy identifier of the organism
+    locus_tags: Iterable[str]
+        locus tags of the genes
+    names: Iterable[str]
+        primary names of the genes
+    limit: int
+        maximum number of proteins of the query
+
+    Returns
+    -------
+    accessions: dict
+        accession (or None) of each locus tag and name
+    """
+    query = query_uniprot(query={'taxonomy': taxonomy}, limit=limit)
+    if query is None:
+        return {}
+
+    return query_accessions(query, locus_tags=locus_tags, names=names, taxonomy=taxonomy)
+
 
 class UniProtProtein(BioAPI):
 
@@ -118,62 +273,14 @@ class UniProtProtein(BioAPI):
 
     def parse_uniprot_query(self, query: pd.DataFrame):
 
-        if self._taxonomy:
-            tax_mask = query.loc[:, 'Organism ID'] == self._taxonomy
-
-            query = query[tax_mask]
-
         if self._locus_tag:
-
-            loci = query.loc[:, 'Gene names']
-            loci_mask = []
-
-            for value in loci:
-
-                mask_value = False
-
-                values = value.split()
-
-                for text in values:
-                    text = ''.join(letter for letter in text if letter.isalnum())
-
-                    if self._locus_tag.lower() in text.lower() or text.lower() in self._locus_tag.lower():
-                        mask_value = True
-                        break
-
-                loci_mask.append(mask_value)
-
-            accessions = query.loc[loci_mask, 'Entry']
-
-            if accessions.size == 1:
-                self._accession = accessions[0]
-
-            else:
-                self._accession = None
-
+            accessions = query_accessions(query, locus_tags=[self._locus_tag], taxonomy=self._taxonomy)
+            self._accession = accessions[self._locus_tag]
             return
 
         if self._name:
-
-            loci = query.loc[:, 'Gene names  (primary )']
-            loci_mask = []
-
-            for value in loci:
-
-                if self._name.lower() in value.lower() or value.lower() in self._name.lower():
-                    loci_mask.append(True)
-
-                else:
-                    loci_mask.append(False)
-
-            accessions = query.loc[loci_mask, 'Entry']
-
-            if accessions.size == 1:
-                self._accession = accessions[0]
-
-            else:
-                self._accession = None
-
+            accessions = query_accessions(query, names=[self._name], taxonomy=self._taxonomy)
+            self._accession = accessions[self._name]
             return
 
     def fetch(self):
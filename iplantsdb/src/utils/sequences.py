@@ -0,0 +1,175 @@
+import os
+import glob
+import logging
+import threading
+from typing import Callable, Union
+
+from Bio import SeqIO
+
+from .config import PROJECT_PATH
+
+SEQUENCES_FOLDER = os.path.join(PROJECT_PATH, 'protein_sequences')
+TAIR_PROTEOME = 'ARAPORT11_protein'
+FASTA_EXTENSIONS = ('.fasta', '.fa', '.faa')
+INDEX_EXTENSION = '.idx'
+
+
+def index_path(filename: str) -> str:
+    """
+    Path of the index of a fasta file
+    """
+    return filename + INDEX_EXTENSION
+
+
+def is_index_valid(filename: str) -> bool:
+    """
+    Whether the index of a fasta file exists and is newer than the file
+    """
+    index = index_path(filename)
+    return os.path.isfile(index) and os.path.getmtime(index) >= os.path.getmtime(filename)
+
+
+class SequenceProvider:
+    """
+    Protein sequences of local proteome fasta files. Each file is indexed once (Bio.SeqIO.index_db writes the byte
+    offset of each record to a sqlite file next to the fasta file) and the next lookups, also of other processes, only
+    read the record of the identifier. The index is rebuilt when the fasta file is newer than it. The sqlite
+    connections can not be shared by threads, so each thread opens its own.
+    """
+
+    def __init__(self, folder: Union[str, None] = SEQUENCES_FOLDER):
+        """
+        Parameters
+        ----------
+        folder: str, Optional
+            folder of the proteome fasta files. Each fasta file of the folder is registered with the name of the file
+            without the extension (e.g. ARAPORT11_protein). None to register the files one by one.
+        """
+        self.files = {}
+        self._key_functions = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        if folder and os.path.isdir(folder):
+            for filename in sorted(glob.glob(os.path.join(folder, '*'))):
+                name, extension = os.path.splitext(os.path.basename(filename))
+                if extension in FASTA_EXTENSIONS:
+                    self.register(name, filename)
+
+    def register(self, name: str, filename: str, key_function: Callable[[str], str] = None):
+        """
+        Register a proteome fasta file
+        Parameters
+        ----------
+        name: str
+            name of the proteome (e.g. the species)
+        filename: str
+            fasta file
+        key_function: Callable[[str], str], optional
+            function that gets the identifier of a record from its fasta id (e.g. to remove a prefix)
+        """
+        with self._lock:
+            self.files[name] = filename
+            self._key_functions[name] = key_function
+
+    def index(self, name: str):
+        """
+        Index of a registered proteome. It is built in the first use if the fasta file has no valid index.
+        Parameters
+        ----------
+        name: str
+            name of the proteome
+
+        Returns
+        -------
+        index: Bio.File._SQLiteManySeqFilesDict
+            read-only dict of the records of the fasta file
+        """
+        indexes = self._thread_indexes()
+        filename = self.files[name]
+
+        if indexes.get(name, (None, None))[0] != filename:
+            self.close(name)
+            with self._lock:
+                if not is_index_valid(filename):
+                    if os.path.exists(index_path(filename)):
+                        os.remove(index_path(filename))
+                    logging.info('indexing %s', filename)
+
+                indexes[name] = filename, SeqIO.index_db(index_path(filename), filename, 'fasta',
+                                                         key_function=self._key_functions[name])
+
+        return indexes[name][1]
+
+    def _thread_indexes(self) -> dict:
+        """
+        Open indexes of the current thread: the fasta file and the index of each proteome
+        """
+        if not hasattr(self._local, 'indexes'):
+            self._local.indexes = {}
+        return self._local.indexes
+
+    def sequence(self, name: str, identifier: str) -> Union[str, None]:
+        """
+        Sequence of a protein of a registered proteome
+        Parameters
+        ----------
+        name: str
+            name of the proteome
+        identifier: str
+            identifier of the protein
+
+        Returns
+        -------
+        sequence: str, Optional
+            sequence of the protein or None if the proteome or the protein is not available
+        """
+        if name not in self.files:
+            return None
+
+        index = self.index(name)
+        if identifier not in index:
+            return None
+        return str(index[identifier].seq)
+
+    def find(self, identifier: str) -> Union[str, None]:
+        """
+        Sequence of a protein in any registered proteome
+        Parameters
+        ----------
+        identifier: str
+            identifier of the protein
+
+        Returns
+        -------
+        sequence: str, Optional
+            sequence of the protein or None if no proteome has it
+        """
+        for name in list(self.files):
+            sequence = self.sequence(name, identifier)
+            if sequence is not None:
+                return sequence
+        return None
+
+    def close(self, name: str = None):
+        """
+        Close the index of a proteome or of all proteomes opened by the current thread
+        """
+        indexes = self._thread_indexes()
+        names = [name] if name is not None else list(indexes)
+        for name in names:
+            if name in indexes:
+                indexes.pop(name)[1].close()
+
+
+_provider = None
+
+
+def sequence_provider() -> SequenceProvider:
+    """
+    Provider of the proteome files of the protein_sequences folder, shared by the lookups of a process
+    """
+    global _provider
+    if _provider is None:
+        _provider = SequenceProvider()
+    return _provider
@@ -1,2 +1,26 @@
 REQUEST_TIMEOUT: int = 30
 REQUEST_RETRIES: int = 3
+# base and maximum of the exponential backoff between attempts, in seconds
+REQUEST_BACKOFF: float = 1.0
+REQUEST_MAX_BACKOFF: float = 60.0
+HOST_POOL_SIZE: int = 10
+HOST_MAX_CONCURRENCY: int = 4
+# seconds that the responses of the uniprot API are kept in the response cache
+HTTP_CACHE_TTL: int = 7 * 24 * 3600
+
+BIOCYC_WORKERS: int = 4
+BIOCYC_REQUESTS_PER_SECOND: float = 2.0
+
+UNIPROT_BATCH_SIZE: int = 500
+
+ENTREZ_BATCH_SIZE: int = 200
+# NCBI allows 3 requests per second without an API key and 10 with one
+ENTREZ_REQUESTS_PER_SECOND: float = 3.0
+ENTREZ_REQUESTS_PER_SECOND_API_KEY: float = 10.0
+
+# workers that enrich the new enzymes and genes in the background and attempts of each batch
+ENRICHMENT_WORKERS: int = 4
+ENRICHMENT_RETRIES: int = 3
+
+# records of each bulk_write of the bulk mode of the mongo update
+MONGO_BULK_BATCH_SIZE: int = 1000
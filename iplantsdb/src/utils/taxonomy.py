@@ -0,0 +1,201 @@
+import os
+import logging
+from functools import cached_property
+from typing import Iterable, Union
+
+import taxoniq
+
+from .biocyc import BioCycClient, biocyc_client
+from .tokenizers import parse_dblink
+
+SPECIES_FILE = 'species.dat'
+TAXONOMY_DBLINK = 'NCBI-TAXONOMY-DB'
+
+
+def species_taxid(record: dict) -> Union[str, None]:
+    """
+    NCBI taxonomy identifier of a record of the species.dat file. The organisms that are not a taxon (e.g. the ORG-
+    strains of metacyc) are an instance of a TAX- class or have a link to the NCBI taxonomy.
+    Parameters
+    ----------
+    record: dict
+        record of the species.dat file
+
+    Returns
+    -------
+    taxid: str, Optional
+        taxonomy identifier or None if the record has none
+    """
+    org = record['UNIQUE-ID'][0]
+    if org.startswith('TAX-'):
+        return org.split('-')[1]
+
+    for org_type in record.get('TYPES', ()):
+        if org_type.startswith('TAX-'):
+            return org_type.split('-')[1]
+
+    for dblink in record.get('DBLINKS', ()):
+        ref = parse_dblink(dblink)
+        if ref and ref[0] == TAXONOMY_DBLINK:
+            return ref[1]
+
+    return None
+
+
+def taxon_lineage(taxid: Union[str, int]) -> Union[dict, None]:
+    """
+    Names and ranked lineage of a taxon from the local taxoniq index
+    Parameters
+    ----------
+    taxid: Union[str, int]
+        taxonomy identifier
+
+    Returns
+    -------
+    lineage: dict, Optional
+        common_name, scientific_name and the name of each rank (species, genus, family, order, org_class, phylum,
+        kingdom and superkingdom) or None if the taxon is not in the index
+    """
+    try:
+        taxon = taxoniq.Taxon(taxid)
+    except KeyError:
+        return None
+
+    lineage = {}
+    try:
+        lineage['common_name'] = taxon.common_name
+    except taxoniq.NoValue:
+        lineage['common_name'] = ''
+
+    lineage['scientific_name'] = taxon.scientific_name
+
+    for t in taxon.ranked_lineage:
+        if t.rank.name == 'class':
+            lineage['org_class'] = t.scientific_name
+        else:
+            lineage[t.rank.name] = t.scientific_name
+
+    return lineage
+
+
+class TaxonomyResolver:
+    """
+    Resolves the taxonomy of the organisms of a cyc database without network access: the taxonomy identifiers come
+    from the organism identifiers (TAX-) and from the species.dat file, and the lineages come from the local taxoniq
+    index. The biocyc API is only called for the organisms that are not in the species.dat file.
+    """
+
+    def __init__(self, pgdb, use_api: bool = True, client: BioCycClient = None):
+        """
+        Parameters
+        ----------
+        pgdb: ParsedPGDB
+            parsed data of the cyc database
+        use_api: bool
+            whether the biocyc API is called for the organisms without a taxonomy identifier in the dat files
+        client: BioCycClient, optional
+            client of the biocyc API. The client shared by the process by default
+        """
+        self.pgdb = pgdb
+        self.use_api = use_api
+        self.client = client
+        self.api_calls = 0
+
+    @cached_property
+    def species_taxids(self) -> dict:
+        """
+        Taxonomy identifier of each organism of the species.dat file. It is empty if the database has no
+        species.dat file.
+        """
+        if not os.path.isfile(self.pgdb.path(SPECIES_FILE)):
+            logging.info('%s has no %s file', self.pgdb.data_path, SPECIES_FILE)
+            return {}
+
+        taxids = {}
+        for record in self.pgdb.iter_records(SPECIES_FILE):
+            taxid = species_taxid(record)
+            if taxid is not None:
+                taxids[record['UNIQUE-ID'][0]] = taxid
+
+        return taxids
+
+    def local_taxid(self, org: str) -> Union[str, None]:
+        """
+        Taxonomy identifier of an organism from its identifier or from the species.dat file
+        Parameters
+        ----------
+        org: str
+            organism identifier in the cyc database
+
+        Returns
+        -------
+        taxid: str, Optional
+            taxonomy identifier or None if it is not in the dat files
+        """
+        if org.startswith('TAX-'):
+            return org.split('-')[1]
+
+        return self.species_taxids.get(org)
+
+    def taxid(self, org: str) -> Union[str, int, None]:
+        """
+        Taxonomy identifier of an organism
+        Parameters
+        ----------
+        org: str
+            organism identifier in the cyc database
+
+        Returns
+        -------
+        taxid: Union[str, int], Optional
+            taxonomy identifier or None if it is unknown
+        """
+        return self.taxids([org])[org]
+
+    def taxids(self, orgs: Iterable[str]) -> dict:
+        """
+        Taxonomy identifiers of several organisms. The organisms that are not in the dat files are looked up together
+        in the biocyc API.
+        Parameters
+        ----------
+        orgs: Iterable[str]
+            organism identifiers in the cyc database
+
+        Returns
+        -------
+        taxids: dict
+            taxonomy identifier (or None) of each organism
+        """
+        taxids = {org: self.local_taxid(org) for org in orgs}
+
+        missing = [org for org, taxid in taxids.items() if taxid is None]
+        if missing and self.use_api:
+            self.api_calls += len(missing)
+            client = self.client if self.client is not None else biocyc_client()
+            taxids.update(client.taxids(missing))
+
+        return taxids
+
+    def resolve(self, orgs: Iterable[str]) -> dict:
+        """
+        Taxonomy identifier and lineage of each organism. The lineage of each taxon is read once, even if it is
+        shared by several organisms.
+        Parameters
+        ----------
+        orgs: Iterable[str]
+            organism identifiers in the cyc database
+
+        Returns
+        -------
+        taxonomy: dict
+            (taxid, lineage) of each organism. The lineage is None if the taxid is unknown or not in the taxoniq index
+        """
+        taxids = self.taxids(orgs)
+
+        lineages = {taxid: taxon_lineage(taxid) for taxid in set(taxids.values()) if taxid}
+
+        if self.api_calls:
+            logging.info('%d organisms were not in the dat files and were looked up in the biocyc API',
+                         self.api_calls)
+
+        return {org: (taxid, lineages.get(taxid)) for org, taxid in taxids.items()}
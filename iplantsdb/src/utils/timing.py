@@ -0,0 +1,123 @@
+import time
+import resource
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+
+class StageTimer:
+    """
+    Wall time of the stages of a task (e.g. parsing, building records and writing). The stages can be nested: the time
+    of a stage does not include the time of the stages entered inside it, so the times of all stages add up to the
+    time of the task.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._stack = []
+        self._last = time.perf_counter()
+
+    def _switch(self):
+        now = time.perf_counter()
+        if self._stack:
+            name = self._stack[-1]
+            self.stages[name] = self.stages.get(name, 0.0) + now - self._last
+        self._last = now
+
+    def enter(self, name: str):
+        """
+        Start a stage, pausing the current one
+        """
+        self._switch()
+        self._stack.append(name)
+
+    def exit(self):
+        """
+        End the current stage, resuming the stage it was entered from
+        """
+        self._switch()
+        self._stack.pop()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time the code of a with block as a stage
+        """
+        self.enter(name)
+        try:
+            yield
+        finally:
+            self.exit()
+
+    def timed(self, iterable: Iterable, name: str) -> Iterator:
+        """
+        Yield the items of an iterable, timing the production of each item as a stage. It is used to time generators
+        that are consumed by other stages.
+        Parameters
+        ----------
+        iterable: Iterable
+            the items to time
+        name: str
+            name of the stage
+
+        Returns
+        -------
+        items: Iterator
+            the items of the iterable
+        """
+        iterator = iter(iterable)
+        while True:
+            self.enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.exit()
+            yield item
+
+
+class MemoryPeak:
+    """
+    Peak of the memory allocated by python inside a with block, in MB, over the memory allocated when the block
+    started. Unlike the peak resident memory, which is the peak of the whole process so far, it measures the block
+    alone, also when several tasks run one after another in the same process. The allocations are traced with
+    tracemalloc while the block runs, which makes allocation-heavy code several times slower, so it is only meant
+    for the benchmarks.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Parameters
+        ----------
+        enabled: bool
+            if False, the block is not traced and peak_mb stays None
+        """
+        self.enabled = enabled
+        self.peak_mb = None
+        self._baseline = 0
+        self._started = False
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        self._baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.enabled:
+            return
+        self.peak_mb = max(0, tracemalloc.get_traced_memory()[1] - self._baseline) / 1024 ** 2
+        if self._started:
+            tracemalloc.stop()
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident memory of the process so far, in MB. The transformers that run in the same process share it.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
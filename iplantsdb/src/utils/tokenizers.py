@@ -0,0 +1,92 @@
+import re
+from typing import Optional, Tuple
+
+HTML_TAG = re.compile('<[^<]+?>')
+
+DBLINK = re.compile(r'\(([^ ]*) [^"]*?"([^"]*)"')
+
+LINK_TOKEN = re.compile(r'"([^"]*)"|\|([^|]*)\||([^\s()|"]+)')
+
+FORMULA_TABLE = str.maketrans('', '', '() ')
+
+
+def strip_html(text: str) -> str:
+    """
+    Remove the html tags of a name or synonym (e.g. <i>, <sub>)
+    Parameters
+    ----------
+    text: str
+        name with html tags
+
+    Returns
+    -------
+    text: str
+        name without html tags
+    """
+    if '<' not in text:
+        return text
+    return HTML_TAG.sub('', text)
+
+
+def parse_dblink(dblink: str) -> Optional[Tuple[str, str]]:
+    """
+    Get the database and the identifier of a DBLINKS value, such as (CHEBI "15377" NIL |kothari| 3619532080 NIL NIL)
+    Parameters
+    ----------
+    dblink: str
+        value of the DBLINKS attribute
+
+    Returns
+    -------
+    crossref: tuple, Optional
+        (database, identifier) or None if the value has no quoted identifier
+    """
+    match = DBLINK.search(dblink)
+    if match is None:
+        return None
+    return match.group(1), match.group(2)
+
+
+def parse_pathway_link(link: str) -> Optional[Tuple[str, list]]:
+    """
+    Get the metabolite and the linked pathways of a PATHWAY-LINKS value, such as (CPD-7117 PWY-7261 PWY-5153),
+    (PYRUVATE (PWY-5 . :OUTGOING)) or (|CPD-1| "pathway name" PWY-3). The | of the symbols are removed and the spaces
+    of quoted names are replaced by _
+    Parameters
+    ----------
+    link: str
+        value of the PATHWAY-LINKS attribute
+
+    Returns
+    -------
+    pathway_link: tuple, Optional
+        (metabolite, list of pathways) or None if the value is empty
+    """
+    tokens = []
+    for quoted, symbol, atom in LINK_TOKEN.findall(link):
+        if quoted:
+            tokens.append(quoted.replace(' ', '_'))
+        elif symbol:
+            tokens.append(symbol)
+        elif atom != '.' and atom[0] != ':':
+            tokens.append(atom)
+
+    if not tokens:
+        return None
+    return tokens[0], tokens[1:]
+
+
+def parse_formula(values: list) -> str:
+    """
+    Join the CHEMICAL-FORMULA values of a compound, such as (C 6) and (H 12), into a formula
+    Parameters
+    ----------
+    values: list
+        values of the CHEMICAL-FORMULA attribute
+
+    Returns
+    -------
+    formula: str
+        chemical formula (e.g. C6H12)
+    """
+    return ''.join(values).translate(FORMULA_TABLE)
@@ -1,10 +1,13 @@
 import io
-from typing import Dict, Tuple, Union
+import re
+import logging
+from typing import Dict, Tuple, Union, Iterator, Iterable, IO
 from xml.etree import ElementTree
 import pandas as pd
-from Bio import SeqIO
+from Bio import SeqIO, SwissProt
 
 from .api_requests import request, read_response
+from .settings import UNIPROT_BATCH_SIZE, HTTP_CACHE_TTL
 
 import os
 
@@ -114,6 +117,7 @@ def parse_xml(file_path, add_root=False, start=0, end=0):
 class UniProtAPI:
     api = "https://www.uniprot.org/uniprot"
     mapping = "https://www.uniprot.org/uploadlists"
+    accessions = "https://rest.uniprot.org/uniprotkb/accessions"
     query_fields = ('accession', 'ec', 'gene', 'gene_exact', 'id', 'organism', 'taxonomy')
     formats = ('html', 'tab', 'xls', 'fasta', 'gff', 'txt', 'xml', 'rdf', 'list', 'rss')
     column_names = ('id', 'entry name', 'comment(SUBCELLULAR LOCATION)', 'genes', 'genes(PREFERRED)', 'genes(ALTERNATIVE)', 'genes(OLN)', 'organism',
@@ -130,9 +134,9 @@ def fetch_uniprot_record(uniprot_accession: str, format_: str = 'xml'):
 
     url = f'{UniProtAPI.api}/{uniprot_accession}.{format_}'
 
-    response = request(url)
+    response = request(url, cache_ttl=HTTP_CACHE_TTL)
 
-    if not response.text:
+    if not response.ok or not response.text:
         return
 
     if format_ == 'xml':
@@ -193,7 +197,7 @@ def query_uniprot(query: Dict[str, str],
     else:
         url = f'{UniProtAPI.api}/?query={query_str}&format={format_}&columns={columns_str}&limit={limit}'
 
-    response = request(url)
+    response = request(url, cache_ttl=HTTP_CACHE_TTL)
 
     if format_ == 'tab':
         sep = '\t'
@@ -240,3 +244,193 @@ def map_uniprot_identifiers(identifiers: Tuple[str],
             return read_response(response, sep=sep).to_dict()
 
     return response
+
+
+UNIPROT_STATUS = {'Swiss-Prot': 'reviewed', 'TrEMBL': 'unreviewed', 'Reviewed': 'reviewed', 'Unreviewed': 'unreviewed'}
+
+# evidence tags of the flat files, such as {ECO:0000269|PubMed:10631247}
+EVIDENCE = re.compile(r'\.?\s*\{[^}]*\}')
+RECNAME = re.compile(r'RecName: Full=([^;]+);')
+ISOFORM = re.compile(r'\[[^\]]*\]:\s*')
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def _uniprot_entry(accessions: list, status: str, product: str, function: str, location: list, sequence: str) -> dict:
+    """
+    The uniprot data of an enzyme, with the keys of get_uniprot_data
+    """
+    entry = {'accessions': accessions,
+             'uniprot_location': location,
+             'uniprot_function': function,
+             'uniprot_product': product,
+             'sequence': sequence}
+
+    if status in UNIPROT_STATUS:
+        entry['uniprot_status'] = UNIPROT_STATUS[status]
+
+    return entry
+
+
+def iter_uniprot_xml(handle: Union[str, IO]) -> Iterator[dict]:
+    """
+    Stream the entries of a uniprot xml file or response, extracting only the data used by the database: status,
+    product (recommended name), function, subcellular locations and sequence. Each entry is cleared after it is read,
+    so the memory does not grow with the number of entries.
+    Parameters
+    ----------
+    handle: Union[str, IO]
+        xml file or binary file object
+
+    Yields
+    ------
+    entry: dict
+        accessions (the first one is the primary accession), uniprot_status, uniprot_product, uniprot_function,
+        uniprot_location and sequence of the entry
+    """
+    root = None
+
+    for event, elem in ElementTree.iterparse(handle, events=('start', 'end')):
+        if root is None:
+            root = elem
+
+        if event != 'end' or _local_name(elem.tag) != 'entry':
+            continue
+
+        accessions = []
+        product = None
+        function = None
+        location = []
+        sequence = ''
+
+        for child in elem:
+            tag = _local_name(child.tag)
+
+            if tag == 'accession':
+                accessions.append(child.text)
+
+            elif tag == 'protein':
+                for name in child:
+                    if _local_name(name.tag) == 'recommendedName':
+                        for full_name in name:
+                            if _local_name(full_name.tag) == 'fullName' and product is None:
+                                product = full_name.text
+
+            elif tag == 'comment' and child.get('type') == 'function' and function is None:
+                for text in child:
+                    if _local_name(text.tag) == 'text':
+                        function = text.text
+                        break
+
+            elif tag == 'comment' and child.get('type') == 'subcellular location':
+                for loc in child.iter():
+                    if _local_name(loc.tag) == 'location':
+                        location.append(loc.text)
+
+            elif tag == 'sequence':
+                sequence = ''.join((child.text or '').split())
+
+        yield _uniprot_entry(accessions, elem.get('dataset'), product, function, location, sequence)
+
+        root.clear()
+
+
+def _flat_locations(comment: str) -> list:
+    """
+    Subcellular locations of a SUBCELLULAR LOCATION comment of a flat file, such as
+    Plastid, chloroplast thylakoid membrane; Multi-pass membrane protein. Note=...
+    """
+    locations = []
+
+    comment = ISOFORM.sub('', comment.split('Note=')[0])
+    for item in comment.split('.'):
+        item = item.split(';')[0].strip()
+        if not item:
+            continue
+        for loc in item.split(', '):
+            locations.append(loc[:1].upper() + loc[1:])
+
+    return locations
+
+
+def iter_uniprot_dat(handle: Union[str, IO]) -> Iterator[dict]:
+    """
+    Stream the entries of a uniprot flat file (.dat), extracting the same data as iter_uniprot_xml
+    Parameters
+    ----------
+    handle: Union[str, IO]
+        flat file or text file object
+
+    Yields
+    ------
+    entry: dict
+        accessions, uniprot_status, uniprot_product, uniprot_function, uniprot_location and sequence of the entry
+    """
+    for record in SwissProt.parse(handle):
+        match = RECNAME.search(EVIDENCE.sub('', record.description))
+        product = match.group(1) if match else None
+
+        function = None
+        location = []
+        for comment in record.comments:
+            comment = EVIDENCE.sub('', comment)
+            if comment.startswith('FUNCTION: ') and function is None:
+                function = comment[len('FUNCTION: '):]
+            elif comment.startswith('SUBCELLULAR LOCATION: '):
+                location.extend(_flat_locations(comment[len('SUBCELLULAR LOCATION: '):]))
+
+        yield _uniprot_entry(record.accessions, record.data_class, product, function, location, record.sequence)
+
+
+def fetch_uniprot_entries(accessions: Iterable[str],
+                          batch_size: int = UNIPROT_BATCH_SIZE,
+                          url: str = UniProtAPI.accessions,
+                          cache_ttl: float = HTTP_CACHE_TTL,
+                          raise_errors: bool = False) -> Dict[str, dict]:
+    """
+    Get the uniprot data of several accessions, with one request per batch of accessions. Each response is streamed
+    through iter_uniprot_xml, so only the data used by the database is kept.
+    Parameters
+    ----------
+    accessions: Iterable[str]
+        uniprot accessions
+    batch_size: int
+        number of accessions of each request
+    url: str
+        url of the uniprot accessions service
+    cache_ttl: float
+        seconds that the responses are kept in the response cache of utils.api_requests. None to not use the cache
+    raise_errors: bool
+        if True, a failed request raises requests.HTTPError instead of being skipped
+
+    Returns
+    -------
+    uniprot_data: dict
+        uniprot data (as returned by get_uniprot_data) of each accession found in uniprot. The accessions of the
+        failed requests are left out.
+    """
+    accessions = list(dict.fromkeys(accessions))
+
+    data = {}
+    for i in range(0, len(accessions), batch_size):
+        batch = accessions[i:i + batch_size]
+
+        with request(url, params={'accessions': ','.join(batch), 'format': 'xml'}, stream=True,
+                     cache_ttl=cache_ttl) as response:
+            if response.status_code != 200:
+                if raise_errors:
+                    response.raise_for_status()
+                logging.warning('uniprot request of %d accessions failed', len(batch))
+                continue
+
+            requested = set(batch)
+            response.raw.decode_content = True
+            for entry in iter_uniprot_xml(response.raw):
+                entry_accessions = entry.pop('accessions')
+                for accession in entry_accessions:
+                    if accession in requested:
+                        data[accession] = entry
+
+    return data
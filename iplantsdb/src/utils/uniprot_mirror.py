@@ -0,0 +1,201 @@
+import os
+import gzip
+import json
+import sqlite3
+import logging
+import threading
+from typing import Iterable, Iterator, Union
+
+from .config import PROJECT_PATH
+from .uniprot import iter_uniprot_xml, iter_uniprot_dat
+
+UNIPROT_MIRROR = os.path.join(PROJECT_PATH, 'uniprot', 'uniprot.sqlite')
+
+# maximum number of parameters of a sqlite query
+QUERY_CHUNK = 900
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    accession TEXT PRIMARY KEY,
+    status TEXT,
+    product TEXT,
+    function TEXT,
+    location TEXT,
+    sequence TEXT
+);
+CREATE TABLE IF NOT EXISTS accessions (
+    accession TEXT PRIMARY KEY,
+    entry TEXT NOT NULL
+);
+'''
+
+
+def iter_uniprot_file(filename: str) -> Iterator[dict]:
+    """
+    Stream the entries of a uniprot release file: xml (.xml) or flat file (.dat), optionally gzipped
+    Parameters
+    ----------
+    filename: str
+        uniprot file (e.g. uniprot_sprot_plants.dat.gz)
+
+    Yields
+    ------
+    entry: dict
+        accessions, uniprot_status, uniprot_product, uniprot_function, uniprot_location and sequence of the entry
+    """
+    name = filename[:-3] if filename.endswith('.gz') else filename
+    opener = gzip.open if filename.endswith('.gz') else open
+
+    if name.endswith('.xml'):
+        with opener(filename, 'rb') as handle:
+            yield from iter_uniprot_xml(handle)
+    elif name.endswith('.dat') or name.endswith('.txt'):
+        with opener(filename, 'rt') as handle:
+            yield from iter_uniprot_dat(handle)
+    else:
+        raise ValueError('unknown uniprot file format: ' + filename)
+
+
+class UniProtMirror:
+    """
+    Local copy of the uniprot data of the enzymes, built from downloaded uniprot releases (e.g. the sprot and trembl
+    files of the plants division). The entries are kept in a sqlite file with an index of all their accessions, so
+    that the enrichment of the enzymes does not need the uniprot API.
+    """
+
+    def __init__(self, db_file: str = UNIPROT_MIRROR):
+        """
+        Parameters
+        ----------
+        db_file: str
+            sqlite file of the mirror. It is created if it does not exist
+        """
+        self.db_file = db_file
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+        self._connection = sqlite3.connect(db_file, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def ingest(self, filename: str, batch_size: int = 10000) -> int:
+        """
+        Add the entries of a uniprot release file to the mirror. The entries that are already in the mirror are
+        replaced.
+        Parameters
+        ----------
+        filename: str
+            uniprot file: xml or flat file, optionally gzipped
+        batch_size: int
+            number of entries written at once
+
+        Returns
+        -------
+        n_entries: int
+            number of entries added
+        """
+        n_entries = 0
+        entries = []
+        accessions = []
+
+        with self._lock:
+            for entry in iter_uniprot_file(filename):
+                primary = entry['accessions'][0]
+                entries.append((primary, entry.get('uniprot_status'), entry['uniprot_product'],
+                                entry['uniprot_function'], json.dumps(entry['uniprot_location']), entry['sequence']))
+                accessions.extend((accession, primary) for accession in entry['accessions'])
+
+                if len(entries) >= batch_size:
+                    n_entries += self._write(entries, accessions)
+                    entries, accessions = [], []
+
+            n_entries += self._write(entries, accessions)
+
+        logging.info('%d uniprot entries of %s were added to %s', n_entries, filename, self.db_file)
+
+        return n_entries
+
+    def _write(self, entries: list, accessions: list) -> int:
+        with self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)', entries)
+            self._connection.executemany('INSERT OR REPLACE INTO accessions VALUES (?, ?)', accessions)
+        return len(entries)
+
+    def get(self, accession: str) -> Union[dict, None]:
+        """
+        Uniprot data of an enzyme
+        Parameters
+        ----------
+        accession: str
+            uniprot accession (primary or secondary)
+
+        Returns
+        -------
+        uniprot_dic: dict, Optional
+            uniprot data, as returned by get_uniprot_data, or None if the accession is not in the mirror
+        """
+        return self.get_many([accession]).get(accession)
+
+    def get_many(self, accessions: Iterable[str]) -> dict:
+        """
+        Uniprot data of several enzymes
+        Parameters
+        ----------
+        accessions: Iterable[str]
+            uniprot accessions
+
+        Returns
+        -------
+        uniprot_data: dict
+            uniprot data of each accession found in the mirror
+        """
+        accessions = list(dict.fromkeys(accessions))
+
+        data = {}
+        with self._lock:
+            for i in range(0, len(accessions), QUERY_CHUNK):
+                chunk = accessions[i:i + QUERY_CHUNK]
+                rows = self._connection.execute(
+                    'SELECT a.accession, e.status, e.product, e.function, e.location, e.sequence '
+                    'FROM accessions a JOIN entries e ON e.accession = a.entry '
+                    'WHERE a.accession IN (%s)' % ','.join('?' * len(chunk)), chunk)
+
+                for accession, status, product, function, location, sequence in rows:
+                    data[accession] = {'uniprot_location': json.loads(location),
+                                       'uniprot_function': function,
+                                       'uniprot_product': product,
+                                       'sequence': sequence}
+                    if status is not None:
+                        data[accession]['uniprot_status'] = status
+
+        return data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+
+_mirror = None
+
+
+def uniprot_mirror() -> Union[UniProtMirror, None]:
+    """
+    Mirror of the uniprot folder of the project, shared by the lookups of a process. None if no mirror was built.
+    """
+    global _mirror
+    if _mirror is None and os.path.isfile(UNIPROT_MIRROR):
+        _mirror = UniProtMirror(UNIPROT_MIRROR)
+    return _mirror
+
+
+if __name__ == '__main__':
+    # python -m utils.uniprot_mirror uniprot_sprot_plants.dat.gz uniprot_trembl_plants.dat.gz
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    uniprot_mirror_db = UniProtMirror()
+    for uniprot_file in sys.argv[1:]:
+        uniprot_mirror_db.ingest(uniprot_file)
+    uniprot_mirror_db.close()
@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from utils import api_requests
+from utils.api_requests import request, backoff, configure_host, get_session, ResponseCache
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    Server that answers /flaky with 503 (and a Retry-After of 0 seconds) to the first request, /missing with 404 and
+    the other paths with the number of requests received so far
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.client_address[1]))
+
+        if self.path == '/flaky' and len(self.server.requests) == 1:
+            self.reply(503, b'busy', {'Retry-After': '0'})
+        elif self.path == '/missing':
+            self.reply(404, b'not found')
+        else:
+            self.reply(200, str(len(self.server.requests)).encode())
+
+    def reply(self, status: int, content: bytes, headers: dict = None):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class RequestTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d' % self.server.server_port
+
+        self.folder = tempfile.mkdtemp()
+        self.cache = ResponseCache(os.path.join(self.folder, 'cache.sqlite'))
+
+    def tearDown(self):
+        get_session(self.url).close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.cache.close()
+        shutil.rmtree(self.folder)
+
+    def test_retry_after(self):
+        response = request(self.url + '/flaky')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_client_errors_are_not_retried(self):
+        response = request(self.url + '/missing')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(self.server.requests), 1)
+
+    @mock.patch('utils.api_requests.backoff', return_value=0)
+    def test_connection_error(self, _):
+        response = request('http://127.0.0.1:1/', retries=2)
+
+        self.assertEqual(response.status_code, 503)
+
+        with request('http://127.0.0.1:1/', retries=2, stream=True) as response:
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.raw.read(), b'')
+
+    def test_session_is_reused(self):
+        for _ in range(3):
+            request(self.url + '/ok')
+
+        self.assertEqual(len({port for _, port in self.server.requests}), 1)
+
+    def test_cache(self):
+        with mock.patch.object(api_requests, '_cache', self.cache):
+            first = request(self.url + '/ok', params={'q': 1}, cache_ttl=60)
+            second = request(self.url + '/ok', params={'q': 1}, cache_ttl=60, stream=True)
+            other = request(self.url + '/ok', params={'q': 2}, cache_ttl=60)
+            expired = request(self.url + '/ok', params={'q': 1}, cache_ttl=-1)
+
+        self.assertEqual(first.text, '1')
+        self.assertEqual(second.raw.read(), b'1')
+        self.assertEqual(other.text, '2')
+        self.assertEqual(expired.text, '3')
+
+    def test_rate_limit(self):
+        host = configure_host('127.0.0.1:%d' % self.server.server_port, requests_per_second=1000, max_concurrency=1)
+
+        self.assertEqual(host.limiter.interval, 0.001)
+        request(self.url + '/ok')
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_streamed_response_holds_slot(self):
+        host = configure_host('127.0.0.1:%d' % self.server.server_port, max_concurrency=1)
+
+        request(self.url + '/ok')
+        self.assertTrue(host.slots.acquire(blocking=False))
+        host.slots.release()
+
+        with request(self.url + '/ok', stream=True) as response:
+            self.assertEqual(response.raw.read(), b'2')
+            self.assertFalse(host.slots.acquire(blocking=False))
+
+        self.assertTrue(host.slots.acquire(blocking=False))
+        host.slots.release()
+        # closing again does not release the slot twice
+        response.close()
+
+    def test_backoff(self):
+        for attempt in range(10):
+            self.assertTrue(0 <= backoff(attempt, base=1, cap=8) <= min(8, 2 ** attempt))
+
+
+if __name__ == '__main__':
+    unittest.main()
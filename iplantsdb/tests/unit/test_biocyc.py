@@ -0,0 +1,127 @@
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from utils.biocyc import BioCycClient, parse_taxid
+
+ORGANISMS = {'ORG-5993': 562, 'ORG-6000': 3702}
+
+
+class BioCycHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in of the biocyc web services: a login, which rejects the first server.rejected_logins attempts, and a
+    getxml service that knows the organisms of ORGANISMS
+    """
+
+    def do_POST(self):
+        self.server.logins += 1
+        self.rfile.read(int(self.headers['Content-Length']))
+        if self.server.logins <= self.server.rejected_logins:
+            self.send_error(401)
+            return
+
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'session=1; Path=/')
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/getxml':
+            self.send_error(404)
+            return
+
+        org = parse_qs(url.query)['id'][0].split(':')[1]
+        self.server.lookups.append((org, self.headers.get('Cookie')))
+
+        if org in ORGANISMS:
+            content = ('<ptools-xml><Organism ID="META:%s"><Organism resource="getxml?META:TAX-%d" '
+                       'orgid="META" frameid="TAX-%d"/></Organism></ptools-xml>' % (org, ORGANISMS[org], ORGANISMS[org]))
+        else:
+            content = '<ptools-xml><Organism ID="META:%s"/></ptools-xml>' % org
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.end_headers()
+        self.wfile.write(content.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class BioCycClientTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), BioCycHandler)
+        self.server.logins = 0
+        self.server.rejected_logins = 0
+        self.server.lookups = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.folder = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.folder, 'taxids.json')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.folder)
+
+    def client(self) -> BioCycClient:
+        return BioCycClient(email='user@example.org', password='secret',
+                            base_url='http://127.0.0.1:%d' % self.server.server_port, cache_file=self.cache_file,
+                            workers=3, requests_per_second=0)
+
+    def test_login_once(self):
+        client = self.client()
+
+        taxids = client.taxids(['ORG-5993', 'ORG-6000', 'ORG-1'])
+
+        self.assertEqual(taxids, {'ORG-5993': 562, 'ORG-6000': 3702, 'ORG-1': None})
+        self.assertEqual(self.server.logins, 1)
+        self.assertEqual(sorted(org for org, _ in self.server.lookups), ['ORG-1', 'ORG-5993', 'ORG-6000'])
+        self.assertTrue(all(cookie == 'session=1' for _, cookie in self.server.lookups))
+
+    def test_failed_login_is_retried(self):
+        self.server.rejected_logins = 1
+        client = self.client()
+
+        client.taxid('ORG-5993')
+        self.assertEqual(self.server.logins, 1)
+
+        self.assertEqual(client.taxid('ORG-6000'), 3702)
+        self.assertEqual(self.server.logins, 2)
+        self.assertEqual(self.server.lookups[-1], ('ORG-6000', 'session=1'))
+
+        client.taxid('ORG-1')
+        self.assertEqual(self.server.logins, 2)
+
+    def test_cache(self):
+        self.client().taxids(['ORG-5993', 'ORG-1'])
+
+        with open(self.cache_file) as cache_file:
+            self.assertEqual(json.load(cache_file), {'ORG-5993': 562, 'ORG-1': None})
+
+        client = self.client()
+        self.assertEqual(client.taxid('ORG-5993'), 562)
+        self.assertIsNone(client.taxid('ORG-1'))
+        self.assertEqual(client.requests, 0)
+        self.assertEqual(len(self.server.lookups), 2)
+
+    def test_failed_lookups_are_not_cached(self):
+        client = self.client()
+        client.base_url += '/missing'
+
+        self.assertIsNone(client.taxid('ORG-5993'))
+        self.assertEqual(client.cache, {})
+
+    def test_parse_taxid(self):
+        self.assertEqual(parse_taxid(b'<ptools-xml><Organism resource="x" frameid="TAX-3702"/></ptools-xml>'), 3702)
+        self.assertIsNone(parse_taxid(b'<ptools-xml><Organism frameid="ORG-1"/></ptools-xml>'))
+
+
+if __name__ == '__main__':
+    unittest.main()
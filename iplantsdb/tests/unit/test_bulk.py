@@ -0,0 +1,310 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from pymongo import UpdateOne
+
+from iplants_mongo.models import Enzyme, Reaction, Metabolite
+from iplants_mongo.mongodb_update import DatabaseMongoUpdate
+from utils.delta import record_digest, record_fingerprint
+from iplants_mongo.bulk import (BulkUpsert, record_changes, classify, prefetch_fields, load_documents, INSERT, UPDATE,
+                                INTEGRATION)
+
+
+class BulkWriteResult:
+
+    def __init__(self, upserted_count, modified_count):
+        self.upserted_count = upserted_count
+        self.modified_count = modified_count
+
+
+class FakeCollection:
+    """
+    In-memory stand-in of a pymongo collection with the operations used by BulkUpsert
+    """
+
+    name = 'fake'
+
+    def __init__(self, docs=()):
+        self.docs = {doc['_id']: doc for doc in docs}
+        self.bulk_writes = []
+        self.queries = []
+
+    @staticmethod
+    def _set(doc, field, value):
+        keys = field.split('.')
+        for key in keys[:-1]:
+            doc = doc.setdefault(key, {})
+        doc[keys[-1]] = value
+
+    def _matches(self, doc, query):
+        for field, condition in query.items():
+            value = doc
+            for key in field.split('.'):
+                value = value.get(key) if isinstance(value, dict) else None
+            if isinstance(condition, dict) and '$in' in condition:
+                if value not in condition['$in']:
+                    return False
+            elif isinstance(condition, dict) and '$exists' in condition:
+                if (value is not None) != condition['$exists']:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        docs = [dict(doc) for doc in self.docs.values() if self._matches(doc, query)]
+        if projection:
+            docs = [{k: v for k, v in doc.items() if k == '_id' or k in projection} for doc in docs]
+        return docs
+
+    def bulk_write(self, operations, ordered=True):
+        self.bulk_writes.append(operations)
+        upserted = modified = 0
+        for operation in operations:
+            doc_id = operation._filter['_id']
+            update = operation._doc
+            if doc_id not in self.docs:
+                self.docs[doc_id] = {'_id': doc_id, **update['$setOnInsert']}
+                upserted += 1
+            elif '$set' in update:
+                for field, value in update['$set'].items():
+                    self._set(self.docs[doc_id], field, value)
+                modified += 1
+        return BulkWriteResult(upserted, modified)
+
+    def update_many(self, query, update):
+        for doc in self.docs.values():
+            if self._matches(doc, query):
+                for field, value in update['$set'].items():
+                    self._set(doc, field, value)
+
+
+class RecordChangesTestCase(unittest.TestCase):
+
+    def test_same_database(self):
+        record = {'entry_id': 'E1', 'common_name': 'new name', 'crossrefs': {'UNIPROT': 'P1'},
+                  'database_version': {'plantcyc': '15.0'}}
+        db_doc = {'_id': 'E1', 'common_name': 'old name', 'crossrefs': {'UNIPROT': 'P1'},
+                  'database_version': {'plantcyc': '14.0'}}
+
+        changes = record_changes(Enzyme(**record), record, db_doc, 'plantcyc')
+        self.assertEqual(set(changes), {'common_name', 'timestamp'})
+        self.assertEqual(changes['common_name'], 'new name')
+
+        db_doc['common_name'] = 'new name'
+        self.assertEqual(record_changes(Enzyme(**record), record, db_doc, 'plantcyc'), {})
+
+    def test_other_database(self):
+        record = {'entry_id': 'R1', 'crossrefs': {'KEGG': 'R0001', 'RHEA': '10'}, 'direction': 'LEFT-TO-RIGHT',
+                  'genes': {'metacyc': ['G2']}, 'enzymes': {'metacyc': ['E2']}, 'reactants': {'A': -1},
+                  'database_version': {'metacyc': '26.0'}}
+        db_doc = {'_id': 'R1', 'crossrefs': {'RHEA': '10'}, 'direction': 'REVERSIBLE', 'genes': {'plantcyc': ['G1']},
+                  'reactants': {'B': -1}, 'database_version': {'plantcyc': '15.0'}}
+
+        changes = record_changes(Reaction(**record), record, db_doc, 'metacyc')
+        # the enzymes are not integrated because the document has none, and the direction of the document is kept
+        self.assertEqual(changes, {'genes.metacyc': ['G2'], 'crossrefs.KEGG': 'R0001'})
+
+
+    def test_fingerprint(self):
+        record = {'entry_id': 'M1', 'common_name': 'water', 'synonyms': ['H2O'], 'formula': 'H2O',
+                  'database_version': {'plantcyc': '15.0'}, 'fingerprint': 'a1'}
+        db_doc = {'_id': 'M1', 'formula': 'H2O', 'database_version': {'plantcyc': '14.0'}, 'fingerprint': 'a1'}
+        fields = prefetch_fields(Metabolite)
+
+        # the content fields are not loaded: the fingerprint tells that the record did not change
+        self.assertNotIn('common_name', fields)
+        self.assertEqual(record_changes(Metabolite(**record), record, db_doc, 'plantcyc', fields), {})
+
+        record['fingerprint'] = 'b2'
+        changes = record_changes(Metabolite(**record), record, db_doc, 'plantcyc', fields)
+        self.assertEqual(set(changes), {'fingerprint', 'common_name', 'synonyms', 'timestamp'})
+
+
+class PrefetchTestCase(unittest.TestCase):
+
+    def test_classify(self):
+        self.assertEqual(classify(None, 'plantcyc'), INSERT)
+        self.assertEqual(classify({'database_version': {'plantcyc': '14.0'}}, 'plantcyc'), UPDATE)
+        self.assertEqual(classify({'database_version': {'metacyc': '26.0'}}, 'plantcyc'), INTEGRATION)
+        self.assertEqual(classify({'database_version': {'metacyc': '26.0', 'plantcyc': '14.0'}}, 'plantcyc'),
+                         INTEGRATION)
+
+    def test_load_documents(self):
+        collection = FakeCollection([{'_id': 'E1', 'common_name': 'enzyme 1', 'synonyms': ['e1'],
+                                      'crossrefs': {'UNIPROT': 'P1'}, 'database_version': {'plantcyc': '14.0'}}])
+
+        fields = prefetch_fields(Enzyme)
+        self.assertIn('sequence', fields)
+        self.assertNotIn('synonyms', fields)
+
+        documents = load_documents(Enzyme, mongo_collection=collection)
+        self.assertEqual(documents, {'E1': {'_id': 'E1', 'crossrefs': {'UNIPROT': 'P1'},
+                                            'database_version': {'plantcyc': '14.0'}}})
+
+
+class BulkUpsertTestCase(unittest.TestCase):
+
+    def test_upsert(self):
+        collection = FakeCollection([
+            {'_id': 'E1', 'common_name': 'enzyme 1', 'database_version': {'plantcyc': '14.0'},
+             'fingerprint': record_digest({'entry_id': 'E1', 'common_name': 'enzyme 1'})},
+            {'_id': 'E2', 'common_name': 'enzyme 2', 'database_version': {'plantcyc': '14.0'},
+             'fingerprint': record_digest({'entry_id': 'E2', 'common_name': 'enzyme 2'})},
+            {'_id': 'E3', 'common_name': 'enzyme 3', 'database_version': {'plantcyc': '14.0'}},
+        ])
+
+        upsert = BulkUpsert(Enzyme, 'plantcyc_15.0', batch_size=2, mongo_collection=collection)
+        for record in [{'entry_id': 'E1', 'common_name': 'enzyme 1', 'database_version': {'plantcyc': '15.0'}},
+                       {'entry_id': 'E2', 'common_name': 'enzyme two', 'database_version': {'plantcyc': '15.0'}},
+                       {'entry_id': 'E4', 'common_name': 'enzyme 4', 'database_version': {'plantcyc': '15.0'}}]:
+            upsert.add(record)
+        upsert.flush()
+
+        self.assertEqual(upsert.counts, {'inserted': 1, 'modified': 1, 'unchanged': 1})
+        self.assertEqual(len(collection.bulk_writes), 2)
+        self.assertTrue(all(isinstance(operation, UpdateOne) for ops in collection.bulk_writes for operation in ops))
+
+        self.assertEqual(collection.docs['E1']['database_version'], {'plantcyc': '15.0'})
+        self.assertEqual(collection.docs['E2']['common_name'], 'enzyme two')
+        self.assertEqual(collection.docs['E2']['fingerprint'],
+                         record_digest({'entry_id': 'E2', 'common_name': 'enzyme two'}))
+        self.assertEqual(collection.docs['E2']['database_version'], {'plantcyc': '15.0'})
+        self.assertEqual(collection.docs['E4']['common_name'], 'enzyme 4')
+
+        # the collection is read once
+        self.assertEqual(collection.queries[0], {})
+
+        self.assertEqual(upsert.deprecate({'E1', 'E2', 'E4'}), 1)
+        self.assertEqual(collection.docs['E3']['state'], 'deprecated')
+        self.assertNotIn('state', collection.docs['E1'])
+
+    def test_batch_queries(self):
+        collection = FakeCollection([{'_id': 'E1', 'common_name': 'enzyme 1', 'database_version': {'metacyc': '26'}}])
+
+        upsert = BulkUpsert(Enzyme, 'plantcyc_15.0', batch_size=10, mongo_collection=collection, prefetch=False)
+        upsert.add({'entry_id': 'E1', 'common_name': 'enzyme 1', 'crossrefs': {'TAIR': 'AT1G01010'},
+                    'database_version': {'plantcyc': '15.0'}})
+        upsert.flush()
+
+        self.assertEqual(collection.queries, [{'_id': {'$in': ['E1']}}])
+        self.assertEqual(upsert.counts, {'inserted': 0, 'modified': 1, 'unchanged': 0})
+        self.assertEqual(collection.docs['E1']['crossrefs'], {'TAIR': 'AT1G01010'})
+        self.assertEqual(collection.docs['E1']['database_version'], {'metacyc': '26', 'plantcyc': '15.0'})
+
+
+class FakeObjects:
+    """
+    Stand-in of the objects manager of a collection class over a FakeCollection, with the filters and updates used
+    by DatabaseMongoUpdate.update_collection
+    """
+
+    def __init__(self, collection: FakeCollection):
+        self.collection = collection
+        self.query = {}
+
+    @staticmethod
+    def _field(name: str) -> str:
+        return '.'.join('_id' if key == 'entry_id' else key for key in name.split('__'))
+
+    def __call__(self, **filters):
+        objects = FakeObjects(self.collection)
+        for name, value in filters.items():
+            operator = name.rsplit('__', 1)[-1]
+            if operator in ('in', 'nin', 'exists'):
+                objects.query[self._field(name.rsplit('__', 1)[0])] = {'$' + operator: value}
+            else:
+                objects.query[self._field(name)] = value
+        return objects
+
+    def _matches(self, doc):
+        query = {field: condition for field, condition in self.query.items()
+                 if not (isinstance(condition, dict) and '$nin' in condition)}
+        excluded = [condition['$nin'] for condition in self.query.values()
+                    if isinstance(condition, dict) and '$nin' in condition]
+        return self.collection._matches(doc, query) and not any(doc['_id'] in ids for ids in excluded)
+
+    def update(self, **updates):
+        for doc in self.collection.docs.values():
+            if self._matches(doc):
+                for name, value in updates.items():
+                    self.collection._set(doc, self._field(name[len('set__'):]), value)
+
+
+class MongoUpdateTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    @mock.patch('iplants_mongo.mongodb_update.connect')
+    def test_unchanged_records_get_the_new_version(self, _):
+        records = [{'entry_id': 'E1', 'common_name': 'enzyme 1', 'database_version': {'plantcyc': '15.0'}},
+                   {'entry_id': 'E2', 'common_name': 'enzyme 2', 'database_version': {'plantcyc': '15.0'}}]
+        with open(os.path.join(self.folder, 'enzyme.ndjson'), 'w') as new_file:
+            new_file.writelines(json.dumps(record) + '\n' for record in records)
+
+        collection = FakeCollection([
+            {'_id': 'E1', 'common_name': 'enzyme 1', 'database_version': {'plantcyc': '14.0'},
+             'fingerprint': record_fingerprint(dict(records[0]))},
+            {'_id': 'E2', 'common_name': 'enzyme 2', 'database_version': {'plantcyc': '15.0'},
+             'fingerprint': record_fingerprint(dict(records[1]))},
+        ])
+
+        database = DatabaseMongoUpdate(db_version='plantcyc_15.0')
+        database.datasource = self.folder
+        with mock.patch.object(Enzyme, '_get_collection', return_value=collection), \
+                mock.patch.object(Enzyme, 'objects'):
+            database.update_collection(new_data_file='enzyme.ndjson', collection=Enzyme)
+        database.enrichment.close()
+
+        self.assertEqual(collection.docs['E1']['database_version'], {'plantcyc': '15.0'})
+        self.assertIn('timestamp', collection.docs['E1'])
+        # the entries that already have the new version are not written
+        self.assertNotIn('timestamp', collection.docs['E2'])
+
+    @mock.patch('iplants_mongo.mongodb_update.connect')
+    def test_delta(self, _):
+        with open(os.path.join(self.folder, 'enzyme.added.ndjson'), 'w') as added_file:
+            added_file.write(json.dumps({'entry_id': 'E5', 'common_name': 'enzyme 5',
+                                         'database_version': {'plantcyc': '15.0'}}) + '\n')
+        removed_file = os.path.join(self.folder, 'enzyme.removed.ndjson')
+        with open(removed_file, 'w') as removed:
+            removed.write(json.dumps({'entry_id': 'E3'}) + '\n')
+
+        collection = FakeCollection([
+            {'_id': 'E1', 'common_name': 'enzyme 1', 'database_version': {'plantcyc': '14.0'}},
+            {'_id': 'E2', 'common_name': 'enzyme 2', 'database_version': {'plantcyc': '14.0'}},
+            {'_id': 'E3', 'common_name': 'enzyme 3', 'database_version': {'plantcyc': '14.0'}},
+            {'_id': 'E4', 'common_name': 'enzyme 4', 'database_version': {'plantcyc': '13.0'},
+             'state': 'deprecated'},
+        ])
+
+        database = DatabaseMongoUpdate(db_version='plantcyc_15.0')
+        database.datasource = self.folder
+        with mock.patch.object(Enzyme, '_get_collection', return_value=collection), \
+                mock.patch.object(Enzyme, 'objects', FakeObjects(collection)), \
+                mock.patch.object(Enzyme, 'save') as save:
+            database.update_collection(new_data_file=['enzyme.added.ndjson'], collection=Enzyme,
+                                       removed_file=removed_file)
+        database.enrichment.close()
+
+        save.assert_called_once()
+        self.assertEqual(collection.docs['E1']['database_version'], {'plantcyc': '15.0'})
+        self.assertEqual(collection.docs['E2']['database_version'], {'plantcyc': '15.0'})
+        self.assertEqual(collection.docs['E3']['state'], 'deprecated')
+        self.assertEqual(collection.docs['E3']['database_version'], {'plantcyc': '14.0'})
+        # the entries deprecated by a previous version stay as they were
+        self.assertEqual(collection.docs['E4']['database_version'], {'plantcyc': '13.0'})
+        self.assertNotIn('timestamp', collection.docs['E4'])
+
+
+if __name__ == '__main__':
+    unittest.main()
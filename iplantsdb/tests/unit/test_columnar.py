@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.columnar import pyarrow, build_tables, write_columnar
+
+REACTIONS = [{'entry_id': 'RXN-1', 'direction': 'REVERSIBLE', 'reactants': {'CPD-1': '2', 'WATER': 1.0},
+              'enzymes': {'plantcyc': ['ENZ-1', 'ENZ-2']}},
+             {'entry_id': 'RXN-2', 'ecnumber': 'EC-1.1.1.1', 'reactants': {'CPD-2': 1.0}}]
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class ColumnarTestCase(unittest.TestCase):
+
+    def test_tables(self):
+        tables = build_tables(REACTIONS, 'reaction')
+
+        self.assertEqual(tables['reaction'].to_pylist(),
+                         [{'entry_id': 'RXN-1', 'direction': 'REVERSIBLE', 'ecnumber': None},
+                          {'entry_id': 'RXN-2', 'direction': None, 'ecnumber': 'EC-1.1.1.1'}])
+        self.assertEqual(tables['reaction_reactants'].column('stoichiometry').to_pylist(), [2.0, 1.0, 1.0])
+        self.assertEqual(tables['reaction_enzymes'].to_pylist()[1],
+                         {'entry_id': 'RXN-1', 'database': 'plantcyc', 'enzyme': 'ENZ-2'})
+
+    def test_write(self):
+        folder = tempfile.mkdtemp()
+        try:
+            for file_format in ('parquet', 'arrow'):
+                filenames = write_columnar(REACTIONS, 'reaction', folder, file_format)
+                self.assertEqual(len(filenames), 3)
+                self.assertTrue(all(os.path.isfile(f) for f in filenames))
+        finally:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    unittest.main()
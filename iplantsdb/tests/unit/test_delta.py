@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.extract import write_json_records, iter_json_records
+from utils.delta import record_digest, record_fingerprint, previous_version, write_deltas, find_delta_files
+
+
+class DeltaTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.old_folder = os.path.join(self.folder, 'plantcyc_9.0')
+        self.new_folder = os.path.join(self.folder, 'plantcyc_14.0')
+        os.makedirs(self.old_folder)
+        os.makedirs(self.new_folder)
+
+        old = [{'entry_id': 'RXN-1', 'direction': 'REVERSIBLE', 'database_version': {'plantcyc': '9.0'}},
+               {'entry_id': 'RXN-2', 'direction': 'REVERSIBLE', 'database_version': {'plantcyc': '9.0'}},
+               {'entry_id': 'RXN-3', 'database_version': {'plantcyc': '9.0'}}]
+        new = [{'database_version': {'plantcyc': '14.0'}, 'direction': 'REVERSIBLE', 'entry_id': 'RXN-1'},
+               {'entry_id': 'RXN-2', 'direction': 'IRREVERSIBLE', 'database_version': {'plantcyc': '14.0'}},
+               {'entry_id': 'RXN-4', 'database_version': {'plantcyc': '14.0'}}]
+
+        write_json_records(old, os.path.join(self.old_folder, 'reaction.json'))
+        write_json_records(new, os.path.join(self.new_folder, 'reaction.ndjson'))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_record_digest(self):
+        self.assertEqual(record_digest({'entry_id': 'A', 'name': 'a', 'database_version': {'plantcyc': '9.0'}}),
+                         record_digest({'name': 'a', 'entry_id': 'A'}))
+        self.assertNotEqual(record_digest({'entry_id': 'A', 'name': 'a'}), record_digest({'entry_id': 'A'}))
+
+    def test_record_fingerprint(self):
+        record = {'entry_id': 'A', 'name': 'a'}
+        digest = record_digest(record)
+        self.assertEqual(record_fingerprint(record), digest)
+
+        # the stored fingerprint is used and is not part of the digest
+        record['fingerprint'] = digest
+        self.assertEqual(record_digest(record), digest)
+        self.assertEqual(record_fingerprint({'entry_id': 'A', 'fingerprint': 'stored'}), 'stored')
+
+    def test_previous_version(self):
+        os.makedirs(os.path.join(self.folder, 'metacyc_26.0'))
+
+        self.assertEqual(previous_version(self.folder, 'plantcyc_15.0'), 'plantcyc_14.0')
+        self.assertEqual(previous_version(self.folder, 'plantcyc_14.0'), 'plantcyc_9.0')
+        self.assertIsNone(previous_version(self.folder, 'plantcyc_9.0'))
+
+        # versions with letters are compared with the numeric ones
+        os.makedirs(os.path.join(self.folder, 'plantcyc_15.0.1'))
+        os.makedirs(os.path.join(self.folder, 'plantcyc_15a'))
+        self.assertEqual(previous_version(self.folder, 'plantcyc_16.0'), 'plantcyc_15a')
+        self.assertEqual(previous_version(self.folder, 'plantcyc_15a'), 'plantcyc_15.0.1')
+
+    def test_write_deltas(self):
+        counts = write_deltas(self.new_folder, self.old_folder, ['reaction', 'enzyme'])
+
+        self.assertEqual(counts, {'reaction': {'added': 1, 'changed': 1, 'removed': 1}})
+        self.assertIsNone(find_delta_files(self.new_folder, 'enzyme'))
+
+        delta_files = find_delta_files(self.new_folder, 'reaction')
+        ids = {kind: [r['entry_id'] for r in iter_json_records(f)] for kind, f in delta_files.items()}
+        self.assertEqual(ids, {'added': ['RXN-4'], 'changed': ['RXN-2'], 'removed': ['RXN-3']})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import threading
+import unittest
+from unittest import mock
+
+import requests
+
+from iplants_mongo.models import Enzyme, Gene, Metabolite
+from iplants_mongo.enrichment import EnrichmentPool, enrichment_source
+
+
+class RecordingPool(EnrichmentPool):
+    """
+    Enrichment pool that keeps the saved and failed documents instead of writing them to mongo
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.saved = {}
+        self.marked_failed = []
+        self._records_lock = threading.Lock()
+
+    def _save(self, kind, entry_id, doc_values):
+        with self._records_lock:
+            self.saved[entry_id] = doc_values
+
+    def _mark_failed(self, kind, entry_ids):
+        with self._records_lock:
+            self.marked_failed.extend(entry_ids)
+
+
+class EnrichmentSourceTestCase(unittest.TestCase):
+
+    def test_sources(self):
+        self.assertEqual(enrichment_source(Enzyme(entry_id='E1', crossrefs={'UNIPROT': 'P1', 'TAIR': 'AT1G01010'})),
+                         ('uniprot', 'P1'))
+        self.assertEqual(enrichment_source(Enzyme(entry_id='E2', crossrefs={'TAIR': 'AT1G01010'})),
+                         ('tair', 'AT1G01010'))
+        self.assertEqual(enrichment_source(Gene(entry_id='G1', crossrefs={'REFSEQ': 'NM_1'})), ('ncbi', 'NM_1'))
+        self.assertIsNone(enrichment_source(Gene(entry_id='G2')))
+        self.assertIsNone(enrichment_source(Metabolite(entry_id='M1', crossrefs={'CHEBI': '1'})))
+
+
+@mock.patch('iplants_mongo.enrichment.backoff', return_value=0)
+class EnrichmentPoolTestCase(unittest.TestCase):
+
+    def test_batches(self, _):
+        batches = []
+
+        def enricher(identifiers):
+            batches.append(identifiers)
+            return {identifier: {'sequence': 'SEQ' + identifier} for identifier in identifiers}
+
+        pool = RecordingPool(workers=2, enrichers={'ncbi': enricher}, batch_sizes={'ncbi': 2})
+        for i in range(3):
+            pool.submit('ncbi', str(i), 'G%d' % i)
+        pool.close()
+
+        self.assertEqual(sorted(batches), [['0', '1'], ['2']])
+        self.assertEqual(pool.saved, {'G0': {'sequence': 'SEQ0'}, 'G1': {'sequence': 'SEQ1'},
+                                      'G2': {'sequence': 'SEQ2'}})
+        self.assertEqual(pool.progress(), {'submitted': 3, 'enriched': 3, 'failed': 0, 'retried': 0, 'pending': 0})
+
+    def test_not_found(self, _):
+        pool = RecordingPool(enrichers={'uniprot': lambda identifiers: {}}, batch_sizes={'uniprot': 10})
+        pool.submit('uniprot', 'P1', 'E1')
+        pool.close()
+
+        # the documents that the source does not have lose the marker too
+        self.assertEqual(pool.saved, {'E1': {}})
+
+    def test_retry(self, _):
+        attempts = []
+
+        def enricher(identifiers):
+            attempts.append(identifiers)
+            if len(attempts) == 1:
+                raise requests.ConnectionError('connection reset')
+            return {identifier: {'sequence': 'MKT'} for identifier in identifiers}
+
+        pool = RecordingPool(retries=3, enrichers={'uniprot': enricher}, batch_sizes={'uniprot': 10})
+        pool.submit('uniprot', 'P1', 'E1')
+        pool.close()
+
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(pool.saved, {'E1': {'sequence': 'MKT'}})
+        self.assertEqual(pool.progress()['retried'], 1)
+
+    def test_failed(self, _):
+        def enricher(identifiers):
+            raise requests.HTTPError('503 Server Error')
+
+        pool = RecordingPool(retries=2, enrichers={'ncbi': enricher}, batch_sizes={'ncbi': 10})
+        pool.submit('ncbi', 'NM_1', 'G1')
+        pool.submit('ncbi', 'NM_2', 'G2')
+        pool.close()
+
+        self.assertEqual(pool.saved, {})
+        self.assertEqual(sorted(pool.marked_failed), ['G1', 'G2'])
+        self.assertEqual(pool.progress(), {'submitted': 2, 'enriched': 0, 'failed': 2, 'retried': 1, 'pending': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
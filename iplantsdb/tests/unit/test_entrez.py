@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+from utils.entrez import EntrezSequenceFetcher, iter_tinyseq
+
+SEQUENCES = {('824136', 'NM_100001.2'): 'ATGGCGTTA', ('839580', 'NM_100002.1'): 'ATGCCCTGA'}
+
+TSEQ = ('<TSeq><TSeq_seqtype value="nucleotide"/><TSeq_gi>%s</TSeq_gi><TSeq_accver>%s</TSeq_accver>'
+        '<TSeq_taxid>3702</TSeq_taxid><TSeq_sequence>%s</TSeq_sequence></TSeq>')
+
+
+class EfetchHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in of the NCBI efetch service for the nucleotide sequences of SEQUENCES in fasta (TinySeq xml) format
+    """
+
+    def do_POST(self):
+        params = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+        ids = params['id'][0].split(',')
+        self.server.requests.append(params)
+
+        records = [TSEQ % (gi, accver, sequence) for (gi, accver), sequence in SEQUENCES.items()
+                   if gi in ids or accver in ids or accver.split('.')[0] in ids]
+
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(('<?xml version="1.0" ?>\n<!DOCTYPE TSeqSet PUBLIC "-//NCBI//NCBI TSeq/EN" '
+                          '"https://www.ncbi.nlm.nih.gov/dtd/NCBI_TSeq.dtd">\n<TSeqSet>%s</TSeqSet>'
+                          % ''.join(records)).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class EntrezSequenceFetcherTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), EfetchHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.folder = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.folder, 'sequences.sqlite')
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.folder)
+
+    def fetcher(self, **kwargs) -> EntrezSequenceFetcher:
+        return EntrezSequenceFetcher(cache_file=self.cache_file, email='user@example.org',
+                                     url='http://127.0.0.1:%d/efetch.fcgi' % self.server.server_port, **kwargs)
+
+    def test_batches(self):
+        fetcher = self.fetcher(batch_size=2, api_key='key')
+
+        sequences = fetcher.sequences(['824136', 'NM_100002', '999', '824136'])
+
+        self.assertEqual(sequences, {'824136': 'ATGGCGTTA', 'NM_100002': 'ATGCCCTGA', '999': None})
+        self.assertEqual([params['id'] for params in self.server.requests], [['824136,NM_100002'], ['999']])
+        self.assertEqual(self.server.requests[0]['rettype'], ['fasta'])
+        self.assertEqual(self.server.requests[0]['api_key'], ['key'])
+        fetcher.close()
+
+    def test_cache(self):
+        self.fetcher().sequences(['NM_100001.2', '999'])
+
+        fetcher = self.fetcher()
+        self.assertEqual(fetcher.sequences(['NM_100001.2', '999']), {'NM_100001.2': 'ATGGCGTTA', '999': None})
+        self.assertEqual(fetcher.requests, 0)
+        self.assertEqual(len(self.server.requests), 1)
+        fetcher.close()
+
+    def test_iter_tinyseq(self):
+        filename = os.path.join(self.folder, 'tinyseq.xml')
+        with open(filename, 'w') as xml_file:
+            xml_file.write('<TSeqSet>' + TSEQ % ('824136', 'NM_100001.2', 'ATGGCGTTA') + '</TSeqSet>')
+
+        self.assertEqual(list(iter_tinyseq(filename)),
+                         [{'gi': '824136', 'accver': 'NM_100001.2', 'sequence': 'ATGGCGTTA'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
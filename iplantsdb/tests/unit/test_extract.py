@@ -0,0 +1,96 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.extract import parse_records, iter_records, data_by_record, get_coeffs_reactions, write_json_records, \
+    iter_json_records, find_json_file, zstandard, JSON_FORMATS
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'plant')
+
+REACTIONS = """# header
+#
+UNIQUE-ID - RXN-1
+TYPES - Small-Molecule-Reactions
+LEFT - CPD-1
+^COEFFICIENT - 2
+^COMPARTMENT - CCO-IN
+LEFT - WATER
+RIGHT - CPD-2
+^COMPARTMENT - CCO-OUT
+^COEFFICIENT - 3
+//
+UNIQUE-ID - RXN-2
+LEFT - CPD-2
+RIGHT - CPD-3
+//
+"""
+
+
+class ParseRecordsTestCase(unittest.TestCase):
+
+    def test_records(self):
+        records = list(parse_records(io.StringIO(REACTIONS)))
+
+        self.assertEqual([r['UNIQUE-ID'][0] for r in records], ['RXN-1', 'RXN-2'])
+        self.assertEqual(records[0]['LEFT'], ['CPD-1', 'WATER'])
+        self.assertNotIn('^COEFFICIENT', records[0])
+
+    def test_annotations(self):
+        record = next(parse_records(io.StringIO(REACTIONS)))
+
+        self.assertEqual(record.annotation('LEFT', 'CPD-1', 'COEFFICIENT'), '2')
+        self.assertEqual(record.annotation('LEFT', 'CPD-1', 'COMPARTMENT'), 'CCO-IN')
+        self.assertEqual(record.annotation('LEFT', 'WATER', 'COEFFICIENT', 1.0), 1.0)
+        self.assertEqual(record.annotation('RIGHT', 'CPD-2', 'COEFFICIENT'), '3')
+
+    def test_unterminated_record(self):
+        records = list(parse_records(io.StringIO(REACTIONS[:-4])))
+
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[1]['RIGHT'], ['CPD-3'])
+
+    def test_dat_file(self):
+        filename = os.path.join(DATA, 'reactions.dat')
+        records = data_by_record(filename)
+
+        self.assertEqual(records, list(iter_records(filename)))
+        self.assertEqual(records[0]['UNIQUE-ID'], ['RXN-11417'])
+
+        coeffs = get_coeffs_reactions(filename)
+        self.assertEqual(coeffs['RXN-11417']['LEFT']['OXYGEN-MOLECULE'], 1.0)
+
+
+class JsonRecordsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.records = [{'entry_id': 'RXN-1', 'reactants': {'CPD-1': 2.0}}, {'entry_id': 'RXN-2'}]
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_formats(self):
+        for output_format in JSON_FORMATS:
+            with self.subTest(output_format=output_format):
+                if output_format.endswith('.zst') and zstandard is None:
+                    self.skipTest('zstandard is not installed')
+
+                filename = os.path.join(self.folder, 'reaction.' + output_format)
+
+                self.assertEqual(write_json_records(iter(self.records), filename), 2)
+                self.assertEqual(list(iter_json_records(filename)), self.records)
+                self.assertEqual(os.listdir(self.folder), ['reaction.' + output_format])
+
+                os.remove(filename)
+
+    def test_find_json_file(self):
+        self.assertIsNone(find_json_file(self.folder, 'reaction'))
+
+        write_json_records(self.records, os.path.join(self.folder, 'reaction.ndjson.gz'))
+        self.assertEqual(find_json_file(self.folder, 'reaction'), os.path.join(self.folder, 'reaction.ndjson.gz'))
+
+
+if __name__ == '__main__':
+    unittest.main()
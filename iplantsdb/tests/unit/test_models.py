@@ -0,0 +1,24 @@
+import unittest
+
+from iplants_mongo.models import Reaction, Gene
+
+
+class ContentHashTestCase(unittest.TestCase):
+
+    def test_equal_documents_have_equal_hashes(self):
+        reaction = {'entry_id': 'R1', 'common_name': 'reaction 1', 'crossrefs': {'KEGG': 'R0001', 'RHEA': '10'},
+                    'reactants': {'A': -1, 'B': -2}, 'products': {'C': 1}, 'genes': {'plantcyc': ['G1', 'G2']}}
+        same = dict(reaction, crossrefs={'RHEA': '10', 'KEGG': 'R0001'}, reactants={'B': -2, 'A': -1})
+
+        self.assertEqual(Reaction(**reaction), Reaction(**same))
+        self.assertEqual(hash(Reaction(**reaction)), hash(Reaction(**same)))
+        self.assertEqual(len({Reaction(**reaction), Reaction(**same)}), 1)
+
+    def test_changed_documents(self):
+        gene = Gene(entry_id='G1', synonyms=['a', 'b'], crossrefs={'ENTREZ': '1'})
+        self.assertNotEqual(hash(gene), hash(Gene(entry_id='G1', synonyms=['a'], crossrefs={'ENTREZ': '1'})))
+        self.assertNotEqual(gene, Gene(entry_id='G1', synonyms=['a', 'b'], crossrefs={'ENTREZ': '2'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.extract import iter_records, get_enzrxn_data, get_enz_type_genes, get_coeffs_complexes
+from utils.pgdb import ParsedPGDB, cache_path, is_cache_valid, read_cache, record_chunks, parallel_cache
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'plant')
+
+
+class ParsedPGDBTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.pgdb = ParsedPGDB(DATA, use_cache=False)
+
+    def test_records_are_parsed_once(self):
+        self.assertIs(self.pgdb.records('proteins.dat'), self.pgdb.records('proteins.dat'))
+
+    def test_indexes(self):
+        self.assertEqual(self.pgdb.rxn_enzs, get_enzrxn_data(DATA, for_rxn=True))
+        self.assertEqual(self.pgdb.enz_rxns, get_enzrxn_data(DATA, for_rxn=False))
+        self.assertEqual(self.pgdb.enzyme_types, get_enz_type_genes(DATA))
+
+        coeffs = get_coeffs_complexes(DATA)
+        for cplx, comps in self.pgdb.complex_coefficients.items():
+            self.assertEqual(comps, coeffs[cplx])
+
+
+class OrganismIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        with open(os.path.join(self.folder, 'pathways.dat'), 'w') as datfile:
+            datfile.write('UNIQUE-ID - PWY-1\nSPECIES - TAX-3702\nSPECIES - TAX-4577\n//\n'
+                          'UNIQUE-ID - PWY-2\nSPECIES - TAX-3702\n//\n'
+                          'UNIQUE-ID - PWY-3\n//\n')
+        with open(os.path.join(self.folder, 'proteins.dat'), 'w') as datfile:
+            datfile.write('UNIQUE-ID - MONOMER-1\nGENE - G-1\nSPECIES - TAX-3702\n//\n'
+                          'UNIQUE-ID - MONOMER-2\nGENE - G-1\nGENE - G-2\nSPECIES - TAX-3702\n//\n'
+                          'UNIQUE-ID - MONOMER-3\nSPECIES - TAX-4081\n//\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_organism_index(self):
+        index = ParsedPGDB(self.folder, use_cache=False).organism_index
+
+        self.assertEqual(list(index), ['TAX-3702', 'TAX-4577', 'TAX-4081'])
+        self.assertEqual(index['TAX-3702'], {'pathways': ['PWY-1', 'PWY-2'], 'enzymes': ['MONOMER-1', 'MONOMER-2'],
+                                             'genes': ['G-1', 'G-2']})
+        self.assertEqual(index['TAX-4577'], {'pathways': ['PWY-1'], 'enzymes': [], 'genes': []})
+        self.assertEqual(index['TAX-4081'], {'pathways': [], 'enzymes': ['MONOMER-3'], 'genes': []})
+
+
+class RecordCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        shutil.copy(os.path.join(DATA, 'reactions.dat'), self.folder)
+        shutil.copy(os.path.join(DATA, 'proteins.dat'), self.folder)
+        self.filename = os.path.join(self.folder, 'reactions.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_cache_is_written_and_read(self):
+        records = ParsedPGDB(self.folder).records('reactions.dat')
+
+        self.assertTrue(is_cache_valid(self.filename))
+
+        cached = ParsedPGDB(self.folder).records('reactions.dat')
+        self.assertEqual(cached, records)
+        self.assertEqual(cached[0].annotations, records[0].annotations)
+
+    def test_partial_read_does_not_write_cache(self):
+        next(ParsedPGDB(self.folder).iter_records('reactions.dat'))
+
+        self.assertFalse(os.path.exists(cache_path(self.filename)))
+        self.assertEqual(sorted(os.listdir(self.folder)), ['proteins.dat', 'reactions.dat'])
+
+    def test_changed_file_invalidates_cache(self):
+        ParsedPGDB(self.folder).records('reactions.dat')
+
+        with open(self.filename, 'a') as datfile:
+            datfile.write('UNIQUE-ID - RXN-NEW\n//\n')
+
+        self.assertFalse(is_cache_valid(self.filename))
+        records = ParsedPGDB(self.folder).records('reactions.dat')
+        self.assertEqual(records, list(iter_records(self.filename)))
+        self.assertEqual(records[-1]['UNIQUE-ID'], ['RXN-NEW'])
+
+
+class ParallelParseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        shutil.copy(os.path.join(DATA, 'enzrxns.dat'), self.folder)
+        self.filename = os.path.join(self.folder, 'enzrxns.dat')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_chunks_end_at_records(self):
+        chunks = record_chunks(self.filename, 20000)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(chunks[0][0], 0)
+        self.assertEqual(chunks[-1][1], os.path.getsize(self.filename))
+
+        with open(self.filename, 'rb') as datfile:
+            for start, end in chunks[:-1]:
+                datfile.seek(start)
+                self.assertTrue(datfile.read(end - start).rstrip().endswith(b'//'))
+
+    def test_parallel_cache(self):
+        parallel_cache(self.filename, workers=2, chunk_size=20000)
+
+        self.assertTrue(is_cache_valid(self.filename))
+        self.assertEqual(list(read_cache(self.filename)), list(iter_records(self.filename)))
+        self.assertEqual(sorted(os.listdir(self.folder)), ['enzrxns.dat', 'enzrxns.dat.records.pickle'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+import pandas as pd
+
+from utils.protrein import UniProtProtein, query_accessions, normalize_gene_names
+
+QUERY = pd.DataFrame({'Entry': ['Q9LQ10', 'P93819', 'O04487', 'Q9SAJ4', 'P0DO11'],
+                      'Gene names': ['PGK At1g79550 F20B17.11', 'MDH1 At1g04410 F19P19.14', 'At1g04420 F19P19.13',
+                                     'PGK3 At1g79550', None],
+                      'Gene names  (primary )': ['PGK', 'MDH1', None, 'PGK3', 'rbcL'],
+                      'Organism ID': [3702, 3702, 3702, 3702, 4577]})
+
+
+class QueryAccessionsTestCase(unittest.TestCase):
+
+    def test_normalize(self):
+        normalized = normalize_gene_names(QUERY['Gene names'])
+        self.assertEqual(list(normalized.loc[0]), ['pgk', 'at1g79550', 'f20b1711'])
+        # the rows without names are left out
+        self.assertNotIn(4, normalized.index)
+
+    def test_locus_tags(self):
+        accessions = query_accessions(QUERY, locus_tags=['AT1G04410', 'at1g04420', 'At1g79550', 'AT5G00000'],
+                                      taxonomy='3702')
+
+        self.assertEqual(accessions, {'AT1G04410': 'P93819', 'at1g04420': 'O04487',
+                                      # two entries have the locus tag
+                                      'At1g79550': None,
+                                      'AT5G00000': None})
+
+    def test_names(self):
+        # the exact names are preferred to the names that contain them
+        accessions = query_accessions(QUERY, names=['mdh1', 'RBCL', 'PGK'])
+        self.assertEqual(accessions, {'mdh1': 'P93819', 'RBCL': 'P0DO11', 'PGK': 'Q9LQ10'})
+
+        # without an exact match, a name matches the names that contain it and the names contained in it
+        accessions = query_accessions(QUERY, names=['MDH', 'PGK3A', 'PG'])
+        self.assertEqual(accessions, {'MDH': 'P93819', 'PGK3A': None, 'PG': None})
+
+        accessions = query_accessions(QUERY, names=['rbcL'], taxonomy=3702)
+        self.assertEqual(accessions, {'rbcL': None})
+
+    def test_parse_uniprot_query(self):
+        protein = UniProtProtein(taxonomy='3702', locus_tag='F19P19.13')
+        protein.parse_uniprot_query(QUERY)
+        self.assertEqual(protein._accession, 'O04487')
+
+        protein = UniProtProtein(taxonomy='3702', name='MDH1')
+        protein.parse_uniprot_query(QUERY)
+        self.assertEqual(protein._accession, 'P93819')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from utils.sequences import SequenceProvider, index_path, is_index_valid
+
+PROTEOME = ('>AT1G01010.1 | NAC domain containing protein 1\nMEDQVGFGFRPNDEELVGHYLRNKIEGNTSRDVEVAISEVNICSYDPWNLRFQ\n'
+            'SKFKSRDAMWYFFSRRENNKGNRQSRTTVSGKWKLTGESVEVKDQWGFCSGF\n'
+            '>AT1G01020.1 | ARV1 family protein\nMAASEHRCVGCGFRVKSLFIQYSPGNIRLMKCGNCKEVADEYIECERMIIFIDLILHRPK\n')
+
+
+class SequenceProviderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.filename = os.path.join(self.folder, 'ARAPORT11_protein.fasta')
+        with open(self.filename, 'w') as fasta:
+            fasta.write(PROTEOME)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_sequence(self):
+        provider = SequenceProvider(self.folder)
+
+        self.assertEqual(list(provider.files), ['ARAPORT11_protein'])
+        self.assertEqual(provider.sequence('ARAPORT11_protein', 'AT1G01010.1'),
+                         'MEDQVGFGFRPNDEELVGHYLRNKIEGNTSRDVEVAISEVNICSYDPWNLRFQSKFKSRDAMWYFFSRRENNKGNRQSRTTVSGKWKLTGESVEVK'
+                         'DQWGFCSGF')
+        self.assertIsNone(provider.sequence('ARAPORT11_protein', 'AT1G01030.1'))
+        self.assertIsNone(provider.sequence('zea_mays', 'AT1G01010.1'))
+        self.assertTrue(is_index_valid(self.filename))
+        provider.close()
+
+    def test_register(self):
+        filename = os.path.join(self.folder, 'zea_mays.pep')
+        with open(filename, 'w') as fasta:
+            fasta.write('>sp|Zm00001d027230_P001|maize\nMKLLVVA\n')
+
+        provider = SequenceProvider(None)
+        provider.register('zea_mays', filename, key_function=lambda fasta_id: fasta_id.split('|')[1])
+
+        self.assertEqual(provider.find('Zm00001d027230_P001'), 'MKLLVVA')
+        self.assertIsNone(provider.find('AT1G01010.1'))
+        provider.close()
+
+    def test_changed_file_is_indexed_again(self):
+        provider = SequenceProvider(self.folder)
+        provider.sequence('ARAPORT11_protein', 'AT1G01010.1')
+        provider.close()
+
+        with open(self.filename, 'a') as fasta:
+            fasta.write('>AT1G01030.1\nMDLSLAP\n')
+        os.utime(index_path(self.filename), (0, 0))
+
+        self.assertFalse(is_index_valid(self.filename))
+        self.assertEqual(SequenceProvider(self.folder).sequence('ARAPORT11_protein', 'AT1G01030.1'), 'MDLSLAP')
+
+    def test_threads(self):
+        provider = SequenceProvider(self.folder)
+        sequences = []
+
+        def lookup():
+            sequences.append(provider.sequence('ARAPORT11_protein', 'AT1G01020.1'))
+            provider.close()
+
+        threads = [threading.Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sequences, ['MAASEHRCVGCGFRVKSLFIQYSPGNIRLMKCGNCKEVADEYIECERMIIFIDLILHRPK'] * 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
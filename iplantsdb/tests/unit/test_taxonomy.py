@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils.pgdb import ParsedPGDB
+from utils.taxonomy import TaxonomyResolver, taxon_lineage
+
+SPECIES = ('UNIQUE-ID - TAX-3702\nTYPES - TAX-3701\nCOMMON-NAME - Arabidopsis thaliana\n//\n'
+           'UNIQUE-ID - ORG-1\nTYPES - TAX-4577\nCOMMON-NAME - Zea mays B73\n//\n'
+           'UNIQUE-ID - ORG-2\nTYPES - Organisms\n'
+           'DBLINKS - (NCBI-TAXONOMY-DB "3847" NIL |caspi| 3578326457 NIL NIL)\n//\n')
+
+
+class TaxonomyResolverTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        with open(os.path.join(self.folder, 'species.dat'), 'w') as datfile:
+            datfile.write(SPECIES)
+
+        self.resolver = TaxonomyResolver(ParsedPGDB(self.folder, use_cache=False), use_api=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_taxids(self):
+        self.assertEqual(self.resolver.species_taxids, {'TAX-3702': '3702', 'ORG-1': '4577', 'ORG-2': '3847'})
+        self.assertEqual(self.resolver.taxid('TAX-4081'), '4081')
+        self.assertEqual(self.resolver.taxid('ORG-2'), '3847')
+        self.assertIsNone(self.resolver.taxid('ORG-3'))
+        self.assertEqual(self.resolver.api_calls, 0)
+
+    def test_resolve(self):
+        taxonomy = self.resolver.resolve(['TAX-3702', 'ORG-1', 'ORG-3'])
+
+        taxid, lineage = taxonomy['TAX-3702']
+        self.assertEqual(taxid, '3702')
+        self.assertEqual(lineage['scientific_name'], 'Arabidopsis thaliana')
+        self.assertEqual(lineage['genus'], 'Arabidopsis')
+        self.assertEqual(lineage['org_class'], 'Magnoliopsida')
+        self.assertNotIn('class', lineage)
+
+        self.assertEqual(taxonomy['ORG-1'][1]['scientific_name'], 'Zea mays')
+        self.assertEqual(taxonomy['ORG-3'], (None, None))
+
+    def test_no_species_file(self):
+        os.remove(os.path.join(self.folder, 'species.dat'))
+
+        self.assertEqual(TaxonomyResolver(ParsedPGDB(self.folder, use_cache=False)).species_taxids, {})
+
+    def test_unknown_taxon(self):
+        self.assertIsNone(taxon_lineage(999999999))
+
+
+if __name__ == '__main__':
+    unittest.main()
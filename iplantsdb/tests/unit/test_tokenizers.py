@@ -0,0 +1,28 @@
+import unittest
+
+from utils.tokenizers import strip_html, parse_dblink, parse_pathway_link, parse_formula
+
+
+class TokenizersTestCase(unittest.TestCase):
+
+    def test_strip_html(self):
+        self.assertEqual(strip_html('<i>S</i>-adenosyl-L-methionine'), 'S-adenosyl-L-methionine')
+        self.assertEqual(strip_html('water'), 'water')
+
+    def test_parse_dblink(self):
+        self.assertEqual(parse_dblink('(CHEBI "15377" NIL |kothari| 3619532080 NIL NIL)'), ('CHEBI', '15377'))
+        self.assertEqual(parse_dblink('(ENTREZ "1,2" NIL |x| 1 NIL NIL)'), ('ENTREZ', '1,2'))
+        self.assertIsNone(parse_dblink('(BROKEN NIL NIL)'))
+
+    def test_parse_pathway_link(self):
+        self.assertEqual(parse_pathway_link('(CPD-7117 PWY-7261 PWY-5153)'), ('CPD-7117', ['PWY-7261', 'PWY-5153']))
+        self.assertEqual(parse_pathway_link('(PYRUVATE (PWY-5 . :OUTGOING))'), ('PYRUVATE', ['PWY-5']))
+        self.assertEqual(parse_pathway_link('(CPD-2 (PWY-4 . :INCOMING) PWY-6)'), ('CPD-2', ['PWY-4', 'PWY-6']))
+        self.assertEqual(parse_pathway_link('(|CPD-3| "some pathway" PWY-5)'), ('CPD-3', ['some_pathway', 'PWY-5']))
+
+    def test_parse_formula(self):
+        self.assertEqual(parse_formula(['(C 6)', '(H 12)', '(O 6)']), 'C6H12O6')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import shutil
+import unittest
+
+from transformer import TransformerMetabolite
+from utils.extract import iter_json_records
+from utils.delta import record_digest
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'plant')
+
+
+class ValidationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.transformer = TransformerMetabolite(data_path=DATA, db_version='test_1.0', validation_rate=1.0)
+
+    def tearDown(self):
+        shutil.rmtree(self.transformer.output_folder, ignore_errors=True)
+
+    def test_invalid_records_are_counted(self):
+        records = [{'entry_id': 'WATER', 'formula': 'H2O', 'database_version': {'test': '1.0'}},
+                   {'entry_id': 'BAD', 'formula': {'H': 2, 'O': 1}}]
+
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual(self.transformer.validate(records), 1)
+
+    def test_stats(self):
+        n_records = self.transformer.transform()
+        stats = self.transformer.stats
+
+        self.assertEqual(stats['records'], n_records)
+        self.assertEqual(set(stats['stages']), {'parse', 'build', 'fingerprint', 'validate', 'write'})
+        self.assertLessEqual(sum(stats['stages'].values()), stats['wall_time'])
+        self.assertGreater(stats['process_peak_rss_mb'], 0)
+        # the allocations are only traced on demand
+        self.assertNotIn('peak_memory_mb', stats)
+
+        self.transformer.transform(trace_memory=True)
+        self.assertGreaterEqual(self.transformer.stats['peak_memory_mb'], 0)
+
+    def test_fingerprint(self):
+        self.transformer.transform()
+
+        for record in iter_json_records(self.transformer.output_file):
+            self.assertEqual(record['fingerprint'], record_digest(record))
+
+    def test_no_validation_by_default(self):
+        self.transformer.validation_rate = 0.0
+        self.assertEqual(self.transformer.validate([{'entry_id': 'BAD', 'formula': {'H': 2, 'O': 1}}]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
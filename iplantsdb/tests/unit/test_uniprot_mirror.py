@@ -0,0 +1,127 @@
+import os
+import gzip
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from Bio import SeqIO
+
+from utils.uniprot import iter_uniprot_xml, iter_uniprot_dat, fetch_uniprot_entries
+from utils.uniprot_mirror import UniProtMirror
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'uniprot')
+XML_FILE = os.path.join(DATA, 'uniprot_sample.xml')
+DAT_FILE = os.path.join(DATA, 'uniprot_sprot_sample.dat')
+
+NAC1 = {'uniprot_location': ['Plastid', 'Chloroplast thylakoid membrane', 'Nucleus'],
+        'uniprot_function': 'Transcription activator.',
+        'uniprot_product': 'NAC domain-containing protein 1',
+        'sequence': 'MEDQVGFGFRPN',
+        'uniprot_status': 'reviewed'}
+
+
+class UniProtExtractTestCase(unittest.TestCase):
+
+    def test_xml_matches_biopython(self):
+        for entry, record in zip(iter_uniprot_xml(XML_FILE), SeqIO.parse(XML_FILE, 'uniprot-xml')):
+            self.assertEqual(entry['accessions'][0], record.id)
+            self.assertEqual(entry['sequence'], str(record.seq))
+            self.assertEqual(entry['uniprot_location'],
+                             record.annotations.get('comment_subcellularlocation_location', []))
+            self.assertEqual(entry['uniprot_product'], record.annotations.get('recommendedName_fullName', [None])[0])
+            self.assertEqual(entry['uniprot_function'], record.annotations.get('comment_function', [None])[0])
+
+    def test_dat(self):
+        entries = list(iter_uniprot_dat(DAT_FILE))
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0].pop('accessions'), ['Q0WV96', 'Q9FXF6'])
+        self.assertEqual(entries[0], NAC1)
+
+
+class UniProtHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in of the uniprot accessions service. It answers with the entries of the sample xml file that have one of
+    the requested accessions.
+    """
+
+    def do_GET(self):
+        accessions = parse_qs(urlparse(self.path).query)['accessions'][0].split(',')
+        self.server.requests.append(accessions)
+
+        with open(XML_FILE) as xml_file:
+            content = xml_file.read()
+
+        header, _, body = content.partition('<entry ')
+        entries = ['<entry ' + entry for entry in body.replace('</uniprot>', '').split('<entry ')]
+        selected = [entry for entry in entries if any('>%s<' % acc in entry for acc in accessions)]
+
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write((header + ''.join(selected) + '</uniprot>').encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class UniProtBatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), UniProtHandler)
+        self.server.requests = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:%d/uniprotkb/accessions' % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_batches(self):
+        data = fetch_uniprot_entries(['Q9FXF6', 'A0A178W', 'P00000', 'Q9FXF6'], batch_size=2, url=self.url,
+                                     cache_ttl=None)
+
+        self.assertEqual(self.server.requests, [['Q9FXF6', 'A0A178W'], ['P00000']])
+        self.assertEqual(data['Q9FXF6'], NAC1)
+        self.assertEqual(data['A0A178W']['sequence'], 'MKLLV')
+        self.assertNotIn('P00000', data)
+
+
+class UniProtMirrorTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.mirror = UniProtMirror(os.path.join(self.folder, 'uniprot.sqlite'))
+
+    def tearDown(self):
+        self.mirror.close()
+        shutil.rmtree(self.folder)
+
+    def test_ingest_xml(self):
+        self.assertEqual(self.mirror.ingest(XML_FILE), 2)
+
+        self.assertEqual(self.mirror.get('Q0WV96'), NAC1)
+        self.assertEqual(self.mirror.get('Q9FXF6'), NAC1)
+        self.assertEqual(self.mirror.get('A0A178W')['uniprot_status'], 'unreviewed')
+        self.assertIsNone(self.mirror.get('P00000'))
+
+    def test_ingest_gzipped_dat(self):
+        filename = os.path.join(self.folder, 'uniprot_sprot_sample.dat.gz')
+        with open(DAT_FILE, 'rb') as datfile, gzip.open(filename, 'wb') as gzfile:
+            shutil.copyfileobj(datfile, gzfile)
+
+        self.mirror.ingest(filename)
+        self.mirror.ingest(XML_FILE)
+
+        self.assertEqual(len(self.mirror), 2)
+        self.assertEqual(set(self.mirror.get_many(['Q0WV96', 'A0A178W', 'P00000'])), {'Q0WV96', 'A0A178W'})
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            self.mirror.ingest(os.path.join(self.folder, 'uniprot.tsv'))
+
+
+if __name__ == '__main__':
+    unittest.main()